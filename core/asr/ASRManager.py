@@ -35,6 +35,7 @@ from core.dialog.model.DialogSession import DialogSession
 
 class ASRManager(Manager):
 	NAME = 'ASRManager'
+	DEPENDENCIES = ('MqttManager',)
 
 
 	def __init__(self):
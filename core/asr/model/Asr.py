@@ -19,6 +19,7 @@
 
 import json
 import threading
+import time
 from pathlib import Path
 from typing import Optional
 
@@ -32,6 +33,7 @@ from core.util.model.AliceEvent import AliceEvent
 class Asr(ProjectAliceObject):
 	NAME = 'Generic Asr'
 	DEPENDENCIES = dict()
+	PARTIAL_RESULT_INTERVAL = 0.3  # Minimum seconds between two intermediate decodings, engines can override it
 
 
 	def __init__(self):
@@ -40,6 +42,7 @@ class Asr(ProjectAliceObject):
 		self._timeout: AliceEvent = self.ThreadManager.newEvent('asrTimeout')
 		self._timeoutTimer: Optional[threading.Timer] = None
 		self._recorder: Optional[Recorder] = None
+		self._lastPartialResult = 0.0
 		super().__init__()
 
 
@@ -69,9 +72,24 @@ class Asr(ProjectAliceObject):
 
 	def decodeStream(self, session: DialogSession):
 		self._timeout.clear()
+		self._lastPartialResult = time.monotonic()
 		self._timeoutTimer = self.ThreadManager.newTimer(interval=int(self.ConfigManager.getAliceConfigByName('asrTimeout')), func=self.timeout)
 
 
+	def partialResultDue(self) -> bool:
+		"""
+		Streaming engines decode the whole utterance again for each intermediate result. Doing it for
+		every audio chunk competes with feeding the audio in real time and delays the final result
+		:return: Whether enough time passed since the last intermediate decoding to do another one
+		"""
+		now = time.monotonic()
+		if now - self._lastPartialResult < self.PARTIAL_RESULT_INTERVAL:
+			return False
+
+		self._lastPartialResult = now
+		return True
+
+
 	def end(self):
 		self._recorder.stopRecording()
 		if self._timeoutTimer and self._timeoutTimer.is_alive():
@@ -152,6 +152,8 @@ class CoquiAsr(Asr):
 						break
 
 					streamContext.feedAudioContent(np.frombuffer(chunk, np.int16))
+					if not self.partialResultDue():
+						continue
 
 					result = streamContext.intermediateDecode()
 					if result and result != previous:
@@ -167,7 +169,7 @@ class CoquiAsr(Asr):
 			session=session,
 			likelihood=1.0,
 			processingTime=processingTime.time
-		) if result else None
+		) if text else None
 
 
 	# noinspection DuplicatedCode
@@ -126,6 +126,8 @@ class DeepSpeechAsr(Asr):
 						break
 
 					self._model.feedAudioContent(streamContext, np.frombuffer(chunk, np.int16))
+					if not self.partialResultDue():
+						continue
 
 					result = self._model.intermediateDecode(streamContext)
 					if result and result != previous:
@@ -141,7 +143,7 @@ class DeepSpeechAsr(Asr):
 			session=session,
 			likelihood=1.0,
 			processingTime=processingTime.time
-		) if result else None
+		) if text else None
 
 
 	def _checkResponses(self, session: DialogSession, responses: Generator) -> Optional[tuple]:
@@ -143,7 +143,6 @@ class PocketSphinxAsr(Asr):
 		super().decodeStream(session)
 
 		result = None
-		counter = 0
 		with Stopwatch() as processingTime:
 			with Recorder(self._timeout, session.user, session.deviceUid) as recorder:
 				self.ASRManager.addRecorder(session.deviceUid, recorder)
@@ -155,12 +154,11 @@ class PocketSphinxAsr(Asr):
 						break
 
 					self._decoder.process_raw(chunk, False, False)
-					hypothesis = self._decoder.hyp()
-					if hypothesis:
-						counter += 1
-						if counter == 10:
+					if self.partialResultDue():
+						hypothesis = self._decoder.hyp()
+						if hypothesis:
 							self.partialTextCaptured(session, hypothesis.hypstr, hypothesis.prob, processingTime.time)
-							counter = 0
+
 					if self._decoder.get_in_speech() != inSpeech:
 						inSpeech = self._decoder.get_in_speech()
 						if not inSpeech:
@@ -85,9 +85,12 @@ class VoskAsr(Asr):
 					if end_of_speech:
 						break
 
+					if not self.partialResultDue():
+						continue
+
 					result = json.loads(recognizer.PartialResult())
-					if result['parial'] and result['partial'] != previous:
-						previous = result
+					if result['partial'] and result['partial'] != previous:
+						previous = result['partial']
 						self.partialTextCaptured(session=session, text=result['partial'], likelihood=1, seconds=0)
 
 				result = json.loads(recognizer.FinalResult())['text']
@@ -28,6 +28,7 @@ from core.base.model.StateType import StateType
 
 
 class AssistantManager(Manager):
+	DEPENDENCIES = ('DialogTemplateManager', 'NluManager')
 	STATE = 'projectalice.core.training'
 
 
@@ -158,12 +159,6 @@ class AssistantManager(Manager):
 		try:
 			assistant = self.newAssistant()
 			intents = dict()
-			slots = dict()
-			randoms = set()
-
-			# When slots of the same entity id (type) wear the same name, their id is identical, so we need to
-			# keep a track about entity ids, names and type
-			entityVSType = dict()
 
 			for skillResource in self.skillResource():
 
@@ -198,54 +193,48 @@ class AssistantManager(Manager):
 						continue
 
 					for slot in intent['slots']:
-						rand9 = self.Commons.randomString(9)
-						while rand9 in randoms:
-							rand9 = self.Commons.randomString(9)
-						randoms.add(rand9)
-
-						rand11 = self.Commons.randomString(11)
-						while rand11 in randoms:
-							rand11 = self.Commons.randomString(11)
-						randoms.add(rand11)
-
-						if slot['type'] not in slots:
-							intentSlot = {
-								'name'           : slot['name'],
-								'id'             : rand9,
-								'entityId'       : f'entity_{rand11}',
-								'missingQuestion': slot['missingQuestion'],
-								'required'       : slot['required']
-							}
-							slots[slot['type']] = intentSlot
-							entityVSType[f'{slot["type"]}_{slot["name"]}'] = f'{rand9}'
-						else:
-
-							# Check if a slot with same type and name already exists and use its id else use the new random
-							slotId = entityVSType.get(f'{slot["type"]}_{slot["name"]}', rand9)
-
-							intentSlot = {
-								'name'           : slot['name'],
-								'id'             : slotId,
-								'entityId'       : slots[slot['type']]['entityId'],
-								'missingQuestion': slot['missingQuestion'],
-								'required'       : slot['required']
-							}
-
+						# Ids are derived from the slot type and name, so slots of the same type and name share their id
+						# and slots of the same type share their entity id, from one training to another
+						intentSlot = {
+							'name'           : slot['name'],
+							'id'             : self.Commons.contentId(slot['type'], slot['name'], length=9),
+							'entityId'       : f'entity_{self.Commons.contentId(slot["type"], length=11)}',
+							'missingQuestion': slot['missingQuestion'],
+							'required'       : slot['required']
+						}
 						intents[intent['name']]['slots'].append(intentSlot)
 
-			assistant['intents'] = [intent for intent in intents.values()]
+			assistant['intents'] = [intents[intentName] for intentName in sorted(intents)]
+
+			if not self._isSameAssistant(assistant):
+				self._assistantPath.write_text(json.dumps(assistant, ensure_ascii=False, indent='\t', sort_keys=True))
+			else:
+				self.logInfo('Assistant unchanged, keeping the existing one')
 
-			self._assistantPath.write_text(json.dumps(assistant, ensure_ascii=False, indent='\t', sort_keys=True))
 			self.linkAssistant()
 
 			self.broadcast(method='snipsAssistantInstalled', exceptions=[self.name], propagateToSkills=True)
-			self.logInfo(f'Assistant trained with {len(intents)} intents and a total of {len(slots)} slots')
+			self.logInfo(f'Assistant trained with {len(intents)} intents and a total of {sum(len(intent["slots"]) for intent in intents.values())} slots')
 		except Exception as e:
 			self.broadcast(method='snipsAssistantFailedTraining', exceptions=[self.name], propagateToSkills=True)
 			if not self._assistantPath.exists():
 				self.logFatal(f'Assistant failed training and no assistant existing, stopping here, sorry.... What happened? {e}')
 
 
+	def _isSameAssistant(self, assistant: dict) -> bool:
+		"""
+		Checks if the assistant on disk declares the same intents as the given one
+		:param assistant:
+		:return:
+		"""
+		try:
+			existing = json.loads(self._assistantPath.read_text())
+		except (OSError, ValueError):
+			return False
+
+		return existing.get('id') == assistant['id'] and existing.get('intents') == assistant['intents']
+
+
 	def linkAssistant(self):
 		Path(self.Commons.rootDir(), f'trained/assistants/{self.LanguageManager.activeLanguage}').mkdir(parents=True, exist_ok=True)
 		os.symlink(src=f'{self.Commons.rootDir()}/trained/assistants/{self.LanguageManager.activeLanguage}', dst=f'{self.Commons.rootDir()}/assistant', target_is_directory=True)
@@ -253,7 +242,7 @@ class AssistantManager(Manager):
 
 	def newAssistant(self) -> dict:
 		assistant = {
-			'id'              : f'proj_{self.Commons.randomString(11)}',
+			'id'              : f'proj_{self.Commons.contentId(self.LanguageManager.activeLanguage)}',
 			'name'            : f'ProjectAlice_{self.LanguageManager.activeLanguage}',
 			'analyticsEnabled': False,
 			'heartbeatEnabled': False,
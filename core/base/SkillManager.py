@@ -20,12 +20,16 @@
 
 import importlib
 import json
+import os
 import requests
 import shutil
+import subprocess
+import threading
 import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import suppress
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from AliceGit import Exceptions as GitErrors
 from AliceGit.Exceptions import NotGitRepository, PathNotFoundException
@@ -36,6 +40,7 @@ from core.base.model import Intent
 from core.base.model.AliceSkill import AliceSkill
 from core.base.model.FailedAliceSkill import FailedAliceSkill
 from core.base.model.Manager import Manager
+from core.base.model.SkillRegistry import SkillRegistry
 from core.base.model.Version import Version
 from core.commons import constants
 from core.dialog.model.DialogSession import DialogSession
@@ -45,7 +50,9 @@ from core.webui.model.UINotificationType import UINotificationType
 
 
 class SkillManager(Manager):
+	DEPENDENCIES = ('MqttManager', 'TalkManager', 'UserManager', 'LocationManager', 'InternetManager', 'DialogManager', 'WebUINotificationManager', 'ASRManager', 'TTSManager', 'AudioManager')
 	DBTAB_SKILLS = 'skills'
+	GIT_WORKERS = 8  # How many skills are checked, downloaded or updated at once
 
 	DATABASE = {
 		DBTAB_SKILLS: [
@@ -84,6 +91,16 @@ class SkillManager(Manager):
 		self._deactivatedSkills: Dict[str, AliceSkill] = dict()
 		self._failedSkills: Dict[str, Union[AliceSkill, FailedAliceSkill]] = dict()
 
+		# Skills table and install files, in memory
+		self._registry = SkillRegistry()
+
+		# Skill name: (repository and working tree state, user modified, tracked files)
+		self._userModifiedSkills: Dict[str, Tuple[tuple, bool, List[Path]]] = dict()
+
+		# Skill name: lock held while its repository is cloned or checked out
+		self._skillLocks: Dict[str, threading.Lock] = dict()
+		self._skillLocksLock = threading.Lock()
+
 
 	@property
 	def supportedIntents(self) -> List[Dict]:
@@ -271,7 +288,9 @@ class SkillManager(Manager):
 		Loads skills from the database
 		:return:
 		"""
-		return self.databaseFetch(tableName='skills')
+		rows = self.databaseFetch(tableName='skills')
+		self._registry.load(rows)
+		return rows
 
 
 	def addSkillToDB(self, skillName: str, active: int = 1):
@@ -285,6 +304,8 @@ class SkillManager(Manager):
 			tableName='skills',
 			values={'skillName': skillName, 'active': active}
 		)
+		self._registry.add(skillName=skillName, active=active == 1)
+		self._registry.invalidate(skillName=skillName)
 
 
 	# noinspection SqlResolve
@@ -300,11 +321,12 @@ class SkillManager(Manager):
 			query='DELETE FROM :__table__ WHERE skillName = :skill',
 			values={'skill': skillName}
 		)
+		self._registry.remove(skillName=skillName)
 
 
 	def installSkills(self, skills: Union[str, List[str]], startSkill: bool = False):
 		"""
-		Installs the given skills
+		Installs the given skills. The requirements of all skills are installed at once
 		:param skills: Either a list of skill names to install or a single skill name
 		:param startSkill: If the skill should be immediately started
 		:return:
@@ -313,39 +335,58 @@ class SkillManager(Manager):
 		if isinstance(skills, str):
 			skills = [skills]
 
+		repositories = dict()
 		for skillName in skills:
 			if skillName in self._skillList:
 				self.logDebug(f'Skill **{skillName}** already installed, skipping')
 				continue
 
-			try:
-				try:
-					repository = self.getSkillRepository(skillName=skillName)
-				except:
-					try:
-						repositories = self.downloadSkills(skills=skillName)
-						repository = repositories.get(skillName, None)
-					except SkillNotConditionCompliant:
-						continue
+			with suppress(Exception):
+				repositories[skillName] = self.getSkillRepository(skillName=skillName)
+
+		# Download all the missing skills at once
+		missing = [skillName for skillName in skills if skillName not in self._skillList and skillName not in repositories]
+		repositories.update(self.downloadSkills(skills=missing) or dict())
+
+		prepared = list()
+		for skillName in skills:
+			if skillName in self._skillList:
+				continue
 
+			try:
+				repository = repositories.get(skillName, None)
 				if not repository:
 					raise Exception(f'Failed downloading skill **{skillName}** for some unknown reason')
 
-				installFile = json.loads(repository.file(f'{skillName}.install').read_text())
-				pipReqs     = installFile.get('pipRequirements', list())
-				sysReqs     = installFile.get('systemRequirements', list())
-				scriptReq   = installFile.get('script')
-
+				self._registry.invalidate(skillName=skillName)
+				installFile = self._registry.installer(skillName=skillName, installFile=repository.file(f'{skillName}.install'))
 				self.checkSkillConditions(installFile)
+				prepared.append((skillName, repository, installFile))
+			except SkillNotConditionCompliant:
+				self.broadcast(
+					method=constants.EVENT_SKILL_INSTALL_FAILED,
+					exceptions=self._name,
+					propagateToSkills=True,
+					skill=skillName
+				)
+			except Exception as e:
+				self.logError(f'Error installing skill **{skillName}**: {e}')
+				self.broadcast(
+					method=constants.EVENT_SKILL_INSTALL_FAILED,
+					exceptions=[constants.DUMMY],
+					propagateToSkills=True,
+					skill=skillName
+				)
 
-				for requirement in pipReqs:
-					self.logInfo(f'Installing pip requirement: {requirement}')
-					self.Commons.runSystemCommand(['./venv/bin/pip3', 'install', requirement])
-
-				for requirement in sysReqs:
-					self.logInfo(f'Installing system requirement: {requirement}')
-					self.Commons.runRootSystemCommand(['apt-get', 'install', '-y', requirement])
+		self.installRequirements(
+			pipRequirements=[requirement for _, _, installFile in prepared for requirement in installFile.get('pipRequirements', list())],
+			systemRequirements=[requirement for _, _, installFile in prepared for requirement in installFile.get('systemRequirements', list())]
+		)
 
+		reboot = False
+		for skillName, repository, installFile in prepared:
+			try:
+				scriptReq = installFile.get('script')
 				if scriptReq:
 					self.logInfo('Running post install script')
 					req = repository.file(scriptReq)
@@ -359,18 +400,10 @@ class SkillManager(Manager):
 				self._skillList.append(skillName)
 
 				if installFile.get('rebootAfterInstall', False):
-					self.Commons.runRootSystemCommand('sudo shutdown -r now'.split())
-					break
+					reboot = True
 				elif startSkill:
 					self.initSkills(onlyInit=skillName)
 					self.startSkill(skillName=skillName)
-			except SkillNotConditionCompliant:
-				self.broadcast(
-					method=constants.EVENT_SKILL_INSTALL_FAILED,
-					exceptions=self._name,
-					propagateToSkills=True,
-					skill=skillName
-				)
 			except Exception as e:
 				self.logError(f'Error installing skill **{skillName}**: {e}')
 				self.broadcast(
@@ -389,6 +422,71 @@ class SkillManager(Manager):
 
 		self._busyInstalling.clear()
 
+		if reboot:
+			self.Commons.runRootSystemCommand('sudo shutdown -r now'.split())
+
+
+	def installRequirements(self, pipRequirements: List[str], systemRequirements: List[str]):
+		"""
+		Installs all the given requirements with one apt and one pip run. If a run fails, its requirements
+		are installed one by one, so that one faulty requirement doesn't prevent the others from being installed
+		:param pipRequirements:
+		:param systemRequirements:
+		:return:
+		"""
+		systemRequirements = list(dict.fromkeys(systemRequirements))
+		pipRequirements = list(dict.fromkeys(pipRequirements))
+
+		if systemRequirements:
+			self.logInfo(f'Installing system requirements: {", ".join(systemRequirements)}')
+			if self.Commons.runRootSystemCommand(['apt-get', 'install', '-y', *systemRequirements]).returncode != 0 and len(systemRequirements) > 1:
+				self.logWarning('Failed installing system requirements, trying one by one')
+				for requirement in systemRequirements:
+					self.Commons.runRootSystemCommand(['apt-get', 'install', '-y', requirement])
+
+		if pipRequirements:
+			fromCache = self.buildWheels(pipRequirements)
+			self.logInfo(f'Installing pip requirements: {", ".join(pipRequirements)}')
+			if self.Commons.runSystemCommand(self.pipInstallCommand(pipRequirements, fromCache=fromCache)).returncode != 0 and len(pipRequirements) > 1:
+				self.logWarning('Failed installing pip requirements, trying one by one')
+				for requirement in pipRequirements:
+					self.Commons.runSystemCommand(self.pipInstallCommand([requirement], fromCache=fromCache))
+
+
+	def buildWheels(self, requirements: List[str]) -> bool:
+		"""
+		Builds the given requirements into the wheel cache, if one is set and we are online
+		:param requirements:
+		:return: Whether the requirements should be installed from the wheel cache
+		"""
+		wheelCache = self.ConfigManager.getAliceConfigByName('skillsWheelCache')
+		if not wheelCache:
+			return False
+
+		Path(wheelCache).mkdir(parents=True, exist_ok=True)
+		if not self.InternetManager.online:
+			return True
+
+		if self.Commons.runSystemCommand(['./venv/bin/pip3', 'wheel', '--wheel-dir', wheelCache, '--find-links', wheelCache, *requirements]).returncode != 0:
+			self.logWarning('Failed building pip requirements into the wheel cache, installing from the package index')
+			return False
+
+		return True
+
+
+	def pipInstallCommand(self, requirements: List[str], fromCache: bool = False) -> List[str]:
+		"""
+		Builds the pip command installing the given requirements
+		:param requirements:
+		:param fromCache: Install from the wheel cache only
+		:return:
+		"""
+		if not fromCache:
+			return ['./venv/bin/pip3', 'install', *requirements]
+
+		wheelCache = self.ConfigManager.getAliceConfigByName('skillsWheelCache')
+		return ['./venv/bin/pip3', 'install', '--no-index', '--find-links', wheelCache, *requirements]
+
 
 	def getSkillRepository(self, skillName: str, directory: str = None) -> Optional[Repository]:
 		"""
@@ -409,7 +507,7 @@ class SkillManager(Manager):
 
 	def downloadSkills(self, skills: Union[str, List[str]]) -> Optional[Dict]:
 		"""
-		Clones skills. Existence of the skill online is checked
+		Clones skills, concurrently. Existence of the skill online is checked
 		:param skills:
 		:return: Dict: a dict of created repositories
 		"""
@@ -417,38 +515,16 @@ class SkillManager(Manager):
 			skills = [skills]
 
 		repositories = dict()
+		if not skills:
+			return repositories
 
-		for skillName in skills:
-			try:
-				tag = self.SkillStoreManager.getSkillUpdateTag(skillName=skillName)
-				response = requests.get(f'{constants.GITHUB_RAW_URL}/skill_{skillName}/{tag}/{skillName}.install')
-				if response.status_code != 200:
-					raise GithubNotFound
-
-				self.logInfo(f'Now downloading **{skillName}** version **{tag}**')
-
-				with suppress(): # Increment download counter
-					requests.get(f'https://skills.projectalice.ch/{skillName}')
+		skills = list(dict.fromkeys(skills))
+		with ThreadPoolExecutor(max_workers=min(self.GIT_WORKERS, len(skills))) as pool:
+			downloads = {skillName: pool.submit(self.downloadSkill, skillName) for skillName in skills}
 
-				installFile = response.json()
-
-				if not self.ConfigManager.getAliceConfigByName('devMode'):
-					self.checkSkillConditions(installer=installFile)
-
-				source = self.getGitRemoteSourceUrl(skillName=skillName, doAuth=False)
-
-				try:
-					repository = self.getSkillRepository(skillName=skillName)
-				except PathNotFoundException:
-					repository = Repository.clone(url=source, directory=self.getSkillDirectory(skillName=skillName), makeDir=True)
-				except NotGitRepository:
-					shutil.rmtree(self.getSkillDirectory(skillName=skillName), ignore_errors=True)
-					repository = Repository.clone(url=source, directory=self.getSkillDirectory(skillName=skillName), makeDir=True)
-				except:
-					raise
-
-				repository.checkout(tag=tag)
-				repositories[skillName] = repository
+		for skillName, download in downloads.items():
+			try:
+				repositories[skillName] = download.result()
 			except GithubNotFound:
 				if skillName in self.NEEDED_SKILLS:
 					self._busyInstalling.clear()
@@ -474,6 +550,55 @@ class SkillManager(Manager):
 		return repositories
 
 
+	def downloadSkill(self, skillName: str) -> Repository:
+		"""
+		Clones a skill and checks out the version matching this Alice
+		:param skillName:
+		:return: The skill repository
+		"""
+		tag = self.SkillStoreManager.getSkillUpdateTag(skillName=skillName)
+		response = requests.get(f'{constants.GITHUB_RAW_URL}/skill_{skillName}/{tag}/{skillName}.install')
+		if response.status_code != 200:
+			raise GithubNotFound
+
+		self.logInfo(f'Now downloading **{skillName}** version **{tag}**')
+
+		with suppress(): # Increment download counter
+			requests.get(f'https://skills.projectalice.ch/{skillName}')
+
+		installFile = response.json()
+
+		if not self.ConfigManager.getAliceConfigByName('devMode'):
+			self.checkSkillConditions(installer=installFile)
+
+		source = self.getGitRemoteSourceUrl(skillName=skillName, doAuth=False)
+
+		# Dependencies are downloaded from the workers too, the same skill must not be cloned twice at once
+		with self.skillLock(skillName=skillName):
+			try:
+				repository = self.getSkillRepository(skillName=skillName)
+			except PathNotFoundException:
+				repository = Repository.clone(url=source, directory=self.getSkillDirectory(skillName=skillName), makeDir=True)
+			except NotGitRepository:
+				shutil.rmtree(self.getSkillDirectory(skillName=skillName), ignore_errors=True)
+				repository = Repository.clone(url=source, directory=self.getSkillDirectory(skillName=skillName), makeDir=True)
+			except:
+				raise
+
+			repository.checkout(tag=tag)
+			return repository
+
+
+	def skillLock(self, skillName: str) -> threading.Lock:
+		"""
+		Returns the lock guarding the given skill's repository
+		:param skillName:
+		:return:
+		"""
+		with self._skillLocksLock:
+			return self._skillLocks.setdefault(skillName, threading.Lock())
+
+
 	def notCompliantSkill(self, skillName: str,  exception: SkillNotConditionCompliant) -> bool:
 		"""
 		Print out the fact a skill is not compliant and return false if Alice cannot continue as it's a needed skill
@@ -549,7 +674,9 @@ class SkillManager(Manager):
 					self.logWarning(f'Cannot find skill install file for skill **{skillName}**, skipping.')
 					continue
 			else:
-				installFile = json.loads(installFilePath.read_text())
+				if reload:
+					self._registry.invalidate(skillName=skillName)
+				installFile = self.getSkillInstaller(skillName=skillName)
 
 			try:
 				skillActiveState = self.isSkillActive(skillName=skillName)
@@ -606,6 +733,15 @@ class SkillManager(Manager):
 		return self.getSkillDirectory(skillName=skillName) / f'{skillName}.install'
 
 
+	def getSkillInstaller(self, skillName: str) -> dict:
+		"""
+		Returns a skill's install file content. It is read once and kept until the skill is installed or updated again
+		:param skillName:
+		:return:
+		"""
+		return self._registry.installer(skillName=skillName, installFile=self.getSkillInstallFilePath(skillName=skillName))
+
+
 	# noinspection PyTypeChecker
 	def instantiateSkill(self, skillName: str, skillResource: str = '', reload: bool = False) -> Optional[AliceSkill]:
 		"""
@@ -650,10 +786,16 @@ class SkillManager(Manager):
 		elif skillName in self._failedSkills or skillName in self._deactivatedSkills:
 			return False
 		elif skillName in self._skillList:
+			active = self._registry.isActive(skillName=skillName)
+			if active is not None:
+				return active
+
 			# noinspection SqlResolve
 			row = self.databaseFetch(tableName=self.DBTAB_SKILLS, query='SELECT active FROM :__table__ WHERE skillName = :skillName LIMIT 1', values={'skillName': skillName})
 			if not row:
 				return False
+
+			self._registry.add(skillName=skillName, active=int(row[0]['active']) == 1)
 			return int(row[0]['active']) == 1
 		return False
 
@@ -753,17 +895,20 @@ class SkillManager(Manager):
 		if isinstance(skills, str):
 			skills = [skills]
 
+		if not skills:
+			self._busyInstalling.clear()
+			return
+
 		for skillName in skills:
 			self.logInfo(f'Now updating skill **{skillName}**')
 			self.stopSkill(skillName=skillName)
 			self._failedSkills.pop(skillName, None)
 
-			try:
-				repository = self.getSkillRepository(skillName=skillName)
-				repository.fetch(force=True)
-				repository.checkout(tag=self.SkillStoreManager.getSkillUpdateTag(skillName=skillName), force=True)
-			except Exception as e:
-				self.logError(f'Error updating skill **{skillName}** : {e}')
+		with ThreadPoolExecutor(max_workers=min(self.GIT_WORKERS, len(skills))) as pool:
+			updated = list(pool.map(self.updateSkillRepository, skills))
+
+		for skillName, success in zip(skills, updated):
+			if not success:
 				continue
 
 			self.broadcast(
@@ -783,6 +928,28 @@ class SkillManager(Manager):
 		self._busyInstalling.clear()
 
 
+	def updateSkillRepository(self, skillName: str) -> bool:
+		"""
+		Fetches the skill repository and checks out the version matching this Alice
+		:param skillName:
+		:return: Whether the update succeeded
+		"""
+		try:
+			repository = self.getSkillRepository(skillName=skillName)
+			# Never trust a cached answer before overwriting files
+			if self.ConfigManager.getAliceConfigByName('devMode') and repository.isDirty():
+				self.logWarning(f'Skill **{skillName}** has local changes, not updating it')
+				return False
+
+			repository.fetch(force=True)
+			repository.checkout(tag=self.SkillStoreManager.getSkillUpdateTag(skillName=skillName), force=True)
+			self._registry.invalidate(skillName=skillName)
+			return True
+		except Exception as e:
+			self.logError(f'Error updating skill **{skillName}** : {e}')
+			return False
+
+
 	def stopSkill(self, skillName: str) -> Optional[AliceSkill]:
 		"""
 		Stops the given skill
@@ -876,9 +1043,9 @@ class SkillManager(Manager):
 
 			try:
 				skillInstance = self.instantiateSkill(skillName=skillName)
-				self.checkSkillConditions(installer=json.loads(self.getSkillInstallFilePath(skillName=skillName).read_text()))
+				self.checkSkillConditions(installer=self.getSkillInstaller(skillName=skillName))
 			except:
-				self._failedSkills[skillName] = FailedAliceSkill(json.loads(skill.getResource(f'{skillName}.install').read_text()))
+				self._failedSkills[skillName] = FailedAliceSkill(self.getSkillInstaller(skillName=skillName))
 				return dict()
 
 			if skillInstance:
@@ -1015,6 +1182,7 @@ class SkillManager(Manager):
 			},
 			row=('skillName', skillName)
 		)
+		self._registry.setActive(skillName=skillName, active=newState)
 
 
 	def dispatchMessage(self, session: DialogSession) -> bool:
@@ -1057,60 +1225,85 @@ class SkillManager(Manager):
 	@IfSetting(settingName='stayCompletelyOffline', settingValue=False)
 	def checkForSkillUpdates(self, skillToCheck: str = None) -> List[str]:
 		"""
-		Checks all installed skills for availability of updates.
+		Checks all installed skills for availability of updates, concurrently.
 		Includes failed skills but not inactive.
 		:param skillToCheck:
 		:return:
 		"""
 		self.logInfo('Checking for skill updates')
-		skillsToUpdate = list()
 
-		for skillName in self._skillList:
-			try:
-				if skillToCheck and skillName != skillToCheck:
-					continue
+		skills = [skillName for skillName in self._skillList if not skillToCheck or skillName == skillToCheck]
+		if not skills:
+			self.logInfo('Found 0 skill update', plural='update')
+			return list()
 
-				installer = json.loads(self.getSkillInstallFilePath(skillName=skillName).read_text())
+		with ThreadPoolExecutor(max_workers=min(self.GIT_WORKERS, len(skills))) as pool:
+			states = [pool.submit(self.fetchSkillUpdateState, skillName) for skillName in skills]
 
-				remoteVersion = self.SkillStoreManager.getSkillUpdateVersion(skillName)
-				localVersion = Version.fromString(installer['version'])
-				if localVersion < remoteVersion:
+		# Only fetched concurrently, reported from here in skill order
+		skillsToUpdate = [skillName for skillName, state in zip(skills, states) if self.checkForSkillUpdate(skillName=skillName, state=state)]
 
-					self.WebUINotificationManager.newNotification(
-						typ=UINotificationType.INFO,
-						notification='skillUpdateAvailable',
-						key='skillUpdate_{}'.format(skillName),
-						replaceBody=[skillName, str(remoteVersion)]
-					)
+		self.logInfo(f'Found {len(skillsToUpdate)} skill update', plural='update')
+		return skillsToUpdate
 
-					if self.isSkillUserModified(skillName=skillName) and self.ConfigManager.getAliceConfigByName('devMode'):
-						if skillName in self.allSkills:
-							self.allSkills[skillName].updateAvailable = True
 
-						self.logInfo(f'![blue]({skillName}) - Version {installer["version"]} < {str(remoteVersion)} in {self.ConfigManager.getAliceConfigByName("skillsUpdateChannel")} - Locked for local changes!')
-						continue
+	def fetchSkillUpdateState(self, skillName: str) -> Tuple[dict, Version, bool]:
+		"""
+		Gets what an update check needs from the store and from git, without logging or notifying anything
+		:param skillName:
+		:return: The skill installer, the remote version and whether the skill was modified locally
+		"""
+		installer = self.getSkillInstaller(skillName=skillName)
+		remoteVersion = self.SkillStoreManager.getSkillUpdateVersion(skillName)
+		return installer, remoteVersion, self.isSkillUserModified(skillName=skillName)
 
-					self.logInfo(f'![yellow]({skillName}) - Version {installer["version"]} < {str(remoteVersion)} in {self.ConfigManager.getAliceConfigByName("skillsUpdateChannel")}')
 
-					if not self.ConfigManager.getAliceConfigByName('skillAutoUpdate'):
-						if skillName in self.allSkills:
-							self.allSkills[skillName].updateAvailable = True
-					else:
-						skillsToUpdate.append(skillName)
+	def checkForSkillUpdate(self, skillName: str, state: Future = None) -> bool:
+		"""
+		Checks if an update is available for the given skill
+		:param skillName:
+		:param state: A pending fetchSkillUpdateState, fetched now if not given
+		:return: Whether the skill should be updated now
+		"""
+		try:
+			installer, remoteVersion, userModified = state.result() if state else self.fetchSkillUpdateState(skillName=skillName)
+			localVersion = Version.fromString(installer['version'])
+			if localVersion < remoteVersion:
+
+				self.WebUINotificationManager.newNotification(
+					typ=UINotificationType.INFO,
+					notification='skillUpdateAvailable',
+					key='skillUpdate_{}'.format(skillName),
+					replaceBody=[skillName, str(remoteVersion)]
+				)
+
+				if userModified and self.ConfigManager.getAliceConfigByName('devMode'):
+					if skillName in self.allSkills:
+						self.allSkills[skillName].updateAvailable = True
+
+					self.logInfo(f'![blue]({skillName}) - Version {installer["version"]} < {str(remoteVersion)} in {self.ConfigManager.getAliceConfigByName("skillsUpdateChannel")} - Locked for local changes!')
+					return False
+
+				self.logInfo(f'![yellow]({skillName}) - Version {installer["version"]} < {str(remoteVersion)} in {self.ConfigManager.getAliceConfigByName("skillsUpdateChannel")}')
+
+				if not self.ConfigManager.getAliceConfigByName('skillAutoUpdate'):
+					if skillName in self.allSkills:
+						self.allSkills[skillName].updateAvailable = True
 				else:
-					if self.isSkillUserModified(skillName=skillName) and self.ConfigManager.getAliceConfigByName('devMode'):
-						self.logInfo(f'![blue]({skillName}) - Version {installer["version"]} in {self.ConfigManager.getAliceConfigByName("skillsUpdateChannel")} - Locked for local changes!')
-					else:
-						self.logInfo(f'![green]({skillName}) - Version {installer["version"]} in {self.ConfigManager.getAliceConfigByName("skillsUpdateChannel")}')
+					return True
+			else:
+				if userModified and self.ConfigManager.getAliceConfigByName('devMode'):
+					self.logInfo(f'![blue]({skillName}) - Version {installer["version"]} in {self.ConfigManager.getAliceConfigByName("skillsUpdateChannel")} - Locked for local changes!')
+				else:
+					self.logInfo(f'![green]({skillName}) - Version {installer["version"]} in {self.ConfigManager.getAliceConfigByName("skillsUpdateChannel")}')
 
-			except GithubNotFound:
-				self.logInfo(f'![red](Skill **{skillName}**) is not available on Github. Deprecated or is it a dev skill?')
+		except GithubNotFound:
+			self.logInfo(f'![red](Skill **{skillName}**) is not available on Github. Deprecated or is it a dev skill?')
 
-			except Exception as e:
-				self.logError(f'Error checking updates for skill **{skillName}**: {e}')
+		except Exception as e:
+			self.logError(f'Error checking updates for skill **{skillName}**: {e}')
 
-		self.logInfo(f'Found {len(skillsToUpdate)} skill update', plural='update')
-		return skillsToUpdate
+		return False
 
 
 	def getSkillInstance(self, skillName: str, silent: bool = False) -> Optional[AliceSkill]:
@@ -1200,6 +1393,7 @@ class SkillManager(Manager):
 		:return:
 		"""
 		self.logInfo(f'Reloading skill "{skillName}"')
+		self._registry.invalidate(skillName=skillName)
 
 		self.stopSkill(skillName=skillName)
 		self.initSkills(onlyInit=skillName, reload=True)
@@ -1271,17 +1465,73 @@ class SkillManager(Manager):
 
 	def isSkillUserModified(self, skillName: str) -> bool:
 		"""
-		Checks git status to see if the skill was modified from original online
+		Checks git status to see if the skill was modified from original online.
+		Git is only asked again if the checked out commit, the index, the remote branch or a tracked file changed since the last check
 		:param skillName:
 		:return:
 		"""
 		try:
 			repository = self.getSkillRepository(skillName=skillName)
-			return repository.isDirty()
+
+			cached = self._userModifiedSkills.get(skillName, None)
+			if cached:
+				state, dirty, trackedFiles = cached
+				if state == (self.repositoryState(repository.path), self.workingTreeState(trackedFiles)):
+					return dirty
+
+			trackedFiles = self.trackedFiles(repository.path)
+			# Taken before asking git, so that a file changed meanwhile is seen next time
+			workingTree = self.workingTreeState(trackedFiles)
+			dirty = repository.isDirty()
+			# Git status might have refreshed the index
+			self._userModifiedSkills[skillName] = ((self.repositoryState(repository.path), workingTree), dirty, trackedFiles)
+			return dirty
 		except:
 			return False
 
 
+	@staticmethod
+	def repositoryState(directory: Path) -> tuple:
+		"""
+		The git side of what git status depends on: the checked out commit, the index and the remote branch
+		:param directory:
+		:return:
+		"""
+		gitDir = Path(directory, '.git')
+		head = Path(gitDir, 'HEAD').read_text().strip()
+		if head.startswith('ref: ') and Path(gitDir, head[5:]).exists():
+			head = Path(gitDir, head[5:]).read_text().strip()
+
+		mtimes = list()
+		for path in (Path(gitDir, 'index'), Path(gitDir, 'refs/remotes/origin/master'), Path(gitDir, 'packed-refs')):
+			mtimes.append(path.stat().st_mtime_ns if path.exists() else 0)
+
+		return head, *mtimes
+
+
+	@staticmethod
+	def workingTreeState(trackedFiles: List[Path]) -> tuple:
+		"""
+		The working tree side of what git status depends on: the tracked files, only they are looked at
+		:param trackedFiles:
+		:return: Newest modification time and number of the tracked files still there
+		"""
+		newest = 0
+		present = 0
+		for file in trackedFiles:
+			with suppress(OSError):
+				newest = max(newest, os.stat(file).st_mtime_ns)
+				present += 1
+
+		return newest, present
+
+
+	@staticmethod
+	def trackedFiles(directory: Path) -> List[Path]:
+		result = subprocess.run(['git', '-C', str(directory), 'ls-files', '-z'], capture_output=True, check=True)
+		return [Path(directory, file) for file in result.stdout.decode().split('\0') if file]
+
+
 	def createNewSkill(self, skillDefinition: dict) -> bool:
 		"""
 		Used to create a new skill by the usr
@@ -18,26 +18,43 @@
 #  Last modified: 2021.04.13 at 12:56:46 CEST
 
 import difflib
+import hashlib
+import json
 import requests
+from pathlib import Path
 from random import shuffle
-from typing import Optional, Tuple
+from typing import Dict, Iterable, Optional, Tuple
 
 from core.ProjectAliceExceptions import GithubNotFound
+from core.base.SuperManager import SuperManager
 from core.base.model.Manager import Manager
 from core.base.model.Version import Version
 from core.commons import constants
 from core.dialog.model.DialogSession import DialogSession
-from core.util.Decorators import Online
 
 
 class SkillStoreManager(Manager):
+	DEPENDENCIES = ('SkillManager', 'ASRManager', 'InternetManager')
 	SUGGESTIONS_DIFF_LIMIT = 0.75
+	STORE_REQUEST_TIMEOUT = 10
 
 
 	def __init__(self):
 		super().__init__()
 		self._skillStoreData = dict()
 		self._skillSamplesData = dict()
+		self._samplesLanguage = ''
+
+		self._storeUrl = constants.SKILLS_STORE_ASSETS
+		self._samplesUrl = constants.SKILLS_SAMPLES_STORE_ASSETS
+
+		self._pathToCache = Path(self.Commons.rootDir(), 'var/cache/skillStore/')
+		self._pathToCache.mkdir(parents=True, exist_ok=True)
+		self._pathToValidators = self._pathToCache / f'validators{constants.JSON_EXT}'
+
+		# Per skill checksum of the store entry, used to only recheck conditions of what changed
+		self._storeChecksums: Dict[str, str] = dict()
+		self._conditionsContext: Optional[tuple] = None
 
 
 	@property
@@ -59,28 +76,167 @@ class SkillStoreManager(Manager):
 		self.refreshStoreData()
 
 
-	@Online(catchOnly=True)
 	def refreshStoreData(self):
-		req = requests.get(url=constants.SKILLS_STORE_ASSETS)
-		if req.status_code not in {200, 304}:
-			return
-
-		self._skillStoreData = req.json()
-		self.checkConditions()
+		"""
+		Refreshes the skill store data using conditional requests. If the store did not change
+		nothing is downloaded and only the skills whose conditions context changed are rechecked.
+		If we are offline or the store is unreachable, the local mirror is used
+		:return:
+		"""
+		data = self._fetchStoreAsset(url=self._storeUrl, name='skills')
+		if data is not None:
+			self._updateStoreData(data)
+		elif self._conditionsContext != self._getConditionsContext():
+			self.checkConditions()
 
 		if not self.ConfigManager.getAliceConfigByName('suggestSkillsToInstall'):
 			return
 
-		req = requests.get(url=constants.SKILLS_SAMPLES_STORE_ASSETS)
-		if req.status_code not in {200, 304}:
-			return
+		data = self._fetchStoreAsset(url=self._samplesUrl, name='samples')
+		if data is None and self._samplesLanguage != self.LanguageManager.activeLanguage:
+			# Unchanged samples are still to be picked again in the new language
+			data = self._loadMirror(self._pathToCache / f'samples{constants.JSON_EXT}')
+
+		if data is not None:
+			self.prepareSamplesData(data)
+
+
+	def _fetchStoreAsset(self, url: str, name: str) -> Optional[dict]:
+		"""
+		Fetches a store asset if it changed since last time. The asset is mirrored on disk
+		alongside its ETag and Last-Modified validators
+		:param url: The asset url
+		:param name: The name of the local mirror
+		:return: The asset data, or None if what we hold in memory is still up to date
+		"""
+		mirror = self._pathToCache / f'{name}{constants.JSON_EXT}'
+		inMemory = bool(self._skillStoreData) if name == 'skills' else bool(self._skillSamplesData)
+
+		if self.ConfigManager.getAliceConfigByName('stayCompletelyOffline') or not self.InternetManager.online:
+			return None if inMemory else self._loadMirror(mirror)
+
+		validators = self._loadValidators()
+		headers = dict()
+		if mirror.exists() and name in validators:
+			if validators[name].get('etag'):
+				headers['If-None-Match'] = validators[name]['etag']
+			if validators[name].get('lastModified'):
+				headers['If-Modified-Since'] = validators[name]['lastModified']
+
+		try:
+			req = requests.get(url=url, headers=headers, timeout=self.STORE_REQUEST_TIMEOUT)
+		except requests.RequestException as e:
+			self.logWarning(f'Skill store not reachable, using local mirror: {e}')
+			self.InternetManager.probeNow()
+			return None if inMemory else self._loadMirror(mirror)
+
+		if req.status_code == 304:
+			self.logDebug(f'Skill store **{name}** unchanged')
+			return None if inMemory else self._loadMirror(mirror)
+
+		if req.status_code != 200:
+			return None if inMemory else self._loadMirror(mirror)
+
+		try:
+			data = req.json()
+		except ValueError:
+			self.logWarning(f'Skill store returned invalid data for **{name}**')
+			return None if inMemory else self._loadMirror(mirror)
+
+		tmp = mirror.with_suffix('.tmp')
+		tmp.write_text(json.dumps(data, ensure_ascii=False))
+		tmp.replace(mirror)
+
+		validators[name] = {
+			'etag'        : req.headers.get('ETag', ''),
+			'lastModified': req.headers.get('Last-Modified', '')
+		}
+		self._pathToValidators.write_text(json.dumps(validators, indent='\t'))
 
-		self.prepareSamplesData(req.json())
+		return data
 
 
-	def checkConditions(self):
-		for skillName, skillData in self._skillStoreData.items():
-			skillData['installed'] = skillName in self.SkillManager.allSkills.keys()
+	def _loadValidators(self) -> dict:
+		try:
+			return json.loads(self._pathToValidators.read_text())
+		except (OSError, ValueError):
+			return dict()
+
+
+	def _loadMirror(self, mirror: Path) -> Optional[dict]:
+		try:
+			return json.loads(mirror.read_text())
+		except (OSError, ValueError):
+			return None
+
+
+	def _updateStoreData(self, data: dict):
+		"""
+		Replaces the store data and rechecks conditions only for new or changed entries,
+		unless the context the conditions depend on changed, in which case everything is rechecked
+		:param data:
+		:return:
+		"""
+		checksums = {skillName: self._entryChecksum(skillData) for skillName, skillData in data.items()}
+		changed = [skillName for skillName, checksum in checksums.items() if self._storeChecksums.get(skillName) != checksum]
+
+		for skillName, skillData in data.items():
+			if skillName in changed:
+				continue
+
+			# Keep the already computed condition results
+			previous = self._skillStoreData.get(skillName, dict())
+			for key in ('installed', 'offendingConditions', 'compatible'):
+				if key in previous:
+					skillData[key] = previous[key]
+
+		self._skillStoreData = data
+		self._storeChecksums = checksums
+
+		if self._conditionsContext != self._getConditionsContext():
+			self.checkConditions()
+		elif changed:
+			self.checkConditions(skills=changed)
+
+
+	@staticmethod
+	def _entryChecksum(skillData: dict) -> str:
+		return hashlib.md5(json.dumps(skillData, sort_keys=True).encode()).hexdigest()
+
+
+	def _getConditionsContext(self) -> tuple:
+		"""
+		Returns what skill conditions depend on, beside the store entry itself
+		:return:
+		"""
+		asr = self.ASRManager.asr
+		return (
+			self.LanguageManager.activeLanguage,
+			bool(self.ConfigManager.getAliceConfigByName('stayCompletelyOffline')),
+			tuple(sorted(self.SkillManager.allSkills.keys())),
+			tuple(sorted(self.SkillManager.activeSkills.keys())),
+			asr.capableOfArbitraryCapture if asr else None,
+			tuple(sorted(name for name, manager in SuperManager.getInstance().managers.items() if manager and manager.isActive))
+		)
+
+
+	def checkConditions(self, skills: Iterable[str] = None):
+		"""
+		Checks the conditions of the store skills
+		:param skills: If specified, only check these skills
+		:return:
+		"""
+		if skills is None:
+			skills = self._skillStoreData.keys()
+			self._conditionsContext = self._getConditionsContext()
+
+		installedSkills = self.SkillManager.allSkills.keys()
+		for skillName in skills:
+			skillData = self._skillStoreData.get(skillName)
+			if skillData is None:
+				continue
+
+			skillData['installed'] = skillName in installedSkills
 
 			offendingConditions = self.SkillManager.checkSkillConditions(installer=skillData, checkOnly=True)
 
@@ -96,8 +252,9 @@ class SkillStoreManager(Manager):
 		if not data:
 			return
 
-		for skillName, skill in data.items():
-			self._skillSamplesData.setdefault(skillName, skill.get(self.LanguageManager.activeLanguage, list()))
+		language = self.LanguageManager.activeLanguage
+		self._skillSamplesData = {skillName: skill.get(language, list()) for skillName, skill in data.items()}
+		self._samplesLanguage = language
 
 
 	def _getSkillUpdateVersion(self, skillName: str) -> Optional[Tuple[Version, str]]:
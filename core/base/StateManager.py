@@ -17,7 +17,7 @@
 #
 #  Last modified: 2021.04.13 at 12:56:46 CEST
 
-from typing import Optional
+from typing import Callable, Dict, List, Optional
 
 from core.ProjectAliceExceptions import StateAlreadyRegistered
 from core.base.model.Manager import Manager
@@ -35,6 +35,9 @@ class StateManager(Manager):
 	def __init__(self):
 		super().__init__()
 		self._states = dict()
+		self._index: Dict[str, State] = dict()
+		self._allStates: List[State] = list()
+		self._subscribers: Dict[str, List[Callable]] = dict()
 
 
 	def onStop(self):
@@ -59,10 +62,17 @@ class StateManager(Manager):
 		try:
 			state = State(statePath.split('.')[-1], initialState)
 			self._buildDict(statePath, state)
-			return state
 		except StateAlreadyRegistered:
 			return None
 
+		self._index[statePath] = state
+		self._allStates.append(state)
+
+		for callback in self._subscribers.pop(statePath, list()):
+			state.subscribe(callback)
+
+		return state
+
 
 	def _buildDict(self, statePath: str, state: State):
 		"""
@@ -92,20 +102,30 @@ class StateManager(Manager):
 		:param statePath: path
 		:return: State
 		"""
-		track = self._states
-		parts = statePath.split('.')
-		try:
-			for i, path in enumerate(parts):
-				if i + 1 == len(parts):
-					ret = track.get(path)
-					if not isinstance(ret, State):
-						return None
-					else:
-						return ret
-				else:
-					track = track[path]
-		except KeyError:
-			return None
+		return self._index.get(statePath, None)
+
+
+	def subscribe(self, statePath: str, callback: Callable):
+		"""
+		Calls back with the old and new state whenever the state on the given path changes.
+		The state does not need to be registered yet
+		:param statePath: dotted string
+		:param callback: callable taking the old and the new state
+		"""
+		state = self.getState(statePath)
+		if state:
+			state.subscribe(callback)
+		else:
+			self._subscribers.setdefault(statePath, list()).append(callback)
+
+
+	def unsubscribe(self, statePath: str, callback: Callable):
+		state = self.getState(statePath)
+		if state:
+			if callback in state.callbacks:
+				state.unsubscribe(callback)
+		elif callback in self._subscribers.get(statePath, list()):
+			self._subscribers[statePath].remove(callback)
 
 
 	def setState(self, statePath: str, newState: StateType) -> bool:
@@ -123,10 +143,13 @@ class StateManager(Manager):
 		return True
 
 
-	def allStates(self, states: dict = None, found: list = None):
+	def allStates(self, states: dict = None, found: list = None) -> List[State]:
 		"""
-		Returns all know registered states, recursively
+		Returns all know registered states. Without arguments, this is a cached list that must not be modified
 		"""
+		if states is None and found is None:
+			return self._allStates
+
 		if states is None:
 			states = self._states
 
@@ -19,6 +19,10 @@
 
 from __future__ import annotations
 
+import threading
+import time
+from typing import List
+
 from core.device.model.DeviceAbility import DeviceAbility
 from core.util.model.Logger import Logger
 
@@ -27,6 +31,9 @@ class SuperManager(object):
 	NAME = 'SuperManager'
 	_INSTANCE = None
 
+	FOUNDATION = ('BugReportManager', 'CommonsManager', 'StateManager', 'SubprocessManager', 'ConfigManager', 'LanguageManager', 'DatabaseManager', 'ThreadManager')
+	BOOT_TIMEOUT = 300
+
 
 	def __new__(cls, *args, **kwargs):
 		if not isinstance(SuperManager._INSTANCE, SuperManager):
@@ -38,6 +45,11 @@ class SuperManager(object):
 	def __init__(self, mainClass):
 		SuperManager._INSTANCE = self
 		self._managers = dict()
+		self._bootStart = 0
+		self._bootEvents = dict()
+		self._bootKeys = dict()
+		self._bootThreads = list()
+		self._bootTimeline = dict()
 
 		self.projectAlice             = mainClass
 		self.aliceWatchManager        = None
@@ -81,88 +93,25 @@ class SuperManager(object):
 
 	def onStart(self):
 		try:
-			bugReportManager = self._managers.pop('BugReportManager')
-			bugReportManager.onStart()
-			self._managers[bugReportManager.name] = bugReportManager
-
-			commons = self._managers.pop('CommonsManager')
-			commons.onStart()
-
-			stateManager = self._managers.pop('StateManager')
-			stateManager.onStart()
-
-			subprocessManager = self._managers.pop('SubprocessManager')
-			subprocessManager.onStart()
-
-			configManager = self._managers.pop('ConfigManager')
-			configManager.onStart()
-
-			languageManager = self._managers.pop('LanguageManager')
-			languageManager.onStart()
-
-			webUINotificationManager = self._managers.pop('WebUINotificationManager')
-			webUINotificationManager.onStart()
-
-			locationManager = self._managers.pop('LocationManager')
-			locationManager.onStart()
-
-			audioServer = self._managers.pop('AudioManager')
-			audioServer.onStart()
-
-			internetManager = self._managers.pop('InternetManager')
-			internetManager.onStart()
-
-			databaseManager = self._managers.pop('DatabaseManager')
-			databaseManager.onStart()
-
-			userManager = self._managers.pop('UserManager')
-			userManager.onStart()
-
-			mqttManager = self._managers.pop('MqttManager')
-			mqttManager.onStart()
-
-			talkManager = self._managers.pop('TalkManager')
-			skillManager = self._managers.pop('SkillManager')
-			deviceManager = self._managers.pop('DeviceManager')
-			widgetManager = self._managers.pop('WidgetManager')
-			assistantManager = self._managers.pop('AssistantManager')
-			dialogTemplateManager = self._managers.pop('DialogTemplateManager')
-			nluManager = self._managers.pop('NluManager')
-			nodeRedManager = self._managers.pop('NodeRedManager')
-
-			for manager in self._managers.copy().values():
-				if manager and manager.name != self.bugReportManager.name:
-					manager.onStart()
-
-			talkManager.onStart()
-			nluManager.onStart()
-			skillManager.onStart()
-			deviceManager.onStart()
-			widgetManager.onStart()
-			dialogTemplateManager.onStart()
-			assistantManager.onStart()
-			nodeRedManager.onStart()
-
-			self._managers[configManager.name] = configManager
-			self._managers[audioServer.name] = audioServer
-			self._managers[languageManager.name] = languageManager
-			self._managers[locationManager.name] = locationManager
-			self._managers[deviceManager.name] = deviceManager
-			self._managers[talkManager.name] = talkManager
-			self._managers[databaseManager.name] = databaseManager
-			self._managers[userManager.name] = userManager
-			self._managers[mqttManager.name] = mqttManager
-			self._managers[webUINotificationManager.name] = webUINotificationManager
-			self._managers[skillManager.name] = skillManager
-			self._managers[widgetManager.name] = widgetManager
-			self._managers[dialogTemplateManager.name] = dialogTemplateManager
-			self._managers[assistantManager.name] = assistantManager
-			self._managers[nluManager.name] = nluManager
-			self._managers[internetManager.name] = internetManager
-			self._managers[nodeRedManager.name] = nodeRedManager
-			self._managers[stateManager.name] = stateManager
-			self._managers[subprocessManager.name] = subprocessManager
-			self._managers[bugReportManager.name] = bugReportManager
+			self._bootStart = time.monotonic()
+			bootOrder = self.bootOrder()
+
+			# Everyone needs those, they are light and started one after the other
+			for name in self.FOUNDATION:
+				self._startManager(self._managers[name])
+
+			# Dependencies are declared by manager key or by manager name, those can differ
+			self._bootKeys = {manager.name: key for key, manager in self._managers.items() if manager}
+			keys = [name for name in bootOrder if name not in self.FOUNDATION]
+			self._bootEvents = {key: threading.Event() for key in keys}
+
+			# The others wait on their dependencies, independent ones start concurrently
+			self._bootThreads = [
+				self.threadManager.newThread(name=f'boot{key}', target=self._bootManager, args=[key, self._managers[key]])
+				for key in keys
+			]
+
+			self._managers = {name: self._managers[name] for name in bootOrder}
 		except Exception as e:
 			import traceback
 
@@ -170,7 +119,87 @@ class SuperManager(object):
 			Logger().logFatal(f'Error while starting managers: {e}')
 
 
+	def bootOrder(self) -> List[str]:
+		"""
+		Sorts the managers so that each one comes after its dependencies, keeping the
+		initialization order otherwise
+		:return: Manager keys in start order
+		"""
+		keys = {manager.name: key for key, manager in self._managers.items() if manager}
+		dependencies = dict()
+		for key, manager in self._managers.items():
+			if not manager or key in self.FOUNDATION:
+				continue
+
+			dependencies[key] = set()
+			for dependency in manager.DEPENDENCIES:
+				dependencyKey = keys.get(dependency, dependency)
+				if dependencyKey not in self._managers:
+					Logger().logWarning(f'Manager **{manager.name}** depends on unknown manager **{dependency}**')
+				elif dependencyKey not in self.FOUNDATION:
+					dependencies[key].add(dependencyKey)
+
+		order = [name for name in self.FOUNDATION if name in self._managers]
+		while dependencies:
+			ready = [key for key, needs in dependencies.items() if not needs - set(order)]
+			if not ready:
+				raise Exception(f'Circular manager dependencies between {", ".join(dependencies)}')
+
+			for key in ready:
+				order.append(key)
+				dependencies.pop(key)
+
+		return order
+
+
+	def _bootManager(self, key: str, manager):
+		for dependency in manager.DEPENDENCIES:
+			event = self._bootEvents.get(self._bootKeys.get(dependency, dependency), None)
+			if event:
+				event.wait()
+
+		try:
+			self._startManager(manager)
+		except Exception as e:
+			import traceback
+
+			traceback.print_exc()
+			Logger().logFatal(f'Error while starting manager **{manager.name}**: {e}')
+		finally:
+			self._bootEvents[key].set()
+
+
+	def _startManager(self, manager):
+		startedAt = time.monotonic()
+		manager.onStart()
+		self._bootTimeline[manager.name] = (startedAt - self._bootStart, time.monotonic() - startedAt)
+
+
+	def joinBoot(self):
+		"""
+		Waits for all managers to be started
+		:return:
+		"""
+		deadline = time.monotonic() + self.BOOT_TIMEOUT
+		for thread in self._bootThreads:
+			thread.join(timeout=max(deadline - time.monotonic(), 0))
+			if thread.is_alive():
+				Logger().logWarning(f'**{thread.name}** is still running after {self.BOOT_TIMEOUT} seconds')
+
+		self._bootThreads = list()
+		if not self._bootTimeline:
+			return
+
+		for name, (startedAt, duration) in sorted(self._bootTimeline.items(), key=lambda item: item[1][0]):
+			Logger().logDebug(f'Boot timeline: **{name}** started at +{startedAt:.2f}s and took {duration:.2f}s')
+
+		slowest = sorted(self._bootTimeline.items(), key=lambda item: item[1][1], reverse=True)[:3]
+		Logger().logInfo(f'Managers started in {time.monotonic() - self._bootStart:.2f} seconds, slowest: {", ".join(f"{name} ({duration:.2f}s)" for name, (_, duration) in slowest)}')
+
+
 	def onBooted(self):
+		self.joinBoot()
+
 		manager = None
 		try:
 			for manager in self._managers.values():
@@ -579,6 +579,9 @@ class AliceSkill(ProjectAliceObject):
 		self.loadWidgets()
 		self.loadScenarioNodes()
 
+		if type(self).onDeviceHeartbeat is not ProjectAliceObject.onDeviceHeartbeat:
+			self.logWarning('**onDeviceHeartbeat** is deprecated and not called anymore, subscribe with **DeviceManager.subscribeHeartbeats** instead')
+
 		self._failedStarting = False
 		self.logInfo(f'![green](Started!)')
 
@@ -17,13 +17,15 @@
 #
 #  Last modified: 2021.04.13 at 12:56:46 CEST
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from core.base.SuperManager import SuperManager
 from core.base.model.ProjectAliceObject import ProjectAliceObject
 
 
 class Manager(ProjectAliceObject):
+	DEPENDENCIES: Tuple[str, ...] = tuple()  # Managers that must be started before this one, by name
+
 
 	def __init__(self, name: str = '', databaseSchema: dict = None):
 		super().__init__()
@@ -548,6 +548,10 @@ class ProjectAliceObject(object):
 		pass  # Super object function is overridden only if needed
 
 
+	def onDeviceDisconnected(self, uid: str):
+		pass  # Super object function is overridden only if needed
+
+
 	def onUVIndexAlert(self, *args, **kwargs):
 		pass  # Super object function is overridden only if needed
 
@@ -673,7 +677,11 @@ class ProjectAliceObject(object):
 
 
 	def onDeviceHeartbeat(self, uid: str, deviceUid: str = None):
-		pass  # Super object function is overridden only if needed
+		"""
+		Deprecated, heartbeats are not broadcasted anymore and this is never called.
+		Subscribe with DeviceManager.subscribeHeartbeats instead
+		"""
+		pass
 
 
 	def onDeviceStatus(self, session):
@@ -0,0 +1,115 @@
+#  Copyright (c) 2021
+#
+#  This file, SkillRegistry.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.04.13 at 12:56:47 CEST
+
+import json
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class SkillRecord(object):
+	"""
+	What the skills table tells about an installed skill
+	"""
+	skillName: str
+	active: bool = True
+
+
+class SkillRegistry(object):
+	"""
+	Keeps the skills database state and install files in memory. Install files are only parsed
+	again once invalidated or if they changed on disk
+	"""
+
+	def __init__(self):
+		self._records: Dict[str, SkillRecord] = dict()
+		self._installers: Dict[str, Tuple[int, dict]] = dict()
+		self._lock = threading.Lock()
+
+
+	def load(self, rows: List[dict]):
+		"""
+		Replaces the known skills with the given skills table rows
+		:param rows:
+		:return:
+		"""
+		records = dict()
+		for row in rows:
+			records[row['skillName']] = SkillRecord(skillName=row['skillName'], active=int(row.get('active', 1)) == 1)
+
+		with self._lock:
+			self._records = records
+
+
+	def get(self, skillName: str) -> Optional[SkillRecord]:
+		return self._records.get(skillName, None)
+
+
+	def add(self, skillName: str, active: bool = True):
+		with self._lock:
+			self._records[skillName] = SkillRecord(skillName=skillName, active=active)
+
+
+	def remove(self, skillName: str):
+		with self._lock:
+			self._records.pop(skillName, None)
+			self._installers.pop(skillName, None)
+
+
+	def isActive(self, skillName: str) -> Optional[bool]:
+		"""
+		:param skillName:
+		:return: The skill active state, None if the skill is unknown
+		"""
+		record = self._records.get(skillName, None)
+		return record.active if record else None
+
+
+	def setActive(self, skillName: str, active: bool):
+		record = self._records.get(skillName, None)
+		if record:
+			record.active = active
+
+
+	def installer(self, skillName: str, installFile: Path) -> dict:
+		"""
+		Returns the skill install file content, parsed only once as long as the file isn't modified
+		:param skillName:
+		:param installFile: Where to read it from if not loaded yet
+		:return:
+		"""
+		modified = installFile.stat().st_mtime_ns
+		cached = self._installers.get(skillName, None)
+		if cached and cached[0] == modified:
+			return cached[1]
+
+		installer = json.loads(installFile.read_text())
+		self._installers[skillName] = (modified, installer)
+		return installer
+
+
+	def invalidate(self, skillName: str):
+		"""
+		Forgets the install file of the given skill, it was installed or updated
+		:param skillName:
+		:return:
+		"""
+		self._installers.pop(skillName, None)
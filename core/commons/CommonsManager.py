@@ -17,13 +17,13 @@
 #
 #  Last modified: 2021.04.13 at 12:56:46 CEST
 
-from collections import defaultdict
 from ctypes import *
 
 import hashlib
 import inspect
 import jinja2
 import json
+import os
 import random
 import requests
 import socket
@@ -42,9 +42,9 @@ from typing import Any, Union
 from uuid import UUID
 
 import core.base.SuperManager as SuperManager
-import core.commons.model.Slot as slotModel
 from core.base.model.Manager import Manager
 from core.commons import constants
+from core.commons.model.ParsedMessage import ParsedMessage
 from core.commons.model.PartOfDay import PartOfDay
 from core.dialog.model.DialogSession import DialogSession
 from core.webui.model.UINotificationType import UINotificationType
@@ -53,6 +53,11 @@ from core.webui.model.UINotificationType import UINotificationType
 class CommonsManager(Manager):
 	ERROR_HANDLER_FUNC = CFUNCTYPE(None, c_char_p, c_int, c_char_p, c_int, c_char_p)
 
+	DOWNLOAD_CHUNK_SIZE = 64 * 1024  # What a dropped connection loses at most
+	DOWNLOAD_BUFFER_SIZE = 1024 * 1024
+	DOWNLOAD_ATTEMPTS = 5
+	DOWNLOAD_RETRY_DELAY = 2
+
 
 	def __init__(self):
 		super().__init__(name='Commons')
@@ -131,59 +136,30 @@ class CommonsManager(Manager):
 
 	@staticmethod
 	def payload(message: MQTTMessage) -> dict:
-		try:
-			payload = json.loads(message.payload)
-			if isinstance(payload, bool):
-				message.payload = payload
-				raise TypeError
-		except (ValueError, TypeError):
-			var = message.topic.split('/')[-1]
-			payload = {var: message.payload}
-
-		return payload
-
-
-	@classmethod
-	def parseSlotsToObjects(cls, message: MQTTMessage) -> dict:
-		slots = defaultdict(list)
-		data = cls.payload(message)
+		if isinstance(message, ParsedMessage):
+			return message.data
 
-		if not isinstance(data, dict):
-			return dict()
-
-		for slotData in data.get('slots', dict()):
-			slot = slotModel.Slot(**slotData)
-			slots[slot.slotName].append(slot)
-		return slots
+		return ParsedMessage.decode(message)
 
 
-	@classmethod
-	def parseSlots(cls, message: MQTTMessage) -> dict:
-		data = cls.payload(message)
-
-		if not isinstance(data, dict):
-			return dict()
-
-		return {slot['slotName']: slot['rawValue'] for slot in data.get('slots', dict())}
+	@staticmethod
+	def parseSlotsToObjects(message: MQTTMessage) -> dict:
+		return ParsedMessage.fromMessage(message).slotsAsObjects
 
 
-	@classmethod
-	def parseSessionId(cls, message: MQTTMessage) -> Union[str, bool]:
-		data = cls.payload(message)
+	@staticmethod
+	def parseSlots(message: MQTTMessage) -> dict:
+		return ParsedMessage.fromMessage(message).slots
 
-		if not isinstance(data, dict):
-			return False
 
-		return data.get('sessionId', False)
+	@staticmethod
+	def parseSessionId(message: MQTTMessage) -> Union[str, bool]:
+		return ParsedMessage.fromMessage(message).sessionId
 
 
-	@classmethod
-	def parseCustomData(cls, message: MQTTMessage) -> dict:
-		try:
-			data = cls.payload(message)
-			return json.loads(data['customData'])
-		except (ValueError, TypeError, KeyError):
-			return dict()
+	@staticmethod
+	def parseCustomData(message: MQTTMessage) -> dict:
+		return ParsedMessage.fromMessage(message).customData
 
 
 	@classmethod
@@ -357,25 +333,126 @@ class CommonsManager(Manager):
 		return subprocess.run(commands, shell=shell, stdout=stdout, stderr=stderr)
 
 
-	def downloadFile(self, url: str, dest: str) -> bool:
+	def downloadFile(self, url: str, dest: str, checksum: str = '', algorithm: str = 'sha256') -> bool:
+		"""
+		Downloads the given url to dest. The data goes to a .part file first, which is resumed if the
+		connection drops and only renamed to dest once complete and verified
+		:param url:
+		:param dest:
+		:param checksum: Expected hex digest of the file, if known. Without it, only the size is verified
+		:param algorithm: hashlib algorithm the checksum was made with
+		:return:
+		"""
 		if not self.Commons.rootDir() in dest:
 			dest = f'{self.Commons.rootDir()}/{dest}'
 
+		destination = Path(dest)
+		partFile = destination.with_name(f'{destination.name}.part')
+
 		key = f'download_{time.time()}'
-		try:
-			self.WebUINotificationManager.newNotification(typ=UINotificationType.INFO, notification='startedDownload', replaceBody=[Path(dest).stem], key=key)
-			with requests.get(url, stream=True) as r:
-				r.raise_for_status()
-				with Path(dest).open('wb') as fp:
-					for chunk in r.iter_content(chunk_size=8192):
-						if chunk:
-							fp.write(chunk)
-			self.WebUINotificationManager.newNotification(typ=UINotificationType.INFO, notification='doneDownload', replaceBody=[Path(dest).stem], key=key)
-			return True
-		except Exception as e:
-			self.logWarning(f'Failed downloading file: {e}')
-			self.WebUINotificationManager.newNotification(typ=UINotificationType.ALERT, notification='failedDownload', replaceBody=[Path(dest).stem], key=key)
-			return False
+		self.WebUINotificationManager.newNotification(typ=UINotificationType.INFO, notification='startedDownload', replaceBody=[destination.stem], key=key)
+
+		for attempt in range(1, self.DOWNLOAD_ATTEMPTS + 1):
+			try:
+				digest = self.downloadPart(url=url, partFile=partFile, algorithm=algorithm)
+				if checksum and digest != checksum.lower():
+					self.discardPart(partFile=partFile)
+					raise Exception(f'Checksum mismatch, expected {checksum} but got {digest}')
+
+				os.replace(partFile, destination)
+				self.discardPart(partFile=partFile)
+				self.WebUINotificationManager.newNotification(typ=UINotificationType.INFO, notification='doneDownload', replaceBody=[destination.stem], key=key)
+				return True
+			except Exception as e:
+				self.logWarning(f'Failed downloading file, attempt {attempt}/{self.DOWNLOAD_ATTEMPTS}: {e}')
+				if attempt < self.DOWNLOAD_ATTEMPTS:
+					time.sleep(self.DOWNLOAD_RETRY_DELAY * attempt)
+
+		self.WebUINotificationManager.newNotification(typ=UINotificationType.ALERT, notification='failedDownload', replaceBody=[destination.stem], key=key)
+		return False
+
+
+	def downloadPart(self, url: str, partFile: Path, algorithm: str = 'sha256') -> str:
+		"""
+		Downloads url into partFile, resuming where the part file ends if the server supports range requests.
+		The ETag or Last-Modified the part was started with is kept next to it and sent as If-Range, so that
+		a part of a file that changed since is never resumed
+		:param url:
+		:param partFile:
+		:param algorithm:
+		:return: The hex digest of the complete file
+		"""
+		validatorFile = self.partValidatorFile(partFile=partFile)
+		validator = ''
+		with suppress(OSError, ValueError):
+			stored = json.loads(validatorFile.read_text())
+			if stored.get('url') == url:
+				# Weak ETags can't be used with If-Range
+				validator = stored.get('etag', '') if not stored.get('etag', '').startswith('W/') else ''
+				validator = validator or stored.get('lastModified', '')
+
+		if not validator:
+			# Nothing tells where the part comes from
+			self.discardPart(partFile=partFile)
+
+		hasher = hashlib.new(algorithm)
+		offset = 0
+		if partFile.exists():
+			with partFile.open('rb') as fp:
+				for chunk in iter(lambda: fp.read(self.DOWNLOAD_BUFFER_SIZE), b''):
+					hasher.update(chunk)
+					offset += len(chunk)
+
+		headers = {'Range': f'bytes={offset}-', 'If-Range': validator} if offset else dict()
+		with requests.get(url, stream=True, headers=headers, timeout=(10, 60)) as r:
+			if offset and r.status_code == 416:
+				# Nothing left to fetch, if the previous attempt got exactly the whole file
+				total = r.headers.get('Content-Range', '').rpartition('/')[2]
+				if total.isdigit() and int(total) == offset:
+					return hasher.hexdigest()
+
+				self.discardPart(partFile=partFile)
+				raise Exception(f'Partial download of {offset} bytes does not match the remote file of {total or "unknown"} bytes')
+
+			r.raise_for_status()
+
+			if offset and (r.status_code != 206 or not r.headers.get('Content-Range', '').startswith(f'bytes {offset}-')):
+				self.logInfo('Remote file changed or server does not support resuming, restarting download')
+				hasher = hashlib.new(algorithm)
+				offset = 0
+
+			expected = r.headers.get('Content-Range', '').rpartition('/')[2] if offset else r.headers.get('Content-Length', '')
+			with partFile.open('ab' if offset else 'wb', buffering=self.DOWNLOAD_BUFFER_SIZE) as fp:
+				if not offset:
+					validatorFile.write_text(json.dumps({'url': url, 'etag': r.headers.get('ETag', ''), 'lastModified': r.headers.get('Last-Modified', '')}))
+
+				for chunk in r.iter_content(chunk_size=self.DOWNLOAD_CHUNK_SIZE):
+					if chunk:
+						fp.write(chunk)
+						hasher.update(chunk)
+						offset += len(chunk)
+
+		if expected.isdigit() and offset != int(expected):
+			raise Exception(f'Incomplete download, got {offset} of {expected} bytes')
+
+		return hasher.hexdigest()
+
+
+	@staticmethod
+	def partValidatorFile(partFile: Path) -> Path:
+		return partFile.with_name(f'{partFile.name}{constants.JSON_EXT}')
+
+
+	@classmethod
+	def discardPart(cls, partFile: Path):
+		"""
+		Deletes a part file and the validators it was downloaded with
+		:param partFile:
+		:return:
+		"""
+		for file in (partFile, cls.partValidatorFile(partFile=partFile)):
+			with suppress(FileNotFoundError):
+				file.unlink()
 
 
 	@staticmethod
@@ -383,6 +460,17 @@ class CommonsManager(Manager):
 		return hashlib.blake2b(file.read_bytes()).hexdigest()
 
 
+	@staticmethod
+	def contentId(*parts: str, length: int = 11) -> str:
+		"""
+		Returns an id derived from the given parts. Identical parts always give the same id
+		:param parts: The strings the id is built upon
+		:param length: The id length, 32 max
+		:return:
+		"""
+		return hashlib.blake2b('\x1f'.join(parts).encode(), digest_size=16).hexdigest()[:length]
+
+
 	@staticmethod
 	def randomString(length: int) -> str:
 		chars = string.ascii_letters + string.digits
@@ -104,6 +104,8 @@ TOPIC_SKILL_ACTIVATED                  = 'projectalice/skills/activated'
 TOPIC_SKILL_DEACTIVATED                = 'projectalice/skills/deactivated'
 TOPIC_STOP_DND                         = 'projectalice/devices/startListen'
 TOPIC_SYSLOG                           = 'projectalice/logging/syslog'
+TOPIC_SYSLOG_BATCH                     = 'projectalice/logging/syslogBatch'
+TOPIC_SYSLOG_LISTEN                    = 'projectalice/logging/listen'
 TOPIC_TOGGLE_DND                       = 'projectalice/devices/toggleListen'
 TOPIC_UI_NOTIFICATION                  = 'projectalice/notifications/ui/notification'
 
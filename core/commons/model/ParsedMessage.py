@@ -0,0 +1,132 @@
+#  Copyright (c) 2021
+#
+#  This file, ParsedMessage.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.04.13 at 12:56:46 CEST
+
+from __future__ import annotations
+
+import json
+from collections import defaultdict
+from typing import Any, Optional
+
+from paho.mqtt.client import MQTTMessage
+
+from core.commons.model.Slot import Slot
+
+
+class ParsedMessage(MQTTMessage):
+	"""
+	A mqtt message that decodes its payload only once. The decoded payload, slots and custom data
+	are cached until the payload is replaced
+	"""
+
+	def __init__(self, mid: int = 0, topic: bytes = b''):
+		self._data = None
+		self._slots = None
+		self._slotsAsObjects = None
+		self._customData = None
+		super().__init__(mid=mid, topic=topic)
+
+
+	@classmethod
+	def fromMessage(cls, message: MQTTMessage) -> ParsedMessage:
+		if isinstance(message, cls):
+			return message
+
+		parsed = cls()
+		if isinstance(message, MQTTMessage):
+			for attribute in MQTTMessage.__slots__:
+				if hasattr(message, attribute):
+					setattr(parsed, attribute, getattr(message, attribute))
+		else:
+			parsed._topic = str(message.topic).encode()
+			parsed.payload = message.payload
+		return parsed
+
+
+	@staticmethod
+	def decode(message: MQTTMessage) -> Any:
+		try:
+			payload = json.loads(message.payload)
+			if isinstance(payload, bool):
+				message.payload = payload
+				raise TypeError
+		except (ValueError, TypeError):
+			var = message.topic.split('/')[-1]
+			payload = {var: message.payload}
+
+		return payload
+
+
+	@property
+	def payload(self) -> Any:
+		return MQTTMessage.payload.__get__(self)
+
+
+	@payload.setter
+	def payload(self, value: Any):
+		MQTTMessage.payload.__set__(self, value)
+		self._data = None
+		self._slots = None
+		self._slotsAsObjects = None
+		self._customData = None
+
+
+	@property
+	def data(self) -> Any:
+		if self._data is None:
+			self._data = self.decode(self)
+		return self._data
+
+
+	@property
+	def slots(self) -> dict:
+		if self._slots is None:
+			data = self.data
+			self._slots = {slot['slotName']: slot['rawValue'] for slot in data.get('slots', dict())} if isinstance(data, dict) else dict()
+		return self._slots
+
+
+	@property
+	def slotsAsObjects(self) -> dict:
+		if self._slotsAsObjects is None:
+			slots = defaultdict(list)
+			data = self.data
+
+			if isinstance(data, dict):
+				for slotData in data.get('slots', dict()):
+					slot = Slot(**slotData)
+					slots[slot.slotName].append(slot)
+
+			self._slotsAsObjects = slots
+		return self._slotsAsObjects
+
+
+	@property
+	def customData(self) -> dict:
+		if self._customData is None:
+			try:
+				self._customData = json.loads(self.data['customData'])
+			except (ValueError, TypeError, KeyError):
+				self._customData = dict()
+		return dict(self._customData) if isinstance(self._customData, dict) else self._customData
+
+
+	@property
+	def sessionId(self) -> Optional[str]:
+		data = self.data
+		return data.get('sessionId', False) if isinstance(data, dict) else False
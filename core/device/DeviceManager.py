@@ -17,6 +17,7 @@
 #
 #  Last modified: 2021.04.15 at 00:08:34
 
+import heapq
 import importlib
 import socket
 import threading
@@ -24,7 +25,7 @@ import time
 import uuid
 from paho.mqtt.client import MQTTMessage
 from serial.tools import list_ports
-from typing import Dict, List, Optional, Union
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
 
 from core.base.model.Manager import Manager
 from core.commons import constants
@@ -38,8 +39,10 @@ from core.dialog.model.DialogSession import DialogSession
 
 
 class DeviceManager(Manager):
+	DEPENDENCIES = ('SkillManager', 'LocationManager')
 	DB_DEVICE = 'myDevices'
 	DB_LINKS = 'deviceLinks'
+	FLUSH_DELAY = 0.25  # Seconds device changes are collected before being written and published
 	DATABASE = {
 		DB_DEVICE: [
 			'id INTEGER PRIMARY KEY',
@@ -70,10 +73,19 @@ class DeviceManager(Manager):
 		self._deviceLinks: Dict[int, DeviceLink] = dict()
 		self._deviceTypes: Dict[str, Dict[str, DeviceType]] = dict()
 
-		self._heartbeats = dict()
+		self._devicesByUid: Dict[str, Device] = dict()
+		self._heartbeats: Dict[str, float] = dict()
+		self._heartbeatExpiries: List[Tuple[float, str]] = list()  # Min heap of the next time each device has to be checked
+		self._heartbeatScheduled: Set[str] = set()
+		self._heartbeatsLock = threading.Lock()
 		self._heartbeatsCheckTimer = None
+		self._heartbeatSubscribers: List[Callable] = list()
 		self._heartbeat: Optional[Heartbeat] = None
 
+		self._dirtyDevices: Dict[int, Device] = dict()
+		self._dirtyLock = threading.Lock()
+		self._flushTimer = None
+
 		self._broadcastFlag = threading.Event()
 		self._listenSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 		self._listenSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -142,11 +154,54 @@ class DeviceManager(Manager):
 		for device in self._devices.values():
 			device.onStop()
 
+		self.flush()
+
 		if self._heartbeat:
 			self._heartbeat.stopHeartBeat()
 		self.MqttManager.publish(topic=constants.TOPIC_CORE_DISCONNECTION)
 
 
+	def markDirty(self, device: Device):
+		"""
+		Schedules the given device to be saved and published with the other devices changed in the next few moments
+		:param device:
+		:return:
+		"""
+		with self._dirtyLock:
+			self._dirtyDevices[device.id] = device
+			if not self._flushTimer:
+				self._flushTimer = self.ThreadManager.newTimer(interval=self.FLUSH_DELAY, func=self.flush)
+
+
+	# noinspection SqlResolve
+	def flush(self):
+		"""
+		Writes all dirty devices in one transaction and publishes each of them once
+		:return:
+		"""
+		with self._dirtyLock:
+			if self._flushTimer:
+				self._flushTimer.cancel()
+				self._flushTimer = None
+
+			# Deleted devices are not brought back
+			devices = [device for deviceId, device in self._dirtyDevices.items() if self._devices.get(deviceId, None) is device]
+			self._dirtyDevices = dict()
+
+		if not devices:
+			return
+
+		self.DatabaseManager.replaceMany(
+			tableName=self.DB_DEVICE,
+			query='REPLACE INTO :__table__ (id, uid, parentLocation, typeName, skillName, settings, deviceParams, deviceConfigs) VALUES (:id, :uid, :parentLocation, :typeName, :skillName, :settings, :deviceParams, :deviceConfigs)',
+			callerName=self.name,
+			values=[device.dbValues() for device in devices]
+		)
+
+		for device in devices:
+			device.publishDevice()
+
+
 	def onSkillDeleted(self, skill: str):
 		# noinspection SqlResolve
 		self.DatabaseManager.delete(
@@ -160,6 +215,7 @@ class DeviceManager(Manager):
 
 	def onSkillDeactivated(self, skill: str):
 		self.removeDeviceTypesForSkill(skillName=skill)
+		self._heartbeatSubscribers = [subscriber for subscriber in self._heartbeatSubscribers if getattr(getattr(subscriber, '__self__', None), 'name', None) != skill]
 		tmp = self._devices.copy()
 		for deviceUid, device in tmp.items():
 			if device.skillName == skill:
@@ -203,23 +259,59 @@ class DeviceManager(Manager):
 	def checkHeartbeats(self):
 		"""
 		Routine that checks all heartbeats and disconnects devices that haven't signaled their presence for hearbeatRate time
+		Only the devices whose heartbeat might have expired are checked
 		:return: None
 		"""
-		now = round(time.time())
-		for uid, lastTime in self._heartbeats.copy().items():
+		now = time.time()
+		due = list()
+		with self._heartbeatsLock:
+			while self._heartbeatExpiries and self._heartbeatExpiries[0][0] <= now:
+				_, uid = heapq.heappop(self._heartbeatExpiries)
+				self._heartbeatScheduled.discard(uid)
+				due.append(uid)
+
+		for uid in due:
+			lastTime = self._heartbeats.get(uid, None)
+			if lastTime is None:
+				continue
+
 			device = self.getDevice(uid=uid)
 			if not device:
 				self._heartbeats.pop(uid, None)
+			elif lastTime + device.heartbeatRate * 2 > now:
+				# It did beat since it was scheduled
+				self.scheduleHeartbeatCheck(uid=uid, expiry=lastTime + device.heartbeatRate * 2)
 			else:
-				if lastTime < now - (device.heartbeatRate * 2):
-					self.logWarning(f'Device **{device.displayName}** has not given a signal since {device.deviceType.heartbeatRate} seconds or more')
-					self._heartbeats.pop(uid, None)
-					device.connected = False
-					self.MqttManager.publish(constants.TOPIC_DEVICE_UPDATED, payload={'device': device.toDict()})
+				self.logWarning(f'Device **{device.displayName}** has not given a signal since {device.deviceType.heartbeatRate} seconds or more')
+				self._heartbeats.pop(uid, None)
+				device.connected = False
+				self.MqttManager.publish(constants.TOPIC_DEVICE_UPDATED, payload={'device': device.toDict()})
+				self.broadcast(method=constants.EVENT_DEVICE_DISCONNECTED, exceptions=[self.name], propagateToSkills=True, uid=uid)
 
 		self._heartbeatsCheckTimer = self.ThreadManager.newTimer(interval=2, func=self.checkHeartbeats)
 
 
+	def scheduleHeartbeatCheck(self, uid: str, expiry: float):
+		with self._heartbeatsLock:
+			if uid in self._heartbeatScheduled:
+				return
+
+			self._heartbeatScheduled.add(uid)
+			heapq.heappush(self._heartbeatExpiries, (expiry, uid))
+
+
+	def refreshHeartbeat(self, device: Device):
+		"""
+		Stores the device heartbeat time, the device is checked once it could have expired
+		:param device:
+		:return:
+		"""
+		now = time.time()
+		self._heartbeats[device.uid] = now
+		if device.uid not in self._heartbeatScheduled:
+			self.scheduleHeartbeatCheck(uid=device.uid, expiry=now + device.heartbeatRate * 2)
+
+
 	def getDevice(self, deviceId: int = None, uid: [str, uuid.UUID] = None) -> Optional[Device]:
 		"""
 		Returns a Device with the provided id or uid, if any
@@ -233,9 +325,19 @@ class DeviceManager(Manager):
 		elif uid:
 			if not isinstance(uid, str):
 				uid = str(uid)
-			for device in self._devices.values():
-				if device.uid == uid:
-					ret = device
+
+			# Heartbeats hit this for every beat, remember where we found devices but make sure they are still valid
+			ret = self._devicesByUid.get(uid, None)
+			if ret and (ret.uid != uid or self._devices.get(ret.id, None) is not ret):
+				ret = None
+
+			if not ret:
+				for device in self._devices.values():
+					if device.uid == uid:
+						ret = device
+
+				if ret:
+					self._devicesByUid[uid] = ret
 		else:
 			raise Exception('Cannot get a device without id or uid')
 
@@ -620,7 +722,7 @@ class DeviceManager(Manager):
 			self.MqttManager.publish(constants.TOPIC_DEVICE_UPDATED, payload={'device': device.toDict()})
 			self.logInfo(f'Device named **{device.displayName}** ({device.uid}) in {self.LocationManager.getLocation(locId=device.parentLocation).name} connected')
 
-		self._heartbeats[uid] = round(time.time())
+		self.refreshHeartbeat(device=device)
 		if not self._heartbeatsCheckTimer:
 			self._heartbeatsCheckTimer = self.ThreadManager.newTimer(interval=2, func=self.checkHeartbeats)
 
@@ -826,15 +928,44 @@ class DeviceManager(Manager):
 		self.broadcast(method=constants.EVENT_STOP_BROADCASTING_FOR_NEW_DEVICE, exceptions=[self.name], propagateToSkills=True)
 
 
-	def onDeviceHeartbeat(self, uid: str, deviceUid: str = None):
+	def deviceHeartbeat(self, uid: str, deviceUid: str = None):
+		"""
+		Called for each device heartbeat. Only refreshes the heartbeat time, unless the device
+		wasn't connected. Heartbeat subscribers get every beat
+		:param uid: The device uid
+		:param deviceUid: Where the heartbeat comes from
+		:return:
+		"""
 		device = self.getDevice(uid=uid)
 
 		if not device:
 			self.logWarning(f'Device with uid **{uid}** does not exist')
 			return
 
-		device.connected = True
-		self._heartbeats[uid] = round(time.time())
+		if not device.connected:
+			self.deviceConnecting(uid=uid)
+		else:
+			self.refreshHeartbeat(device=device)
+
+		for callback in self._heartbeatSubscribers:
+			try:
+				callback(uid=uid, deviceUid=deviceUid)
+			except Exception as e:
+				self.logError(f'Heartbeat subscriber failed: {e}')
+
+
+	def subscribeHeartbeats(self, callback: Callable):
+		"""
+		Heartbeats are not broadcasted, who wants to know about each of them has to subscribe
+		:param callback: Called with uid and deviceUid for every heartbeat
+		:return:
+		"""
+		if callback not in self._heartbeatSubscribers:
+			self._heartbeatSubscribers = [*self._heartbeatSubscribers, callback]
+
+
+	def unsubscribeHeartbeats(self, callback: Callable):
+		self._heartbeatSubscribers = [subscriber for subscriber in self._heartbeatSubscribers if subscriber != callback]
 
 
 	def onDeviceStatus(self, session: DialogSession):
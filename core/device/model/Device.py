@@ -260,48 +260,44 @@ class Device(ProjectAliceObject):
 			self._abilities |= ability.value
 
 
-	# noinspection SqlResolve
 	def saveToDB(self):
 		"""
-		Updates or inserts this device in DB
+		Inserts this device in DB if new, otherwise marks it dirty. The DeviceManager persists and publishes
+		dirty devices in batches, so that many changes in a short time cost a single write
 		:return:
 		"""
 		if self._id != -1:
-			self.DatabaseManager.replace(
-				tableName=self.DeviceManager.DB_DEVICE,
-				query='REPLACE INTO :__table__ (id, uid, parentLocation, typeName, skillName, settings, deviceParams, deviceConfigs) VALUES (:id, :uid, :parentLocation, :typeName, :skillName, :settings, :deviceParams, :deviceConfigs)',
-				callerName=self.DeviceManager.name,
-				values={
-					'id'            : self._id,
-					'uid'           : self._uid,
-					'parentLocation': self._parentLocation,
-					'typeName'      : self._typeName,
-					'skillName'     : self._skillName,
-					'settings'      : json.dumps(self._settings),
-					'deviceParams'  : json.dumps(self._deviceParams),
-					'deviceConfigs' : json.dumps(self._deviceConfigs)
-				}
-			)
-		else:
-			deviceId = self.DatabaseManager.insert(
-				tableName=self.DeviceManager.DB_DEVICE,
-				callerName=self.DeviceManager.name,
-				values={
-					'uid'           : self._uid,
-					'parentLocation': self._parentLocation,
-					'typeName'      : self._typeName,
-					'skillName'     : self._skillName,
-					'settings'      : json.dumps(self._settings),
-					'deviceParams'  : json.dumps(self._deviceParams),
-					'deviceConfigs' : json.dumps(self._deviceConfigs)
-				}
-			)
+			self.DeviceManager.markDirty(self)
+			return
 
-			self._id = deviceId
+		values = self.dbValues()
+		values.pop('id')
+		self._id = self.DatabaseManager.insert(
+			tableName=self.DeviceManager.DB_DEVICE,
+			callerName=self.DeviceManager.name,
+			values=values
+		)
 
 		self.publishDevice()
 
 
+	def dbValues(self) -> dict:
+		"""
+		Returns this device as a row of the devices table
+		:return:
+		"""
+		return {
+			'id'            : self._id,
+			'uid'           : self._uid,
+			'parentLocation': self._parentLocation,
+			'typeName'      : self._typeName,
+			'skillName'     : self._skillName,
+			'settings'      : json.dumps(self._settings),
+			'deviceParams'  : json.dumps(self._deviceParams),
+			'deviceConfigs' : json.dumps(self._deviceConfigs)
+		}
+
+
 	def getLocation(self) -> Optional[Location]:
 		"""
 		Returns the location this device is directly assigned to.
@@ -18,9 +18,7 @@
 #  Last modified: 2021.04.13 at 12:56:46 CEST
 
 import json
-from time import time
-
-import paho.mqtt.client as mqtt
+import threading
 
 from core.base.model.ProjectAliceObject import ProjectAliceObject
 from core.commons import constants
@@ -31,7 +29,6 @@ class Heartbeat(ProjectAliceObject):
 
 	def __init__(self, device: Device, tempo: int = 0, topic: str = constants.TOPIC_CORE_HEARTBEAT):
 		super().__init__()
-		self._client = None
 
 		if tempo == 0:
 			self._tempo = device.deviceType.heartbeatRate
@@ -39,36 +36,37 @@ class Heartbeat(ProjectAliceObject):
 			self._tempo = tempo
 
 		self._topic = topic
-		self._rnd = 0
 		self._device = device
+		self._uid = ''
+		self._payload = b''
+		self._stopFlag = threading.Event()
 		self.startHeartbeat()
 
 
 	def startHeartbeat(self):
-		self._rnd = int(time())
-		self.ThreadManager.newThread(name=f'heartBeatThread-{self._rnd}', target=self.thread)
+		self._stopFlag.clear()
+		self.ThreadManager.newThread(name='heartBeatThread', target=self.thread)
 
 
 	def stopHeartBeat(self):
-		self.ThreadManager.terminateThread(name=f'heartBeatThread-{self._rnd}')
+		self._stopFlag.set()
+		self.ThreadManager.terminateThread(name='heartBeatThread')
 
 
 	def thread(self):
-		self._client = mqtt.Client()
-
-		if self.ConfigManager.getAliceConfigByName('mqttUser') and self.ConfigManager.getAliceConfigByName('mqttPassword'):
-			self._client.username_pw_set(self.ConfigManager.getAliceConfigByName('mqttUser'), self.ConfigManager.getAliceConfigByName('mqttPassword'))
+		while True:
+			self.beat()
+			if self._stopFlag.wait(self._tempo):
+				return
 
-		if self.ConfigManager.getAliceConfigByName('mqttTLSFile'):
-			self._client.tls_set(certfile=self.ConfigManager.getAliceConfigByName('mqttTLSFile'))
-			self._client.tls_insecure_set(False)
 
-		self._client.connect(self.ConfigManager.getAliceConfigByName('mqttHost'), int(self.ConfigManager.getAliceConfigByName('mqttPort')))
-		self._client.loop_start()
-		self.beat()
+	def beat(self):
+		if self.ProjectAlice.shuttingDown:
+			return
 
+		# The payload only changes if the device gets a new uid
+		if self._device.uid != self._uid:
+			self._uid = self._device.uid
+			self._payload = json.dumps({'uid': self._uid}).encode()
 
-	def beat(self):
-		if not self.ProjectAlice.shuttingDown:
-			self._client.publish(topic=self._topic, payload=json.dumps({'uid': self._device.uid}), qos=0, retain=False)
-		self.ThreadManager.newTimer(interval=self._tempo, func=self.beat)
+		self.MqttManager.mqttClient.publish(self._topic, self._payload, 0, False)
@@ -18,21 +18,25 @@
 #  Last modified: 2021.04.13 at 12:56:46 CEST
 
 import json
+import queue
+import threading
 import uuid
 from pathlib import Path
 from threading import Timer
-from typing import Dict, Optional, Set
+from typing import Dict, List, Optional, Set
 
 from paho.mqtt.client import MQTTMessage
 
 from core.base.model.Manager import Manager
 from core.commons import constants
-from core.device.model.DeviceAbility import DeviceAbility
 from core.dialog.model.DialogSession import DialogSession
+from core.device.model.DeviceAbility import DeviceAbility
+from core.dialog.model.EndedSessions import EndedSession, EndedSessions
 from core.voice.WakewordRecorder import WakewordRecorderState
 
 
 class DialogManager(Manager):
+	DEPENDENCIES = ('MqttManager',)
 	DATABASE = {
 		'notRecognizedIntents': [
 			'text TEXT NOT NULL'
@@ -44,10 +48,12 @@ class DialogManager(Manager):
 		super().__init__(databaseSchema=self.DATABASE)
 		self._sessionsById: Dict[str: DialogSession] = dict()
 		self._sessionsByDeviceUids: Dict[str: DialogSession] = dict()
-		self._endedSessions: Dict[str: DialogSession] = dict()
-		self._feedbackSounds: Dict[str: bool] = dict()
+		self._endedSessions = EndedSessions()
+		self._feedbackSounds: Dict[str, bool] = {constants.ALL: True}
 		self._sessionTimeouts: Dict[str, Timer] = dict()
 		self._revivePendingSessions: Dict[str, DialogSession] = dict()
+		self._sessionListeners: Dict[str, List[queue.Queue]] = dict()
+		self._sessionListenersLock = threading.Lock()
 
 		self._disabledByDefaultIntents = set()
 		self._enabledByDefaultIntents = set()
@@ -83,7 +89,9 @@ class DialogManager(Manager):
 
 		self.logDebug(f'Wakeword detected by **{self.DeviceManager.getDevice(uid=deviceUid).displayName}**')
 
-		self._endedSessions[deviceUid] = self._sessionsById.pop(deviceUid, None)
+		previousSession = self._sessionsByDeviceUids.get(deviceUid, None)
+		if previousSession:
+			self._endedSessions.add(previousSession)
 
 		session = self.newSession(deviceUid=deviceUid, user=user)
 		redQueen = self.SkillManager.getSkillInstance('RedQueen')
@@ -106,7 +114,7 @@ class DialogManager(Manager):
 			talkNotification = talkNotification.format('')
 
 		# Play notification if needed
-		if self._feedbackSounds.get('deviceUid', True):
+		if self.feedbackSoundEnabled(deviceUid=deviceUid):
 			self.MqttManager.publish(
 				topic=constants.TOPIC_START_SESSION,
 				payload={
@@ -252,14 +260,18 @@ class DialogManager(Manager):
 			self.forgeUserRandomAnswer(session=session)
 			return
 
-		self.MqttManager.publish(
-			topic=constants.TOPIC_NLU_QUERY,
-			payload={
-				'input'       : session.payload['text'],
-				'intentFilter': session.intentFilter if session.intentFilter else list(self._enabledByDefaultIntents),
-				'sessionId'   : session.sessionId
-			}
-		)
+		intentFilter = session.intentFilter if session.intentFilter else list(self._enabledByDefaultIntents)
+		if self.NluManager.queriedDirectly:
+			self.NluManager.query(session=session, text=session.payload['text'], intentFilter=intentFilter)
+		else:
+			self.MqttManager.publish(
+				topic=constants.TOPIC_NLU_QUERY,
+				payload={
+					'input'       : session.payload['text'],
+					'intentFilter': intentFilter,
+					'sessionId'   : session.sessionId
+				}
+			)
 
 		skill = self.SkillManager.getSkillInstance('ContextSensitive')
 		if skill:
@@ -404,6 +416,7 @@ class DialogManager(Manager):
 
 		self.startSessionTimeout(sessionId=session.sessionId)
 		session.inDialog = True
+		self.notifySessionListeners(sessionId=session.sessionId, event='continue', text=session.payload.get('text', ''), intentFilter=session.intentFilter)
 
 		if 'text' in session.payload and session.payload['text']:
 			self.MqttManager.publish(
@@ -417,6 +430,13 @@ class DialogManager(Manager):
 			)
 
 
+	def onSay(self, session: DialogSession):
+		if session.payload.get('isHotwordNotification', False):
+			return
+
+		self.notifySessionListeners(sessionId=session.sessionId, event='say', text=session.payload.get('text', ''))
+
+
 	def onEndSession(self, session: DialogSession, reason: str = 'nominal'):
 		self.enableCaptureFeedback()
 		text = session.payload.get('text', '')
@@ -455,6 +475,8 @@ class DialogManager(Manager):
 		:return:
 		"""
 		session.hasEnded = True
+		termination = session.payload.get('termination', dict())
+		self.notifySessionListeners(sessionId=session.sessionId, event='ended', reason=termination.get('reason', '') if isinstance(termination, dict) else '')
 
 		self.MqttManager.publish(
 			topic=constants.TOPIC_ASR_TOGGLE_OFF
@@ -480,8 +502,10 @@ class DialogManager(Manager):
 
 
 	def toggleFeedbackSound(self, state: str, deviceUid: str = constants.ALL):
-		topic = constants.TOPIC_TOGGLE_FEEDBACK_ON if state == 'on' else constants.TOPIC_TOGGLE_FEEDBACK_OFF
+		topic = constants.TOPIC_TOGGLE_FEEDBACK_ON if state.lower() == 'on' else constants.TOPIC_TOGGLE_FEEDBACK_OFF
+		self.setFeedbackSound(deviceUid=deviceUid, enabled=state.lower() == 'on')
 
+		# Devices only listen to their own site id
 		if deviceUid == constants.ALL:
 			devices = self.DeviceManager.getDevicesWithAbilities(abilities=[DeviceAbility.PLAY_SOUND, DeviceAbility.CAPTURE_SOUND])
 			for device in devices:
@@ -491,12 +515,29 @@ class DialogManager(Manager):
 			self.MqttManager.publish(topic=topic, payload={'siteId': deviceUid})
 
 
+	def setFeedbackSound(self, deviceUid: str, enabled: bool):
+		"""
+		Sets the feedback sound state for the given device, or for all devices, overriding their own setting
+		:param deviceUid:
+		:param enabled:
+		:return:
+		"""
+		if deviceUid == constants.ALL:
+			self._feedbackSounds = {constants.ALL: enabled}
+		else:
+			self._feedbackSounds[deviceUid] = enabled
+
+
+	def feedbackSoundEnabled(self, deviceUid: str) -> bool:
+		return self._feedbackSounds.get(deviceUid, self._feedbackSounds[constants.ALL])
+
+
 	def onToggleFeedbackOn(self, deviceUid: str):
-		self._feedbackSounds[deviceUid] = True
+		self.setFeedbackSound(deviceUid=deviceUid, enabled=True)
 
 
 	def onToggleFeedbackOff(self, deviceUid: str):
-		self._feedbackSounds[deviceUid] = False
+		self.setFeedbackSound(deviceUid=deviceUid, enabled=False)
 
 
 	def onIntentNotRecognized(self, session: DialogSession):
@@ -523,10 +564,48 @@ class DialogManager(Manager):
 		if not session:
 			return
 
-		self._endedSessions[sessionId] = session
+		self._endedSessions.add(session)
 		self._sessionsByDeviceUids.pop(session.deviceUid, None)
 
 
+	def getEndedSession(self, sessionId: str) -> Optional[EndedSession]:
+		return self._endedSessions.get(sessionId)
+
+
+	def getLastEndedSession(self, deviceUid: str) -> Optional[EndedSession]:
+		return self._endedSessions.getByDeviceUid(deviceUid)
+
+
+	def listenSession(self, sessionId: str) -> queue.Queue:
+		"""
+		Returns a queue fed with what happens in the given session: what Alice says, when she waits for
+		an answer and when the session ends. Call stopListeningSession once done
+		:param sessionId:
+		:return:
+		"""
+		listener = queue.Queue()
+		with self._sessionListenersLock:
+			self._sessionListeners.setdefault(sessionId, list()).append(listener)
+		return listener
+
+
+	def stopListeningSession(self, sessionId: str, listener: queue.Queue):
+		with self._sessionListenersLock:
+			listeners = self._sessionListeners.get(sessionId, list())
+			if listener in listeners:
+				listeners.remove(listener)
+			if not listeners:
+				self._sessionListeners.pop(sessionId, None)
+
+
+	def notifySessionListeners(self, sessionId: str, event: str, **kwargs):
+		with self._sessionListenersLock:
+			listeners = list(self._sessionListeners.get(sessionId, list()))
+
+		for listener in listeners:
+			listener.put({'event': event, 'sessionId': sessionId, **kwargs})
+
+
 	def increaseSessionTimeout(self, session: DialogSession, interval: float):
 		"""
 		This is used by the Tts, so that the timeout is set to the duration of the speech at least
@@ -29,6 +29,8 @@ from core.dialog.model.DialogTemplate import DialogTemplate
 
 
 class DialogTemplateManager(Manager):
+	DEPENDENCIES = ('SkillManager', 'DeviceManager')
+
 
 	def __init__(self):
 		super().__init__()
@@ -17,12 +17,14 @@
 #
 #  Last modified: 2021.04.13 at 12:56:47 CEST
 
+import json
 from collections import deque
 
 from paho.mqtt.client import MQTTMessage
 
 from core.base.model.Manager import Manager
 from core.commons import constants
+from core.commons.model.ParsedMessage import ParsedMessage
 from core.dialog.model import DialogSession
 from core.dialog.model.MultiIntent import MultiIntent
 from core.util.Decorators import deprecated
@@ -56,10 +58,15 @@ class MultiIntentManager(Manager):
 				userInput = userInput.replace(separator, GLUE_SPLITTER)
 
 			if GLUE_SPLITTER in userInput:
+				intents = deque(userInput.split(GLUE_SPLITTER))
 				self._multiIntents[session.sessionId] = MultiIntent(
 					session=session,
 					processedString=userInput,
-					intents=deque(userInput.split(GLUE_SPLITTER)))
+					intents=intents)
+
+				# Parse all the parts at once, the results are then picked from the NLU cache
+				if self.NluManager.canParse:
+					self.NluManager.parseBatch(texts=list(intents), intentFilter=self.intentFilter(session))
 
 				return self.processNextIntent(session)
 
@@ -73,18 +80,28 @@ class MultiIntentManager(Manager):
 			return False
 
 		session.input = intent
-		self.MqttManager.publish(
-			topic=constants.TOPIC_TEXT_CAPTURED,
-			payload={
+
+		# The next part is handled in process, only an external NLU needs it through the broker
+		if self.NluManager.queriedDirectly:
+			self.NluManager.query(session=session, text=intent, intentFilter=self.intentFilter(session))
+		else:
+			message = ParsedMessage(topic=str.encode(constants.TOPIC_TEXT_CAPTURED))
+			message.payload = json.dumps({
 				'sessionId' : session.sessionId,
 				'text'      : intent,
 				'device'    : session.deviceUid,
 				'likelihood': 1,
 				'seconds'   : 1
 			})
+			self.MqttManager.captured(None, None, message)
+
 		return True
 
 
+	def intentFilter(self, session: DialogSession) -> list:
+		return session.intentFilter if session.intentFilter else list(self.DialogManager.getEnabledByDefaultIntents())
+
+
 	@deprecated
 	def queryNLU(self, session: DialogSession, string: str):
 		self.MqttManager.publish(topic=constants.TOPIC_NLU_QUERY, payload={
@@ -27,6 +27,7 @@ from paho.mqtt.client import MQTTMessage
 from core.base.SuperManager import SuperManager
 from core.base.model import Intent
 from core.commons import constants
+from core.commons.model.ParsedMessage import ParsedMessage
 
 
 @dataclass
@@ -70,33 +71,33 @@ class DialogSession(object):
 
 		self.addToHistory(self.intentName)
 
-		commonsManager = SuperManager.getInstance().commonsManager
+		message = ParsedMessage.fromMessage(message)
 		self.message = message
 		self.intentName = message.topic
-		self.payload = commonsManager.payload(message)
-		self.slots = commonsManager.parseSlots(message)
-		self.slotsAsObjects = commonsManager.parseSlotsToObjects(message)
-		self.customData = commonsManager.parseCustomData(message)
+		self.payload = message.data
+		self.slots = dict(message.slots)
+		self.slotsAsObjects = message.slotsAsObjects.copy()
+		self.customData = message.customData
 
 
 	def update(self, message: MQTTMessage):
 		self.addToHistory(self.intentName)
 
-		commonsManager = SuperManager.getInstance().commonsManager
+		message = ParsedMessage.fromMessage(message)
 		self.message = message
 		self.intentName = message.topic
-		self.payload = commonsManager.payload(message)
+		self.payload = message.data
 
 		if not isinstance(self.payload, dict):
 			return
 
-		self.slots.update(commonsManager.parseSlots(message))
-		self.slotsAsObjects.update(commonsManager.parseSlotsToObjects(message))
+		self.slots.update(message.slots)
+		self.slotsAsObjects.update(message.slotsAsObjects)
 		self.text = self.payload.get('text', '')
 		self.input = self.payload.get('input', '')
 
 		if self.customData:
-			self.customData.update(commonsManager.parseCustomData(message))
+			self.customData.update(message.customData)
 		else:
 			self.customData = dict()
 
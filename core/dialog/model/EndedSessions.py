@@ -0,0 +1,113 @@
+#  Copyright (c) 2021
+#
+#  This file, EndedSessions.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.04.13 at 12:56:47 CEST
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from core.dialog.model.DialogSession import DialogSession
+
+
+@dataclass(frozen=True)
+class EndedSession(object):
+	"""
+	What is left of a session once it has ended, enough to revive it
+	"""
+	sessionId: str
+	deviceUid: str
+	user: str
+	intentName: str
+	intentHistory: tuple = field(default_factory=tuple)
+	intentFilter: tuple = field(default_factory=tuple)
+	customData: dict = field(default_factory=dict)
+	endedAt: float = 0
+
+
+	@classmethod
+	def fromSession(cls, session: DialogSession):
+		return cls(
+			sessionId=session.sessionId,
+			deviceUid=session.deviceUid,
+			user=session.user,
+			intentName=str(session.intentName),
+			intentHistory=tuple(str(intent) for intent in session.intentHistory[-2:]),
+			intentFilter=tuple(session.intentFilter),
+			customData=dict(session.customData) if isinstance(session.customData, dict) else dict(),
+			endedAt=time.monotonic()
+		)
+
+
+	@property
+	def previousIntent(self) -> Optional[str]:
+		return self.intentHistory[-1] if self.intentHistory else None
+
+
+	@property
+	def secondLastIntent(self) -> Optional[str]:
+		return self.intentHistory[-2] if len(self.intentHistory) > 1 else None
+
+
+class EndedSessions(object):
+	"""
+	Keeps the last ended sessions, by session id and by device, for a limited time
+	"""
+
+	def __init__(self, maxSize: int = 100, ttl: float = 300):
+		self._maxSize = maxSize
+		self._ttl = ttl
+		self._sessions: OrderedDict = OrderedDict()
+		self._byDeviceUid: Dict[str, str] = dict()
+
+
+	def add(self, session: DialogSession) -> EndedSession:
+		ended = EndedSession.fromSession(session)
+
+		self._sessions.pop(ended.sessionId, None)
+		self._sessions[ended.sessionId] = ended
+		self._byDeviceUid[ended.deviceUid] = ended.sessionId
+		self.evict()
+		return ended
+
+
+	def get(self, sessionId: str) -> Optional[EndedSession]:
+		self.evict()
+		return self._sessions.get(sessionId, None)
+
+
+	def getByDeviceUid(self, deviceUid: str) -> Optional[EndedSession]:
+		self.evict()
+		sessionId = self._byDeviceUid.get(deviceUid, None)
+		return self._sessions.get(sessionId, None) if sessionId else None
+
+
+	def evict(self):
+		expiry = time.monotonic() - self._ttl
+		while self._sessions:
+			sessionId, ended = next(iter(self._sessions.items()))
+			if len(self._sessions) <= self._maxSize and ended.endedAt > expiry:
+				break
+
+			self._sessions.popitem(last=False)
+			if self._byDeviceUid.get(ended.deviceUid) == sessionId:
+				del self._byDeviceUid[ended.deviceUid]
+
+
+	def __len__(self) -> int:
+		return len(self._sessions)
@@ -17,14 +17,30 @@
 #
 #  Last modified: 2021.04.13 at 12:56:47 CEST
 
+import copy
+import json
+import re
 import shutil
+import threading
+import uuid
+from collections import OrderedDict
 from pathlib import Path
+from typing import List, Optional
 
 from core.base.model.Manager import Manager
 from core.base.model.StateType import StateType
+from core.commons import constants
+from core.commons.model.ParsedMessage import ParsedMessage
+from core.dialog.model.DialogSession import DialogSession
+from core.nlu.model.NluEngine import NluEngine
 
 
 class NluManager(Manager):
+	DEPENDENCIES = ('MqttManager',)
+
+
+	PARSE_CACHE_SIZE = 256
+
 
 	def __init__(self):
 		super().__init__()
@@ -33,11 +49,14 @@ class NluManager(Manager):
 		if not self._pathToCache.exists():
 			self._pathToCache.mkdir(parents=True)
 		self._training = False
+		self._parseCache = OrderedDict()
+		self._parseCacheLock = threading.Lock()
+		self._restartLock = threading.Lock()
 
 
 	def onStart(self):
 		super().onStart()
-		self.selectNluEngine()
+		self._nluEngine = self.selectNluEngine()
 
 
 	def onStop(self):
@@ -47,9 +66,37 @@ class NluManager(Manager):
 			self._nluEngine.stop()
 
 
+	def onNluTrained(self, **kwargs):
+		self.clearParseCache()
+
+
 	def restartEngine(self):
-		self.selectNluEngine()
-		self._nluEngine.start()
+		"""
+		Starts a new engine and swaps it in once it answers, the running engine keeps serving meanwhile.
+		Two engines running behind the broker would compete for the same service, that one is restarted in place
+		:return:
+		"""
+		with self._restartLock:
+			engine = self.selectNluEngine()
+			if not engine:
+				return
+
+			previous = self._nluEngine
+			if previous and not previous.queriedDirectly and not engine.queriedDirectly:
+				previous.stop()
+				previous = None
+
+			engine.start()
+			if previous and not engine.waitUntilReady():
+				self.logError(f'{engine.NAME} did not start, {previous.NAME} keeps running')
+				engine.stop()
+				return
+
+			self._nluEngine = engine
+			self.clearParseCache()
+
+			if previous:
+				previous.stop()
 
 
 	def onBooted(self):
@@ -68,21 +115,31 @@ class NluManager(Manager):
 			return True
 
 
-	def selectNluEngine(self):
-		if self._nluEngine:
-			self._nluEngine.stop()
-
-		if self.ConfigManager.getAliceConfigByName('nluEngine') == 'snips':
+	def selectNluEngine(self) -> Optional[NluEngine]:
+		"""
+		Builds the configured engine, without starting it
+		:return:
+		"""
+		userNlu = self.ConfigManager.getAliceConfigByName('nluEngine')
+		if userNlu == 'snips':
 			from core.nlu.model.SnipsNlu import SnipsNlu
 
-			self._nluEngine = SnipsNlu()
+			return SnipsNlu()
+		elif userNlu == 'snipsInProcess':
+			from core.nlu.model.SnipsInProcessNlu import SnipsInProcessNlu
+
+			return SnipsInProcessNlu()
+		elif userNlu == 'snipsWorker':
+			from core.nlu.model.SnipsWorkerNlu import SnipsWorkerNlu
+
+			return SnipsWorkerNlu()
 		else:
 			self.logFatal(f'Unsupported NLU engine: {self.ConfigManager.getAliceConfigByName("nluEngine")}')
 			self.ProjectAlice.onStop()
+			return None
 
 
 	def buildTrainingData(self):
-		self.clearCache()
 		self._nluEngine.convertDialogTemplate(self.DialogTemplateManager.pathToData)
 
 
@@ -95,6 +152,110 @@ class NluManager(Manager):
 		self._nluEngine.train()
 
 
+	@property
+	def canParse(self) -> bool:
+		return self._nluEngine is not None and self._nluEngine.canParse
+
+
+	@property
+	def queriedDirectly(self) -> bool:
+		"""
+		Whether queries are parsed by Alice, even while the engine can't parse, rather than by a service behind the broker
+		:return:
+		"""
+		return self._nluEngine is not None and self._nluEngine.queriedDirectly
+
+
+	def parse(self, text: str, intentFilter: List[str] = None) -> Optional[dict]:
+		return self.parseBatch(texts=[text], intentFilter=intentFilter)[0]
+
+
+	def parseBatch(self, texts: List[str], intentFilter: List[str] = None) -> List[Optional[dict]]:
+		"""
+		Parses the given utterances with the engine, in one call for all the utterances that aren't cached yet
+		:param texts:
+		:param intentFilter:
+		:return: A list of hermes like intent parsed payloads, None for utterances that weren't recognized
+		"""
+		keys = [self.parseCacheKey(text=text, intentFilter=intentFilter) for text in texts]
+		results = dict()
+
+		with self._parseCacheLock:
+			for key in keys:
+				if key in self._parseCache:
+					self._parseCache.move_to_end(key)
+					results[key] = self._parseCache[key]
+
+		# The engine gets what the user said, normalizing is only for the cache key
+		misses = OrderedDict()
+		for key, text in zip(keys, texts):
+			if key not in results:
+				misses.setdefault(key, text)
+
+		if misses:
+			# The engine can be swapped meanwhile, stick to the one we asked
+			engine = self._nluEngine
+			parsed = engine.parseBatch(texts=list(misses.values()), intentFilter=intentFilter)
+			# An engine that is loading or unreachable answers nothing, which mustn't be remembered as not recognized
+			cacheable = engine.canParse and engine is self._nluEngine
+
+			with self._parseCacheLock:
+				for key, result in zip(misses, parsed):
+					results[key] = result
+					if cacheable:
+						self._parseCache[key] = result
+						self._parseCache.move_to_end(key)
+
+				while len(self._parseCache) > self.PARSE_CACHE_SIZE:
+					self._parseCache.popitem(last=False)
+
+		parsedTexts = list()
+		for key, text in zip(keys, texts):
+			result = copy.deepcopy(results[key])
+			if result:
+				result['input'] = text
+			parsedTexts.append(result)
+
+		return parsedTexts
+
+
+	@staticmethod
+	def parseCacheKey(text: str, intentFilter: List[str] = None) -> tuple:
+		return re.sub(r'\s+', ' ', text.strip().lower()), tuple(sorted(intentFilter or list()))
+
+
+	def clearParseCache(self):
+		with self._parseCacheLock:
+			self._parseCache.clear()
+
+
+	def query(self, session: DialogSession, text: str, intentFilter: List[str]):
+		"""
+		Parses the user input directly, without a round trip through the broker. The session is
+		fed the same messages the NLU service would have published. While the engine can't parse,
+		the input is answered as not recognized, nothing would answer it through the broker
+		:param session:
+		:param text:
+		:param intentFilter:
+		:return:
+		"""
+		message = ParsedMessage(topic=str.encode(constants.TOPIC_NLU_QUERY))
+		message.payload = json.dumps({'input': text, 'intentFilter': intentFilter, 'sessionId': session.sessionId})
+		self.MqttManager.nluQuery(None, None, message)
+
+		result = self.parse(text=text, intentFilter=intentFilter) if self.canParse else None
+		if result:
+			result['id'] = str(uuid.uuid4())
+			result['sessionId'] = session.sessionId
+			message = ParsedMessage(topic=str.encode(constants.TOPIC_INTENT_PARSED))
+			message.payload = json.dumps(result)
+			self.MqttManager.intentParsed(None, None, message)
+		else:
+			message = ParsedMessage(topic=str.encode(constants.TOPIC_NLU_INTENT_NOT_RECOGNIZED))
+			message.payload = json.dumps({'id': str(uuid.uuid4()), 'input': text, 'sessionId': session.sessionId})
+			self.MqttManager.nluIntentNotRecognized(None, None, message)
+
+
 	def clearCache(self):
 		shutil.rmtree(self._pathToCache)
 		self._pathToCache.mkdir()
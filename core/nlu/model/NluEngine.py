@@ -18,6 +18,7 @@
 #  Last modified: 2021.04.13 at 12:56:47 CEST
 
 from pathlib import Path
+from typing import List, Optional
 
 from core.base.model.ProjectAliceObject import ProjectAliceObject
 
@@ -38,9 +39,50 @@ class NluEngine(ProjectAliceObject):
 		self.logInfo(f'Stopping {self.NAME}')
 
 
+	def waitUntilReady(self) -> bool:
+		"""
+		Waits for a freshly started engine to answer, before it replaces the running one
+		:return: False if the engine didn't come up
+		"""
+		return True
+
+
 	def train(self):
 		self.logInfo(f'Training {self.NAME}')
 
 
 	def convertDialogTemplate(self, file: Path):
 		self.logFatal(f'NLU Engine {self.NAME} is missing implementation of "convertDialogTemplate"')
+
+
+	@property
+	def canParse(self) -> bool:
+		"""
+		Whether the engine can be queried directly, instead of going through the broker
+		:return:
+		"""
+		return False
+
+
+	@property
+	def queriedDirectly(self) -> bool:
+		"""
+		Whether Alice parses with this engine herself, in which case nothing answers queries sent to the broker
+		:return:
+		"""
+		return False
+
+
+	def parse(self, text: str, intentFilter: List[str] = None) -> Optional[dict]:
+		return self.parseBatch(texts=[text], intentFilter=intentFilter)[0]
+
+
+	def parseBatch(self, texts: List[str], intentFilter: List[str] = None) -> List[Optional[dict]]:
+		"""
+		Parses the given utterances
+		:param texts:
+		:param intentFilter: Only consider these intents, all if empty
+		:return: A list of hermes like intent parsed payloads, None for utterances that weren't recognized
+		"""
+		self.logWarning(f'NLU Engine {self.NAME} does not support direct parsing')
+		return [None for _ in texts]
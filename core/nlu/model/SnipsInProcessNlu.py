@@ -0,0 +1,85 @@
+#  Copyright (c) 2021
+#
+#  This file, SnipsInProcessNlu.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import threading
+from typing import List, Optional
+
+from core.nlu.model.NluEngine import NluEngine
+from core.nlu.model.SnipsNlu import SnipsNlu
+from core.nlu.model.SnipsNluWorker import SnipsNluWorker
+
+
+class SnipsInProcessNlu(SnipsNlu):
+	"""
+	Same training as Snips NLU, but the trained engine is loaded in Alice's process and
+	queried directly instead of running the snips-nlu service behind the broker
+	"""
+	NAME = 'Snips NLU in process'
+	DEPENDENCIES = {
+		'system': [],
+		'pip'   : {
+			'snips-nlu'
+		}
+	}
+
+
+	def __init__(self):
+		super().__init__()
+		self._worker: Optional[SnipsNluWorker] = None
+		self._lock = threading.Lock()
+
+
+	@property
+	def canParse(self) -> bool:
+		return self._worker is not None
+
+
+	@property
+	def queriedDirectly(self) -> bool:
+		return True
+
+
+	def start(self):
+		NluEngine.start(self)
+
+		try:
+			with self._lock:
+				self._worker = SnipsNluWorker(self.enginePath())
+		except Exception as e:
+			self.logError(f'Failed loading Snips NLU engine: {e}')
+			self._worker = None
+
+
+	def waitUntilReady(self) -> bool:
+		return self.canParse
+
+
+	def stop(self):
+		NluEngine.stop(self)
+
+		with self._lock:
+			self._worker = None
+
+
+	def parseBatch(self, texts: List[str], intentFilter: List[str] = None) -> List[Optional[dict]]:
+		with self._lock:
+			if not self._worker:
+				return [None for _ in texts]
+
+			return self._worker.parseBatch(texts=texts, intentFilter=intentFilter)
@@ -17,11 +17,16 @@
 #
 #  Last modified: 2021.05.19 at 12:56:47 CEST
 
+import hashlib
 import json
+import os
+import psutil
 import re
 import shutil
+import time
 from pathlib import Path
 from subprocess import CompletedProcess
+from typing import List
 
 from core.commons import constants
 from core.nlu.model.NluEngine import NluEngine
@@ -32,6 +37,8 @@ from core.webui.model.UINotificationType import UINotificationType
 class SnipsNlu(NluEngine):
 	NAME = 'Snips NLU'
 	UTTERANCE_REGEX = re.compile('{(.+?:=>.+?)}')
+	TRAINING_NICENESS = 19
+	TRAINING_MEMORY_RATIO = 0.75
 
 
 	def __init__(self):
@@ -62,67 +69,115 @@ class SnipsNlu(NluEngine):
 	def convertDialogTemplate(self, file: Path):
 		self.logInfo(f'Preparing NLU training file')
 		dialogTemplate = json.loads(file.read_text())
+		language = self.getLanguage()
 
 		nluTrainingSample = dict()
-		nluTrainingSample['language'] = self.getLanguage()
+		nluTrainingSample['language'] = language
 		nluTrainingSample['entities'] = dict()
 		nluTrainingSample['intents'] = dict()
 
-		for skill in dialogTemplate:
-			for entity in skill['slotTypes']:
-				nluTrainingSampleEntity = nluTrainingSample['entities'].setdefault(entity['name'], dict())
+		fragments = set()
+		for skill in sorted(dialogTemplate, key=lambda template: template['skill']):
+			fragment = self.skillTrainingFragment(skill=skill, language=language)
+			fragments.add(f'{skill["skill"]}_{language}')
 
-				nluTrainingSampleEntity['automatically_extensible'] = entity['automaticallyExtensible']
-				nluTrainingSampleEntity['matching_strictness'] = entity['matchingStrictness'] or 1.0
-				nluTrainingSampleEntity['use_synonyms'] = entity['useSynonyms']
+			nluTrainingSample['entities'].update(fragment['entities'])
+			nluTrainingSample['intents'].update(fragment['intents'])
 
-				nluTrainingSampleEntity['data'] = [{
+		# Drop fragments of skills that are gone
+		for fragmentFile in self._cachePath.glob(f'*_{language}{constants.JSON_EXT}'):
+			if fragmentFile.stem not in fragments:
+				fragmentFile.unlink()
+
+		with Path(self._cachePath / f'{language}.json').open('w') as fp:
+			json.dump(nluTrainingSample, fp, ensure_ascii=False, sort_keys=True)
+
+
+	def skillTrainingFragment(self, skill: dict, language: str) -> dict:
+		"""
+		Returns the training data for the given skill dialog template. Fragments are cached per skill
+		and are only converted again if the skill dialog template changed
+		:param skill: The skill dialog template, as dumped by the dialog template manager
+		:param language:
+		:return:
+		"""
+		checksum = hashlib.blake2b(f'{language}{json.dumps(skill, sort_keys=True, ensure_ascii=False)}'.encode()).hexdigest()
+		fragmentFile = self._cachePath / f'{skill["skill"]}_{language}{constants.JSON_EXT}'
+
+		if fragmentFile.exists():
+			try:
+				fragment = json.loads(fragmentFile.read_text())
+				if fragment.get('checksum') == checksum:
+					return fragment
+			except ValueError:
+				pass
+
+		self.logInfo(f'Converting dialog template for skill **{skill["skill"]}**')
+		fragment = self.convertSkillTemplate(skill)
+		fragment['checksum'] = checksum
+		fragmentFile.write_text(json.dumps(fragment, ensure_ascii=False, sort_keys=True))
+
+		return fragment
+
+
+	def convertSkillTemplate(self, skill: dict) -> dict:
+		fragment = {
+			'entities': dict(),
+			'intents' : dict()
+		}
+
+		for entity in skill['slotTypes']:
+			fragment['entities'][entity['name']] = {
+				'automatically_extensible': entity['automaticallyExtensible'],
+				'matching_strictness'     : entity['matchingStrictness'] or 1.0,
+				'use_synonyms'            : entity['useSynonyms'],
+				'data'                    : [{
 					'value'   : value['value'],
 					'synonyms': value.get('synonyms', list())
 				} for value in entity['values'] if value is not None
 				]
+			}
 
-			for intent in skill['intents']:
-				intentName = intent['name']
-				slots = self.loadSlots(intent)
-				nluTrainingSample['intents'][intentName] = {'utterances': list()}
-
-				for utterance in intent['utterances']:
-					data = list()
-					result = self.UTTERANCE_REGEX.split(utterance)
-					if not result:
-						data.append({
-							'text': utterance
-						})
-					else:
-						for match in result:
-							if ':=>' not in match:
-								data.append({
-									'text': match
-								})
-								continue
+		for intent in skill['intents']:
+			intentName = intent['name']
+			slots = self.loadSlots(intent)
+			fragment['intents'][intentName] = {'utterances': list()}
+
+			for utterance in intent['utterances']:
+				data = list()
+				result = self.UTTERANCE_REGEX.split(utterance)
+				if not result:
+					data.append({
+						'text': utterance
+					})
+				else:
+					for match in result:
+						if ':=>' not in match:
+							data.append({
+								'text': match
+							})
+							continue
 
-							text, slotName = match.split(':=>')
-							entity = slots.get(slotName, None)
+						text, slotName = match.split(':=>')
+						entity = slots.get(slotName, None)
 
-							if not entity:
-								self.logWarning(f'Slot named "{slotName}" with text "{text}" in utterance "{utterance}" doesn\'t have any matching slot definition, skipping to avoid NLU training failure')
-								continue
+						if not entity:
+							self.logWarning(f'Slot named "{slotName}" with text "{text}" in utterance "{utterance}" doesn\'t have any matching slot definition, skipping to avoid NLU training failure')
+							continue
 
-							if entity.startswith('snips/'):
-								nluTrainingSample['entities'][entity] = dict()
+						if entity.startswith('snips/'):
+							fragment['entities'][entity] = dict()
 
-							data.append({
-								'entity'   : entity,
-								'slot_name': slotName,
-								'text'     : text
-							})
+						data.append({
+							'entity'   : entity,
+							'slot_name': slotName,
+							'text'     : text
+						})
 
-					# noinspection PyTypeChecker
-					nluTrainingSample['intents'][intentName]['utterances'].append({'data': data})
+				# noinspection PyTypeChecker
+				fragment['intents'][intentName]['utterances'].append({'data': data})
 
-		with Path(self._cachePath / f'{self.getLanguage()}.json').open('w') as fp:
-			json.dump(nluTrainingSample, fp, ensure_ascii=False)
+		return fragment
 
 
 	def train(self):
@@ -144,40 +199,62 @@ class SnipsNlu(NluEngine):
 				dataset['entities'].update(trainingData['entities'])
 				dataset['intents'].update(trainingData['intents'])
 
-			datasetFile = Path('/tmp/snipsNluDataset.json')
+			serializedDataset = json.dumps(dataset, ensure_ascii=False, indent='\t', sort_keys=True)
+			checksum = hashlib.blake2b(serializedDataset.encode()).hexdigest()
 
-			with datasetFile.open('w') as fp:
-				json.dump(dataset, fp, ensure_ascii=False, indent='\t')
+			if checksum == self.trainedDatasetChecksum() and self.enginePath().exists():
+				self.logInfo('NLU dataset unchanged, skipping training')
+				self.NluManager.training = False
+				return
+
+			datasetFile = Path('/tmp/snipsNluDataset.json')
+			datasetFile.write_text(serializedDataset)
 
 			self.logInfo('Generated dataset for training')
 
-			# Now that we have generated the dataset, let's train in the background if we are already booted, else do it directly
-			if self.ProjectAlice.isBooted:
-				self.ThreadManager.newThread(name='NLUTraining', target=self.nluTrainingThread, args=[datasetFile])
+			# Now that we have generated the dataset, let's train in the background if we are already booted or have a working engine
+			# to boot with, else do it directly
+			if self.ProjectAlice.isBooted or self.enginePath().exists():
+				self.ThreadManager.newThread(name='NLUTraining', target=self.nluTrainingThread, args=[datasetFile, checksum])
 			else:
-				self.nluTrainingThread(datasetFile)
+				self.nluTrainingThread(datasetFile, checksum)
 		except:
 			self.NluManager.training = False
 
 
-	def nluTrainingThread(self, datasetFile: Path):
+	def enginePath(self) -> Path:
+		return Path(self.Commons.rootDir(), f'trained/assistants/{self.LanguageManager.activeLanguage}/nlu_engine')
+
+
+	def trainedDatasetChecksum(self) -> str:
+		"""
+		Returns the checksum of the dataset the current engine was trained with
+		:return:
+		"""
+		checksumFile = self._cachePath / f'{self.getLanguage()}.checksum'
+		return checksumFile.read_text() if checksumFile.exists() else ''
+
+
+	def nluTrainingThread(self, datasetFile: Path, checksum: str = ''):
 		try:
 			with Stopwatch() as stopWatch:
 				self.logInfo('Begin training...')
 				self._timer = self.ThreadManager.newTimer(interval=0.25, func=self.trainingStatus)
 
-				tempTrainingData = Path('/tmp/snipsNLU')
+				# Train next to the live engine, so that the new one can be renamed in place once validated
+				assistantPath = self.enginePath()
+				assistantPath.parent.mkdir(parents=True, exist_ok=True)
+				tempTrainingData = assistantPath.with_name(f'{assistantPath.name}.training')
 
 				if tempTrainingData.exists():
 					shutil.rmtree(tempTrainingData)
 
-				training: CompletedProcess = self.Commons.runSystemCommand([f'./venv/bin/snips-nlu', 'train', str(datasetFile), str(tempTrainingData)])
+				training: CompletedProcess = self.Commons.runSystemCommand(self.trainingCommand(datasetFile=datasetFile, output=tempTrainingData))
 				if training.returncode != 0:
 					self.logError(f'Error while training Snips NLU: {training.stderr.decode()}')
 
-				assistantPath = Path(self.Commons.rootDir(), f'trained/assistants/{self.LanguageManager.activeLanguage}/nlu_engine')
-
-				if not tempTrainingData.exists():
+				if not self.validateEngine(tempTrainingData):
+					shutil.rmtree(tempTrainingData, ignore_errors=True)
 					self.trainingFailed()
 
 					if not assistantPath.exists():
@@ -186,10 +263,12 @@ class SnipsNlu(NluEngine):
 					self._timer.cancel()
 					return
 
-				if assistantPath.exists():
-					shutil.rmtree(assistantPath)
+				newEngine = assistantPath.with_name(f'{assistantPath.name}_{int(time.time() * 1000)}')
+				tempTrainingData.rename(newEngine)
+				self.swapEngine(newEngine)
 
-				shutil.move(tempTrainingData, assistantPath)
+				if checksum:
+					Path(self._cachePath / f'{self.getLanguage()}.checksum').write_text(checksum)
 
 			self._timer.cancel()
 			self.MqttManager.publish(constants.TOPIC_NLU_TRAINING_STATUS, payload={'status': 'done'})
@@ -203,13 +282,82 @@ class SnipsNlu(NluEngine):
 			self.logInfo(f'Snips NLU trained in {stopWatch} seconds')
 
 			self.broadcast(method=constants.EVENT_NLU_TRAINED, exceptions=[constants.DUMMY], propagateToSkills=True)
-			self.NluManager.restartEngine()
+
+			# If not yet booted, the engine is started on boot and will pick the new model
+			if self.ProjectAlice.isBooted:
+				self.NluManager.restartEngine()
 		except:
 			self.trainingFailed()
 		finally:
 			self.NluManager.training = False
 
 
+	def trainingCommand(self, datasetFile: Path, output: Path) -> List[str]:
+		"""
+		Builds the training command. Training runs at the lowest cpu and io priority, off the first
+		cpu core and with a capped memory, so that the running engine and the voice pipeline are not starved
+		:param datasetFile:
+		:param output:
+		:return:
+		"""
+		cmd = ['nice', '-n', str(self.TRAINING_NICENESS), 'ionice', '-c', '3']
+
+		cpuCount = os.cpu_count() or 1
+		if cpuCount > 1:
+			cmd += ['taskset', '-c', f'1-{cpuCount - 1}']
+
+		memoryLimit = int(psutil.virtual_memory().total * self.TRAINING_MEMORY_RATIO)
+		cmd += ['prlimit', f'--data={memoryLimit}']
+
+		return cmd + ['./venv/bin/snips-nlu', 'train', str(datasetFile), str(output)]
+
+
+	@staticmethod
+	def validateEngine(engine: Path) -> bool:
+		"""
+		Checks that a freshly trained engine is complete before using it
+		:param engine:
+		:return:
+		"""
+		try:
+			data = json.loads(Path(engine, 'nlu_engine.json').read_text())
+			return isinstance(data, dict) and bool(data)
+		except (OSError, ValueError):
+			return False
+
+
+	def swapEngine(self, newEngine: Path):
+		"""
+		Atomically points the engine link to the given engine. The previously used engine is kept as fallback,
+		older ones are deleted
+		:param newEngine:
+		:return:
+		"""
+		assistantPath = self.enginePath()
+
+		if assistantPath.is_symlink():
+			previous = os.readlink(assistantPath)
+		elif assistantPath.exists():
+			# Engine trained before engines were versioned, move it aside to replace it by a link
+			previous = f'{assistantPath.name}_legacy'
+			shutil.rmtree(assistantPath.with_name(previous), ignore_errors=True)
+			assistantPath.rename(assistantPath.with_name(previous))
+		else:
+			previous = ''
+
+		link = assistantPath.with_name(f'{assistantPath.name}.link')
+		if link.is_symlink() or link.exists():
+			link.unlink()
+
+		link.symlink_to(newEngine.name, target_is_directory=True)
+		os.replace(link, assistantPath)
+
+		for engine in assistantPath.parent.glob(f'{assistantPath.name}_*'):
+			if engine.name in {newEngine.name, Path(previous).name}:
+				continue
+			shutil.rmtree(engine, ignore_errors=True)
+
+
 	def trainingStatus(self, dots: str = ''):
 		count = dots.count('.')
 		if not dots or count > 7:
@@ -0,0 +1,112 @@
+#  Copyright (c) 2021
+#
+#  This file, SnipsNluWorker.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import os
+import sys
+from contextlib import suppress
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+from pathlib import Path
+from typing import List, Optional
+
+
+try:
+	from snips_nlu import SnipsNLUEngine
+except:
+	pass
+
+
+class SnipsNluWorker(object):
+	"""
+	Loads a trained Snips NLU engine and parses utterances with it. Used in process by SnipsInProcessNlu
+	or run as a persistent worker process, reached over a local socket, by SnipsWorkerNlu:
+		python -m core.nlu.model.SnipsNluWorker <path to nlu_engine> <socket path> <authentication key file>
+	This module must not import any manager, the worker runs standalone
+	"""
+
+	def __init__(self, enginePath: Path):
+		self._engine = SnipsNLUEngine.from_path(str(enginePath))
+
+
+	def parseBatch(self, texts: List[str], intentFilter: List[str] = None) -> List[Optional[dict]]:
+		return [self.parse(text, intentFilter) for text in texts]
+
+
+	def parse(self, text: str, intentFilter: List[str] = None) -> Optional[dict]:
+		"""
+		Parses the given text and returns it as a hermes intent parsed payload
+		:param text:
+		:param intentFilter:
+		:return: None if no intent was recognized
+		"""
+		result = self._engine.parse(text, intents=intentFilter or None)
+		intent = result.get('intent') or dict()
+
+		if not intent.get('intentName'):
+			return None
+
+		return {
+			'input'       : text,
+			'intent'      : {
+				'intentName'     : intent['intentName'],
+				'confidenceScore': intent.get('probability', 0.0)
+			},
+			'slots'       : result.get('slots') or list(),
+			'alternatives': list()
+		}
+
+
+	def serve(self, address: str, authkey: bytes):
+		"""
+		Serves batch parse requests on a unix socket, one connection at a time. Only the owner can
+		reach the socket and clients have to know the key, requests being unpickled.
+		Requests are tuples (texts, intentFilter), responses are the list of results
+		:param address:
+		:param authkey:
+		:return:
+		"""
+		with suppress(FileNotFoundError):
+			Path(address).unlink()
+
+		os.umask(0o077)
+		with Listener(address=address, family='AF_UNIX', authkey=authkey) as listener:
+			os.chmod(address, 0o600)
+			while True:
+				try:
+					connection = listener.accept()
+				except (AuthenticationError, EOFError, ConnectionError):
+					continue  # Unknown client or client gone during the handshake
+				except OSError:
+					return  # Listener closed
+
+				with connection:
+					while True:
+						try:
+							texts, intentFilter = connection.recv()
+						except (EOFError, OSError):
+							break
+
+						try:
+							connection.send(self.parseBatch(texts, intentFilter))
+						except Exception:
+							connection.send([None for _ in texts])
+
+
+if __name__ == '__main__':
+	SnipsNluWorker(Path(sys.argv[1])).serve(sys.argv[2], Path(sys.argv[3]).read_bytes())
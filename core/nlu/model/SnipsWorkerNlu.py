@@ -0,0 +1,205 @@
+#  Copyright (c) 2021
+#
+#  This file, SnipsWorkerNlu.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import os
+import threading
+import time
+import uuid
+from contextlib import suppress
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection
+from pathlib import Path
+from typing import List, Optional
+
+from core.nlu.model.NluEngine import NluEngine
+from core.nlu.model.SnipsNlu import SnipsNlu
+
+
+class SnipsWorkerNlu(SnipsNlu):
+	"""
+	Same training as Snips NLU, but the trained engine is loaded by a persistent worker process
+	that is queried over a local socket instead of through the broker
+	"""
+	NAME = 'Snips NLU worker'
+	DEPENDENCIES = {
+		'system': [],
+		'pip'   : {
+			'snips-nlu'
+		}
+	}
+	CONNECT_TIMEOUT = 15  # How long we keep trying to reach a starting worker, in the background
+	PARSE_TIMEOUT = 1  # This is waited on the mqtt network thread, keep it short
+
+
+	def __init__(self):
+		super().__init__()
+		# A new worker is started next to the running one when the engine is swapped, each needs its own socket
+		self._workerId = uuid.uuid4().hex[:8]
+		self._socketPath = Path(self.Commons.rootDir(), f'var/cache/nlu/worker_{self._workerId}.sock')
+		self._keyPath = Path(self.Commons.rootDir(), f'var/cache/nlu/worker_{self._workerId}.key')
+		self._authkey = b''
+		self._connection: Optional[Connection] = None
+		self._lock = threading.Lock()
+		self._reconnecting = threading.Event()
+
+
+	@property
+	def canParse(self) -> bool:
+		return not self._reconnecting.is_set()
+
+
+	@property
+	def queriedDirectly(self) -> bool:
+		return True
+
+
+	def start(self):
+		NluEngine.start(self)
+		self._authkey = self.writeAuthkey()
+		self.SubprocessManager.runSubprocess(
+			name=self.subprocessName,
+			cmd=f'./venv/bin/python -m core.nlu.model.SnipsNluWorker {self.enginePath()} {self._socketPath} {self._keyPath}',
+			autoRestart=True
+		)
+		self.reconnect()
+
+
+	def writeAuthkey(self) -> bytes:
+		"""
+		Creates a new random key the worker and us authenticate with, readable by the owner only
+		:return:
+		"""
+		authkey = os.urandom(32)
+		self._keyPath.parent.mkdir(parents=True, exist_ok=True)
+		with suppress(FileNotFoundError):
+			self._keyPath.unlink()
+
+		fd = os.open(self._keyPath, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+		with os.fdopen(fd, 'wb') as f:
+			f.write(authkey)
+
+		return authkey
+
+
+	def stop(self):
+		NluEngine.stop(self)
+
+		with self._lock:
+			self._disconnect()
+
+		self.SubprocessManager.terminateSubprocess(name=self.subprocessName)
+
+		for path in (self._socketPath, self._keyPath):
+			with suppress(FileNotFoundError):
+				path.unlink()
+
+
+	@property
+	def subprocessName(self) -> str:
+		return f'SnipsNLUWorker_{self._workerId}'
+
+
+	def waitUntilReady(self) -> bool:
+		while self._reconnecting.is_set():
+			time.sleep(0.1)
+
+		return self._connection is not None
+
+
+	def parseBatch(self, texts: List[str], intentFilter: List[str] = None) -> List[Optional[dict]]:
+		"""
+		This runs on the mqtt network thread, it must never wait on a worker that isn't there. A worker
+		that doesn't answer in time isn't retried, we reconnect to it in the background instead
+		"""
+		if not self._lock.acquire(timeout=self.PARSE_TIMEOUT):
+			self.logWarning('NLU worker is busy')
+			return [None for _ in texts]
+
+		try:
+			# The worker might have been restarted in between, in which case the send fails and we reconnect once
+			for _ in range(2):
+				try:
+					connection = self._connect()
+					connection.send((texts, intentFilter))
+				except (OSError, EOFError, AuthenticationError) as e:
+					self.logDebug(f'Lost connection to NLU worker: {e}')
+					self._disconnect()
+					continue
+
+				try:
+					if connection.poll(self.PARSE_TIMEOUT):
+						return connection.recv()
+					self.logWarning('NLU worker did not answer in time')
+				except (OSError, EOFError) as e:
+					self.logDebug(f'Lost connection to NLU worker: {e}')
+
+				# A late answer must not be read as the answer to the next query
+				self._disconnect()
+				break
+			else:
+				self.logWarning('NLU worker is not reachable')
+		finally:
+			self._lock.release()
+
+		self.reconnect()
+		return [None for _ in texts]
+
+
+	def reconnect(self):
+		"""
+		Waits for the worker to be reachable, in the background
+		:return:
+		"""
+		if self._reconnecting.is_set():
+			return
+
+		self._reconnecting.set()
+		self.ThreadManager.newThread(name=f'{self.subprocessName}Connect', target=self._reconnect)
+
+
+	def _reconnect(self):
+		deadline = time.monotonic() + self.CONNECT_TIMEOUT
+		try:
+			while time.monotonic() < deadline:
+				with self._lock:
+					try:
+						self._connect()
+						return
+					except (OSError, EOFError, AuthenticationError):
+						pass
+				time.sleep(0.1)
+		finally:
+			self._reconnecting.clear()
+
+
+	def _connect(self) -> Connection:
+		"""
+		Connects to the worker, with a single attempt
+		:return:
+		"""
+		if not self._connection:
+			self._connection = Client(address=str(self._socketPath), family='AF_UNIX', authkey=self._authkey)
+
+		return self._connection
+
+
+	def _disconnect(self):
+		if self._connection:
+			self._connection.close()
+			self._connection = None
@@ -19,24 +19,27 @@
 
 import json
 import paho.mqtt.client as mqtt
-import paho.mqtt.publish as publish
 import random
 import re
+import time
 import traceback
 import uuid
 from pathlib import Path
-from typing import List, Union
+from typing import Callable, List, Union
 
 from core.base.model.Intent import Intent
 from core.base.model.Manager import Manager
 from core.commons import constants
+from core.commons.model.ParsedMessage import ParsedMessage
 from core.device.model.Device import Device
 from core.device.model.DeviceAbility import DeviceAbility
 
 
 class MqttManager(Manager):
+	DEPENDENCIES = ('WebUINotificationManager', 'LocationManager', 'AudioManager', 'InternetManager', 'UserManager')
 	DEFAULT_CLIENT_EXTENSION = '@mqtt'
 	TOPIC_AUDIO_FRAME = constants.TOPIC_AUDIO_FRAME.replace('{}', '+')
+	SYSLOG_LISTENER_TIMEOUT = 300
 
 
 	def __init__(self):
@@ -45,6 +48,8 @@ class MqttManager(Manager):
 		self._mqttClient = mqtt.Client()
 		self._multiDetectionsHolder = list()
 		self._deactivatedIntents = list()
+		self._syslogListenedUntil = 0
+		self._syslogBatchListenedUntil = 0
 
 		self._audioFrameRegex = re.compile(self.TOPIC_AUDIO_FRAME.replace('+', '(.*)'))
 		self._wakewordDetectedRegex = re.compile(constants.TOPIC_WAKEWORD_DETECTED.replace('{}', '(.*)'))
@@ -61,34 +66,35 @@ class MqttManager(Manager):
 		self._mqttClient.on_connect = self.onConnect
 		self._mqttClient.on_log = self.onLog
 
-		self._mqttClient.message_callback_add(constants.TOPIC_HOTWORD_DETECTED, self.onHotwordDetected)
+		self.addMessageCallback(constants.TOPIC_HOTWORD_DETECTED, self.onHotwordDetected)
 		for username in self.UserManager.getAllUserNames():
-			self._mqttClient.message_callback_add(constants.TOPIC_WAKEWORD_DETECTED.replace('{user}', username), self.onHotwordDetected)
-
-		self._mqttClient.message_callback_add(constants.TOPIC_SESSION_STARTED, self.sessionStarted)
-		self._mqttClient.message_callback_add(constants.TOPIC_ASR_START_LISTENING, self.startListening)
-		self._mqttClient.message_callback_add(constants.TOPIC_ASR_STOP_LISTENING, self.stopListening)
-		self._mqttClient.message_callback_add(constants.TOPIC_ASR_TOGGLE_ON, self.asrToggleOn)
-		self._mqttClient.message_callback_add(constants.TOPIC_ASR_TOGGLE_OFF, self.asrToggleOff)
-		self._mqttClient.message_callback_add(constants.TOPIC_INTENT_PARSED, self.intentParsed)
-		self._mqttClient.message_callback_add(constants.TOPIC_TEXT_CAPTURED, self.captured)
-		self._mqttClient.message_callback_add(constants.TOPIC_TTS_SAY, self.intentSay)
-		self._mqttClient.message_callback_add(constants.TOPIC_TTS_FINISHED, self.sayFinished)
-		self._mqttClient.message_callback_add(constants.TOPIC_SESSION_ENDED, self.sessionEnded)
-		self._mqttClient.message_callback_add(constants.TOPIC_CONTINUE_SESSION, self.continueSession)
-		self._mqttClient.message_callback_add(constants.TOPIC_INTENT_NOT_RECOGNIZED, self.intentNotRecognized)
-		self._mqttClient.message_callback_add(constants.TOPIC_SESSION_QUEUED, self.sessionQueued)
-		self._mqttClient.message_callback_add(constants.TOPIC_NLU_QUERY, self.nluQuery)
-		self._mqttClient.message_callback_add(constants.TOPIC_PARTIAL_TEXT_CAPTURED, self.nluPartialCapture)
-		self._mqttClient.message_callback_add(constants.TOPIC_HOTWORD_TOGGLE_ON, self.hotwordToggleOn)
-		self._mqttClient.message_callback_add(constants.TOPIC_HOTWORD_TOGGLE_OFF, self.hotwordToggleOff)
-		self._mqttClient.message_callback_add(constants.TOPIC_END_SESSION, self.eventEndSession)
-		self._mqttClient.message_callback_add(constants.TOPIC_START_SESSION, self.startSession)
-		self._mqttClient.message_callback_add(constants.TOPIC_DEVICE_HEARTBEAT, self.deviceHeartbeat)
-		self._mqttClient.message_callback_add(constants.TOPIC_TOGGLE_FEEDBACK_ON, self.toggleFeedback)
-		self._mqttClient.message_callback_add(constants.TOPIC_TOGGLE_FEEDBACK_OFF, self.toggleFeedback)
-		self._mqttClient.message_callback_add(constants.TOPIC_NLU_INTENT_NOT_RECOGNIZED, self.nluIntentNotRecognized)
-		self._mqttClient.message_callback_add(constants.TOPIC_NLU_ERROR, self.nluError)
+			self.addMessageCallback(constants.TOPIC_WAKEWORD_DETECTED.replace('{user}', username), self.onHotwordDetected)
+
+		self.addMessageCallback(constants.TOPIC_SESSION_STARTED, self.sessionStarted)
+		self.addMessageCallback(constants.TOPIC_ASR_START_LISTENING, self.startListening)
+		self.addMessageCallback(constants.TOPIC_ASR_STOP_LISTENING, self.stopListening)
+		self.addMessageCallback(constants.TOPIC_ASR_TOGGLE_ON, self.asrToggleOn)
+		self.addMessageCallback(constants.TOPIC_ASR_TOGGLE_OFF, self.asrToggleOff)
+		self.addMessageCallback(constants.TOPIC_INTENT_PARSED, self.intentParsed)
+		self.addMessageCallback(constants.TOPIC_TEXT_CAPTURED, self.captured)
+		self.addMessageCallback(constants.TOPIC_TTS_SAY, self.intentSay)
+		self.addMessageCallback(constants.TOPIC_TTS_FINISHED, self.sayFinished)
+		self.addMessageCallback(constants.TOPIC_SESSION_ENDED, self.sessionEnded)
+		self.addMessageCallback(constants.TOPIC_CONTINUE_SESSION, self.continueSession)
+		self.addMessageCallback(constants.TOPIC_INTENT_NOT_RECOGNIZED, self.intentNotRecognized)
+		self.addMessageCallback(constants.TOPIC_SESSION_QUEUED, self.sessionQueued)
+		self.addMessageCallback(constants.TOPIC_NLU_QUERY, self.nluQuery)
+		self.addMessageCallback(constants.TOPIC_PARTIAL_TEXT_CAPTURED, self.nluPartialCapture)
+		self.addMessageCallback(constants.TOPIC_HOTWORD_TOGGLE_ON, self.hotwordToggleOn)
+		self.addMessageCallback(constants.TOPIC_HOTWORD_TOGGLE_OFF, self.hotwordToggleOff)
+		self.addMessageCallback(constants.TOPIC_END_SESSION, self.eventEndSession)
+		self.addMessageCallback(constants.TOPIC_START_SESSION, self.startSession)
+		self.addMessageCallback(constants.TOPIC_DEVICE_HEARTBEAT, self.deviceHeartbeat)
+		self.addMessageCallback(constants.TOPIC_TOGGLE_FEEDBACK_ON, self.toggleFeedback)
+		self.addMessageCallback(constants.TOPIC_TOGGLE_FEEDBACK_OFF, self.toggleFeedback)
+		self.addMessageCallback(constants.TOPIC_NLU_INTENT_NOT_RECOGNIZED, self.nluIntentNotRecognized)
+		self.addMessageCallback(constants.TOPIC_NLU_ERROR, self.nluError)
+		self.addMessageCallback(constants.TOPIC_SYSLOG_LISTEN, self.syslogListen)
 
 		self.connect()
 
@@ -97,11 +103,11 @@ class MqttManager(Manager):
 		super().onBooted()
 
 		for device in self.DeviceManager.getDevicesWithAbilities(abilities=[DeviceAbility.PLAY_SOUND, DeviceAbility.CAPTURE_SOUND], connectedOnly=False):
-			self._mqttClient.message_callback_add(constants.TOPIC_VAD_UP.format(device.uid), self.onVADUp)
-			self._mqttClient.message_callback_add(constants.TOPIC_VAD_DOWN.format(device.uid), self.onVADDown)
+			self.addMessageCallback(constants.TOPIC_VAD_UP.format(device.uid), self.onVADUp)
+			self.addMessageCallback(constants.TOPIC_VAD_DOWN.format(device.uid), self.onVADDown)
 
-			self._mqttClient.message_callback_add(constants.TOPIC_PLAY_BYTES.format(device.uid), self.topicPlayBytes)
-			self._mqttClient.message_callback_add(constants.TOPIC_PLAY_BYTES_FINISHED.format(device.uid), self.topicPlayBytesFinished)
+			self.addMessageCallback(constants.TOPIC_PLAY_BYTES.format(device.uid), self.topicPlayBytes)
+			self.addMessageCallback(constants.TOPIC_PLAY_BYTES_FINISHED.format(device.uid), self.topicPlayBytesFinished)
 
 
 	def onStop(self):
@@ -109,6 +115,16 @@ class MqttManager(Manager):
 		self.disconnect()
 
 
+	def addMessageCallback(self, topic: str, callback: Callable):
+		"""
+		Adds a callback for the given topic. The callback gets the message wrapped once, so that its payload is only decoded once
+		:param topic:
+		:param callback:
+		:return:
+		"""
+		self._mqttClient.message_callback_add(topic, lambda client, userdata, message: callback(client, userdata, ParsedMessage.fromMessage(message)))
+
+
 	def onLog(self, _client, _userdata, level, buf):
 		if level != 16:
 			self.logError(buf)
@@ -141,6 +157,7 @@ class MqttManager(Manager):
 			(constants.TOPIC_NLU_INTENT_NOT_RECOGNIZED, 0),
 			(constants.TOPIC_START_SESSION, 0),
 			(constants.TOPIC_NLU_ERROR, 0),
+			(constants.TOPIC_SYSLOG_LISTEN, 0),
 			(self.TOPIC_AUDIO_FRAME, 0)
 		]
 
@@ -214,6 +231,7 @@ class MqttManager(Manager):
 			if message.topic == constants.TOPIC_INTENT_PARSED:
 				return
 
+			message = ParsedMessage.fromMessage(message)
 			payload = self.Commons.payload(message)
 			sessionId = self.Commons.parseSessionId(message)
 
@@ -428,7 +446,7 @@ class MqttManager(Manager):
 				else:
 					payload = session.payload
 
-				message = mqtt.MQTTMessage(topic=str.encode(str(intent)))
+				message = ParsedMessage(topic=str.encode(str(intent)))
 				message.payload = json.dumps(payload)
 				self.onMqttMessage(_client=client, _userdata=data, message=message)
 			else:
@@ -606,6 +624,30 @@ class MqttManager(Manager):
 		self.broadcast(method=constants.EVENT_PLAY_BYTES_FINISHED, exceptions=self.name, propagateToSkills=True, deviceUid=deviceUid, sessionId=sessionId)
 
 
+	def syslogListen(self, _client=None, _data=None, msg: mqtt.MQTTMessage = None):
+		"""
+		Someone, usually the web interface, wants the logs mirrored. Listeners have to renew their interest
+		before it times out, any web api request does it for the web interface. Listeners publishing
+		{"batched": true} get one message per flush on the syslog batch topic instead of one per record
+		"""
+		payload = self.Commons.payload(msg) if msg else dict()
+		until = time.monotonic() + self.SYSLOG_LISTENER_TIMEOUT
+		if payload.get('batched', False):
+			self._syslogBatchListenedUntil = until
+		else:
+			self._syslogListenedUntil = until
+
+
+	@property
+	def hasSyslogListener(self) -> bool:
+		return time.monotonic() < self._syslogListenedUntil
+
+
+	@property
+	def hasSyslogBatchListener(self) -> bool:
+		return time.monotonic() < self._syslogBatchListenedUntil
+
+
 	def deviceHeartbeat(self, _client, _data, msg: mqtt.MQTTMessage):
 		payload = self.Commons.payload(msg)
 		uid = payload.get('uid', None)
@@ -613,8 +655,8 @@ class MqttManager(Manager):
 			self.logWarning('Received a device heartbeat without uid')
 			return
 
-		deviceUid = self.Commons.parseDeviceUid(msg)
-		self.broadcast(method=constants.EVENT_DEVICE_HEARTBEAT, exceptions=[self.name], propagateToSkills=True, uid=uid, deviceUid=deviceUid)
+		# Heartbeats are frequent and only matter to the device manager, they are not broadcasted
+		self.DeviceManager.deviceHeartbeat(uid=uid, deviceUid=self.Commons.parseDeviceUid(msg))
 
 
 	def toggleFeedback(self, _client, _data, msg: mqtt.MQTTMessage):
@@ -947,10 +989,7 @@ class MqttManager(Manager):
 		Activates or disables the feedback sounds, on all devices
 		:param state: str On or off
 		"""
-		deviceList = [device.uid for device in self.DeviceManager.getDevicesWithAbilities(abilities=[DeviceAbility.PLAY_SOUND, DeviceAbility.CAPTURE_SOUND])]
-
-		for deviceUid in deviceList:
-			publish.single(constants.TOPIC_TOGGLE_FEEDBACK.format(state.title()), payload=json.dumps({'siteId': deviceUid}), hostname=self.ConfigManager.getAliceConfigByName('mqttHost'))
+		self.DialogManager.toggleFeedbackSound(state=state, deviceUid=constants.ALL)
 
 
 	def onSkillInstalled(self, skill: str):
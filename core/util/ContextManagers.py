@@ -34,5 +34,7 @@ def Online():  # NOSONAR
 				raise
 			else:
 				yield
+	else:
+		internetManager.probeNow()
 
 	raise OfflineError
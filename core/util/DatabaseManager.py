@@ -219,6 +219,50 @@ class DatabaseManager(Manager):
 		return self.insert(tableName, query, callerName, values)
 
 
+	def replaceMany(self, tableName: str, query: str, callerName: str, values: List[dict]) -> bool:
+		"""
+		Replaces several rows in a single transaction
+		:param tableName:
+		:param query:
+		:param callerName:
+		:param values: One dict of values per row
+		:return:
+		"""
+		if not values:
+			return True
+
+		query = self.basicChecks(tableName, query, callerName, values[0])
+		if not query:
+			raise InvalidQuery
+
+		database = self.getConnection()
+		cursor = database.cursor()
+		ret = True
+
+		try:
+			startTime = time.time()
+			cursor.executemany(query, values)
+		except (DbConnectionError, sqlite3.Error) as e:
+			self.logWarning(f'Error replacing data for component **{callerName}** in table **{tableName}**: {e}')
+			database.rollback()
+			ret = False
+		else:
+			database.commit()
+			if self.ConfigManager.getAliceConfigByName('databaseProfiling'):
+				self.logDebug(f'It took {time.time() - startTime} seconds to REPLACE {len(values)} rows in {tableName} DB ')
+
+		try:
+			cursor.close()
+		except Exception as e:
+			self.logError(f'FATAL ERROR: {e}')
+		try:
+			database.close()
+		except Exception as e:
+			self.logError(f'FATAL ERROR: {e}')
+
+		return ret
+
+
 	def insert(self, tableName: str, query: str = None, callerName: str = None, values: dict = None) -> int:
 		"""
 		Insert data in database
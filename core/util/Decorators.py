@@ -159,6 +159,8 @@ def Online(func: Callable = None, text: str = 'offline', offlineHandler: Callabl
 				except:
 					if internetManager.checkOnlineState():
 						raise
+			else:
+				internetManager.probeNow()
 
 			if catchOnly:
 				return
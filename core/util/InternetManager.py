@@ -17,6 +17,9 @@
 #
 #  Last modified: 2021.07.31 at 15:54:28 CEST
 
+import threading
+import time
+
 import requests
 
 from core.base.model.Manager import Manager
@@ -24,12 +27,20 @@ from core.commons import constants
 
 
 class InternetManager(Manager):
+	PROBE_ADDRESS = 'https://api.projectalice.io/generate_204'
+	PROBE_TIMEOUT = (3, 3)  # Connect, read
+	MAX_BACKOFF = 120
+	MIN_PROBE_INTERVAL = 1
+
 
 	def __init__(self):
 		super().__init__()
 		self._online = False
 		self._checkThread = None
 		self._checkFrequency = 2
+		self._backoff = self._checkFrequency
+		self._lastProbe = 0
+		self._probeFlag = threading.Event()
 
 
 	def onStart(self):
@@ -40,11 +51,17 @@ class InternetManager(Manager):
 			# We have 10 positions in the config (from 1 to 10) So the frequency = max / 10 * setting = 2 * setting
 			internetQuality = self.ConfigManager.getAliceConfigByName('internetQuality') or 1
 			self._checkFrequency = internetQuality * 2
+			self._backoff = self._checkFrequency
 			self._checkThread = self.ThreadManager.newThread(name='internetCheckThread', target=self.checkInternet)
 		else:
 			self.logInfo('Configurations set to stay completely offline')
 
 
+	def onStop(self):
+		super().onStop()
+		self._probeFlag.set()
+
+
 	@property
 	def online(self) -> bool:
 		return self._online
@@ -55,16 +72,44 @@ class InternetManager(Manager):
 
 
 	def checkInternet(self):
-		self.checkOnlineState()
-		self.ThreadManager.doLater(interval=self._checkFrequency, func=self.checkInternet)
-
-
-	def checkOnlineState(self, addr: str = 'https://api.projectalice.io/generate_204', silent: bool = False) -> bool:
+		"""
+		Probes the connection every few seconds while online. While offline, the delay between
+		two probes doubles each time, unless a network failure or need is signaled by probeNow
+		"""
+		while self.isActive:
+			if self.checkOnlineState():
+				self._backoff = self._checkFrequency
+				delay = self._checkFrequency
+			else:
+				delay = self._backoff
+				self._backoff = min(self._backoff * 2, self.MAX_BACKOFF)
+
+			self._probeFlag.wait(timeout=delay)
+			self._probeFlag.clear()
+
+			wait = self._lastProbe + self.MIN_PROBE_INTERVAL - time.monotonic()
+			if wait > 0:
+				time.sleep(wait)
+
+
+	def probeNow(self):
+		"""
+		Something network related just failed, or was needed while offline. Probe the connection
+		again without waiting for the next scheduled check
+		"""
+		self._backoff = self._checkFrequency
+		self._probeFlag.set()
+
+
+	def checkOnlineState(self, addr: str = '', silent: bool = False) -> bool:
 		if self.ConfigManager.getAliceConfigByName('stayCompletelyOffline'):
 			return False
 
+		addr = addr or self.PROBE_ADDRESS
+
+		self._lastProbe = time.monotonic()
 		try:
-			online = requests.get(addr).status_code == 204
+			online = requests.get(addr, timeout=self.PROBE_TIMEOUT).status_code == 204
 		except:
 			online = False
 
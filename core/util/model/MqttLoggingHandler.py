@@ -19,55 +19,169 @@
 
 import logging
 import re
+import threading
+from collections import deque
 from datetime import datetime
+from typing import Optional
 
 from core.base.SuperManager import SuperManager
 from core.commons import constants
+from core.util.model.Logger import Logger
 
 
 class MqttLoggingHandler(logging.Handler):
+	"""
+	Mirrors the logs to the web interface. Records are only queued when emitted, a background flusher
+	formats them and publishes them, but only to whoever listens: one message per record on the syslog
+	topic, or one message per flush on the syslog batch topic for the listeners that opted into it
+	"""
 	REGEX = re.compile(r'\[(?P<component>.*?)]\s*(?P<msg>.*)$')
+	HISTORY_SIZE = 250
+	FLUSH_INTERVAL = 250
+	BATCH_VERSION = 1
 
 
 	def __init__(self):
 		super().__init__()
-		self._history = list()
+		self._history = deque(maxlen=self.HISTORY_SIZE)
+		self._pending = deque(maxlen=self.HISTORY_SIZE)
+		self._components = set()
+		self._flushInterval = self.FLUSH_INTERVAL
+		self._stopFlag = threading.Event()
+		self._dropped = 0
+		self._logger = Logger(prepend='[MqttLoggingHandler]')
+		self._queueLock = threading.Lock()
+		self._flushLock = threading.Lock()
+		self._flusher: Optional[threading.Thread] = None
 
 
 	def emit(self, record: logging.LogRecord) -> None:
-		record.msg = self.format(record)
-		matches = self.REGEX.search(record.msg)
+		with self._queueLock:
+			if len(self._pending) == self._pending.maxlen:
+				self._dropped += 1
+			self._pending.append(record)
+
+			if not self._flusher:
+				self._flusher = threading.Thread(name='MqttLoggingFlusher', target=self.flusher, daemon=True)
+				self._flusher.start()
+
+
+	def flusher(self):
+		while True:
+			try:
+				self.loadSettings()
+			except Exception:
+				pass  # Logging from here would feed the queue we are flushing
+
+			if self._stopFlag.wait(self._flushInterval / 1000):
+				return
+
+			try:
+				self.flush()
+			except Exception:
+				pass
+
+
+	def loadSettings(self):
+		superManager = SuperManager.getInstance()
+		if not superManager or not superManager.configManager:
+			return
+
+		configManager = superManager.configManager
+		self.setLevel(configManager.getAliceConfigByName('syslogMirrorLevel') or logging.NOTSET)
+		self._flushInterval = int(configManager.getAliceConfigByName('syslogMirrorInterval') or self.FLUSH_INTERVAL)
+		self._components = {component.strip() for component in (configManager.getAliceConfigByName('syslogMirrorComponents') or '').split(',') if component.strip()}
+
+
+	def flush(self) -> None:
+		with self._queueLock:
+			dropped, self._dropped = self._dropped, 0
+
+		if dropped:
+			# Goes to the other handlers right away and to the mirror on next flush
+			self._logger.doLog(function='warning', msg=f'{dropped} log records were dropped before they could be mirrored', printStack=False)
+
+		payloads = self.drain()
+
+		if self._components:
+			payloads = [payload for payload in payloads if payload['component'] in self._components]
+
+		if not payloads and not dropped:
+			return
+
+		superManager = SuperManager.getInstance()
+		if not superManager or not superManager.mqttManager:
+			return
+
+		mqttManager = superManager.mqttManager
+		if mqttManager.hasSyslogBatchListener:
+			mqttManager.publish(
+				topic=constants.TOPIC_SYSLOG_BATCH,
+				payload={
+					'version': self.BATCH_VERSION,
+					'records': payloads,
+					'dropped': dropped
+				}
+			)
+
+		if mqttManager.hasSyslogListener:
+			for payload in payloads:
+				mqttManager.publish(
+					topic=constants.TOPIC_SYSLOG,
+					payload=payload
+				)
+
+
+	def drain(self) -> list:
+		"""
+		Moves the pending records to the history
+		:return: The payloads of the records that were pending
+		"""
+		with self._queueLock:
+			records = list(self._pending)
+			self._pending.clear()
+
+		payloads = list()
+		with self._flushLock:
+			for record in records:
+				payload = self.toPayload(record)
+				self.saveToHistory(payload)
+				payloads.append(payload)
+
+		return payloads
+
+
+	def toPayload(self, record: logging.LogRecord) -> dict:
+		message = self.format(record)
+		matches = self.REGEX.search(message)
 
 		if matches:
 			component = matches['component']
 			msg = matches['msg']
 		else:
 			component = constants.UNKNOWN
-			msg = record.msg
+			msg = message
 
-		payload = {
-			'time'     : datetime.now().strftime('%H:%M:%S.%f')[:-3],
+		return {
+			'time'     : datetime.fromtimestamp(record.created).strftime('%H:%M:%S.%f')[:-3],
 			'level'    : record.levelname,
 			'msg'      : msg,
 			'component': component
 		}
 
-		self.saveToHistory(payload)
-
-		if SuperManager.getInstance() and SuperManager.getInstance().mqttManager:
-			SuperManager.getInstance().mqttManager.publish(
-				topic=constants.TOPIC_SYSLOG,
-				payload=payload
-			)
-
 
 	def saveToHistory(self, payload: dict):
-		if len(self._history) >= 250:
-			self._history.pop(0)
-
 		self._history.append(payload)
 
 
+	def close(self) -> None:
+		self._stopFlag.set()
+		if self._flusher:
+			self._flusher.join(timeout=1)
+		super().close()
+
+
 	@property
 	def history(self) -> list:
-		return self._history
+		self.drain()
+		return list(self._history)
@@ -19,8 +19,9 @@
 
 import json
 import re
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
 from core.ProjectAliceExceptions import LanguageManagerLangNotSupported
 from core.base.model.Manager import Manager
@@ -28,6 +29,10 @@ from core.base.model.Manager import Manager
 
 class LanguageManager(Manager):
 
+	WEBUI_STRINGS_PATH = Path('system/manager/WebUIManager')
+	WEBUI_STRINGS_CHECK_INTERVAL = 2
+
+
 	def __init__(self):
 		super().__init__()
 		self._supportedLanguages = list()
@@ -40,6 +45,9 @@ class LanguageManager(Manager):
 
 		self._stringsData = dict()
 		self._webUIData = dict()
+		self._webUIFiles = dict()
+		self._webUISerialized = dict()
+		self._webUIChecked = 0
 		self._webUINotifications = dict()
 		self._locals = list()
 
@@ -79,11 +87,60 @@ class LanguageManager(Manager):
 
 
 	def loadWebUIStrings(self) -> dict:
-		for file in Path('system/manager/WebUIManager/').glob('*.json'):
-			self._webUIData[file.stem] = json.loads(file.read_text())
+		"""
+		Loads the web interface strings. Only the files that changed since the last load are read again
+		:return:
+		"""
+		files = {file.stem: file for file in self.WEBUI_STRINGS_PATH.glob('*.json')}
+		changed = False
+
+		for lang in set(self._webUIData) - set(files):
+			self._webUIData.pop(lang, None)
+			self._webUIFiles.pop(lang, None)
+			changed = True
+
+		for lang, file in files.items():
+			modified = file.stat().st_mtime_ns
+			if self._webUIFiles.get(lang) == modified:
+				continue
+
+			try:
+				self._webUIData[lang] = json.loads(file.read_text())
+				self._webUIFiles[lang] = modified
+				changed = True
+			except ValueError:
+				self.logError(f'Web interface strings for **{lang}** are corrupted')
+
+		if changed or not self._webUISerialized:
+			self._webUISerialized = {lang: self.serializeWebUIStrings(data) for lang, data in self._webUIData.items()}
+			self._webUISerialized[''] = self.serializeWebUIStrings(self._webUIData)
+
+		self._webUIChecked = time.monotonic()
 		return self._webUIData
 
 
+	def serializeWebUIStrings(self, data: dict) -> Tuple[str, str]:
+		serialized = json.dumps(data, ensure_ascii=False, sort_keys=True)
+		return serialized, self.Commons.contentId(serialized, length=32)
+
+
+	def getSerializedWebUIStrings(self, lang: str = '') -> Tuple[str, str]:
+		"""
+		Returns the web interface strings already serialized, along their ETag. The files are checked
+		for changes at most every few seconds
+		:param lang: The language to get, all languages if empty
+		:return: json string, etag
+		"""
+		if time.monotonic() - self._webUIChecked > self.WEBUI_STRINGS_CHECK_INTERVAL:
+			self.loadWebUIStrings()
+
+		serialized = self._webUISerialized.get(lang, None)
+		if not serialized:
+			serialized = self.serializeWebUIStrings(dict())
+
+		return serialized
+
+
 	def loadWebUINotifications(self):
 		self._webUINotifications = json.loads(Path('system/manager/LanguageManager/notifications.json').read_text())
 
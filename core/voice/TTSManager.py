@@ -29,6 +29,8 @@ from core.voice.model.Tts import Tts
 
 
 class TTSManager(Manager):
+	DEPENDENCIES = ('MqttManager',)
+
 
 	def __init__(self):
 		super().__init__()
@@ -27,6 +27,8 @@ from core.voice.model.WakewordEngine import WakewordEngine
 
 
 class WakewordManager(Manager):
+	DEPENDENCIES = ('MqttManager',)
+
 
 	def __init__(self):
 		super().__init__()
@@ -20,8 +20,9 @@
 import shutil
 from enum import Enum
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 
+import numpy as np
 from pydub import AudioSegment
 
 from core.base.model.Manager import Manager
@@ -29,7 +30,7 @@ from core.commons import constants
 from core.device.model.DeviceAbility import DeviceAbility
 from core.dialog.model.DialogSession import DialogSession
 from core.voice.model.Wakeword import Wakeword
-from core.voice.model.WakewordUploadThread import WakewordUploadThread
+from core.voice.model.WakewordDistributor import WakewordDelivery, WakewordDistributor
 
 
 class WakewordRecorderState(Enum):
@@ -42,6 +43,7 @@ class WakewordRecorderState(Enum):
 
 
 class WakewordRecorder(Manager):
+	UPLOAD_PORT = 8600
 
 	def __init__(self):
 		super().__init__()
@@ -51,7 +53,7 @@ class WakewordRecorder(Manager):
 		self._audio = None
 		self._wakeword: Optional[Wakeword] = None
 		self._userTuning = 0
-		self._wakewordUploadThreads = list()
+		self._wakewordDistributors: List[WakewordDistributor] = list()
 		self._sampleRate = self.AudioServer.SAMPLERATE
 		self._channels = 1
 		self._gainFix = 0
@@ -65,9 +67,10 @@ class WakewordRecorder(Manager):
 	def onStop(self):
 		super().onStop()
 
-		for thread in self._wakewordUploadThreads:
-			if thread.isAlive():
-				thread.join(timeout=2)
+		for distributor in self._wakewordDistributors:
+			distributor.stop()
+			if distributor.is_alive():
+				distributor.join(timeout=2)
 
 
 	def onCaptured(self, session: DialogSession):
@@ -118,8 +121,7 @@ class WakewordRecorder(Manager):
 		if self._gainFix > 0:
 			sound.append(self._gainFix)
 
-		startTrim = self.detectLeadingSilence(sound)
-		endTrim = self.detectLeadingSilence(sound.reverse())
+		startTrim, endTrim = self.detectSilences(sound)
 		duration = len(sound)
 		trimmed = sound[startTrim: duration - endTrim]
 
@@ -153,12 +155,47 @@ class WakewordRecorder(Manager):
 
 
 	def detectLeadingSilence(self, sound: AudioSegment) -> int:
-		average = sound.dBFS
-		pos = 0
-		while sound[pos: pos + 10].dBFS < (average + self._userTuning) and pos < len(sound):
-			pos += 10
+		return self.detectSilences(sound)[0]
 
-		return pos
+
+	def detectSilences(self, sound: AudioSegment) -> Tuple[int, int]:
+		"""
+		Finds the leading and trailing silences, in one pass over the samples. A 10ms window is silence
+		as long as it is quieter than the sample's average, adjusted by the user tuning
+		:param sound:
+		:return: leading and trailing silence durations, in ms
+		"""
+		dtype = {1: np.int8, 2: np.int16, 4: np.int32}.get(sound.sample_width, None)
+		if dtype:
+			samples = np.frombuffer(sound.raw_data, dtype=dtype).astype(np.float64)
+		else:
+			samples = np.asarray(sound.get_array_of_samples(), dtype=np.float64)
+
+		energy = np.square(samples).reshape(-1, sound.channels).sum(axis=1)
+		frames = len(energy)
+
+		cumulated = np.concatenate(([0.0], np.cumsum(energy)))
+		average = np.sqrt(cumulated[-1] / max(frames * sound.channels, 1))
+		if not average:
+			return 0, 0
+
+		threshold = average * 10 ** (self._userTuning / 20)
+
+		positions = np.arange(0, len(sound), 10)
+		starts = np.minimum((positions * sound.frame_rate / 1000).astype(int), frames)
+		ends = np.minimum(((positions + 10) * sound.frame_rate / 1000).astype(int), frames)
+		sizes = np.maximum(ends - starts, 1) * sound.channels
+
+		leading = np.sqrt((cumulated[ends] - cumulated[starts]) / sizes)
+		trailing = np.sqrt((cumulated[frames - starts] - cumulated[frames - ends]) / sizes)
+
+		return self._firstLoudWindow(leading, threshold), self._firstLoudWindow(trailing, threshold)
+
+
+	@staticmethod
+	def _firstLoudWindow(rms: np.ndarray, threshold: float) -> int:
+		loud = np.flatnonzero(rms >= threshold)
+		return int(loud[0] if loud.size else rms.size) * 10
 
 
 	def tryCaptureFix(self):
@@ -190,26 +227,69 @@ class WakewordRecorder(Manager):
 
 	def _upload(self, path: Path, uid: str = ''):
 		wakewordName, zipPath = self._prepareHotword(path)
+		checksum = self.Commons.fileChecksum(zipPath)
 
+		devices = list()
 		for device in self.DeviceManager.getDevicesWithAbilities(abilities=[DeviceAbility.CAPTURE_SOUND], connectedOnly=True):
 			if uid and device.uid != uid:
 				continue
 
-			port = 8600 + len(self._wakewordUploadThreads)
+			if device.getParam('wakewords', dict()).get(wakewordName, None) == checksum:
+				self.logInfo(f'Device **{device.displayName}** already has wakeword **{wakewordName}**')
+				continue
 
-			payload = {
+			devices.append(device.uid)
+
+		if not devices:
+			return
+
+		distributor = WakewordDistributor(
+			host=self.Commons.getLocalIp(),
+			port=self._freeUploadPort(),
+			zipPath=zipPath,
+			checksum=checksum,
+			devices=devices,
+			callback=self._onWakewordDistributed
+		)
+		self._wakewordDistributors.append(distributor)
+		distributor.start()
+		distributor.waitReady(timeout=5)
+
+		for deviceUid in devices:
+			self.MqttManager.publish(topic=constants.TOPIC_NEW_HOTWORD, payload={
 				'ip'  : self.Commons.getLocalIp(),
-				'port': port,
-				'name': wakewordName
-			}
+				'port': distributor.port,
+				'name': wakewordName,
+				'hash': checksum,
+				'uid' : deviceUid
+			})
+
+
+	def _freeUploadPort(self) -> int:
+		self._wakewordDistributors = [distributor for distributor in self._wakewordDistributors if distributor.is_alive()]
+		used = {distributor.port for distributor in self._wakewordDistributors}
+
+		port = self.UPLOAD_PORT
+		while port in used:
+			port += 1
+		return port
+
+
+	def _onWakewordDistributed(self, distributor: WakewordDistributor):
+		"""
+		Remembers what wakeword version each device confirmed, so it isn't sent again
+		:param distributor:
+		:return:
+		"""
+		for uid, delivery in distributor.deliveries.items():
+			if delivery != WakewordDelivery.SUCCESS:
+				continue
 
-			if uid:
-				payload['uid'] = uid
+			device = self.DeviceManager.getDevice(uid=uid)
+			if not device:
+				continue
 
-			self.MqttManager.publish(topic=constants.TOPIC_NEW_HOTWORD, payload=payload)
-			thread = WakewordUploadThread(host=self.Commons.getLocalIp(), zipPath=zipPath, port=port)
-			self._wakewordUploadThreads.append(thread)
-			thread.start()
+			device.updateParam('wakewords', {**device.getParam('wakewords', dict()), distributor.wakewordName: distributor.checksum})
 
 
 	def _prepareHotword(self, path: Path) -> tuple:
@@ -0,0 +1,186 @@
+#  Copyright (c) 2021
+#
+#  This file, WakewordDistributor.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.04.13 at 12:56:48 CEST
+
+from __future__ import annotations
+
+import socket
+import time
+from enum import Enum
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, List, Optional
+
+from core.util.model.Logger import Logger
+
+
+class WakewordDelivery(Enum):
+	PENDING = 1
+	SUCCESS = 2
+	FAILED = 3
+	TIMEOUT = 4
+
+
+class WakewordDistributor(Thread):
+	"""
+	Serves a wakeword archive to any number of devices at once, on a single port. Devices confirm with
+	'0' on success, '-1' if the download failed or '-2' if the installation failed, optionally followed
+	by ':<device uid>'. Unnamed confirmations are attributed to the only device still pending, if any
+	"""
+
+	ACK_TIMEOUT = 20
+	POLL_INTERVAL = 0.5  # How often pending deliveries and stop requests are looked at while waiting for devices
+
+
+	def __init__(self, host: str, port: int, zipPath: Path, checksum: str, devices: List[str], timeout: float = 60, callback: Optional[Callable[[WakewordDistributor], None]] = None):
+		super().__init__()
+		self._logger = Logger(prepend='[WakewordDistributor]')
+
+		self.daemon = True
+
+		self._host = host
+		self._port = port
+		self._zipPath = Path(zipPath)
+		self._checksum = checksum
+		self._timeout = timeout
+		self._callback = callback
+
+		self._deliveries: Dict[str, WakewordDelivery] = {uid: WakewordDelivery.PENDING for uid in devices}
+		self._lock = Lock()
+		self._ready = Event()
+		self._stopFlag = Event()
+
+
+	@property
+	def wakewordName(self) -> str:
+		return self._zipPath.stem
+
+
+	@property
+	def checksum(self) -> str:
+		return self._checksum
+
+
+	@property
+	def port(self) -> int:
+		return self._port
+
+
+	@property
+	def deliveries(self) -> Dict[str, WakewordDelivery]:
+		with self._lock:
+			return dict(self._deliveries)
+
+
+	def waitReady(self, timeout: float = None) -> bool:
+		return self._ready.wait(timeout)
+
+
+	def stop(self):
+		self._stopFlag.set()
+
+
+	def run(self):
+		connections = list()
+		try:
+			with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+				sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+				sock.bind((self._host, self._port))
+				sock.listen(max(len(self._deliveries), 5))
+				sock.settimeout(self.POLL_INTERVAL)
+				self._port = sock.getsockname()[1]
+				self._ready.set()
+				self._logger.logInfo(f'Serving wakeword **{self.wakewordName}** to {len(self._deliveries)} device(s) on port {self._port}')
+
+				deadline = time.monotonic() + self._timeout
+				while not self._stopFlag.is_set() and time.monotonic() < deadline and self._pending():
+					try:
+						conn, addr = sock.accept()
+					except socket.timeout:
+						continue
+
+					thread = Thread(target=self._serve, args=(conn, addr), daemon=True)
+					connections.append(thread)
+					thread.start()
+
+			for thread in connections:
+				thread.join(timeout=self.ACK_TIMEOUT)
+		except Exception as e:
+			self._logger.logError(f'Error distributing wakeword: {e}')
+		finally:
+			self._ready.set()
+			with self._lock:
+				for uid, delivery in self._deliveries.items():
+					if delivery == WakewordDelivery.PENDING:
+						self._logger.logWarning(f'Device **{uid}** did not confirm wakeword **{self.wakewordName}** in time. The installation might have failed')
+						self._deliveries[uid] = WakewordDelivery.TIMEOUT
+
+			if self._callback:
+				self._callback(self)
+
+
+	def _pending(self) -> bool:
+		with self._lock:
+			return WakewordDelivery.PENDING in self._deliveries.values()
+
+
+	def _serve(self, conn: socket.socket, addr: tuple):
+		try:
+			with conn, self._zipPath.open(mode='rb') as f:
+				conn.sendfile(f)
+				# Lets devices reading until the end of stream know we are done
+				conn.shutdown(socket.SHUT_WR)
+
+				conn.settimeout(self.ACK_TIMEOUT)
+				answer = conn.recv(1024).decode().strip()
+		except socket.timeout:
+			self._logger.logWarning(f'**{addr[0]}** did not confirm wakeword **{self.wakewordName}** in time')
+			return
+		except Exception as e:
+			self._logger.logError(f'Error uploading wakeword to **{addr[0]}**: {e}')
+			return
+
+		code, _, uid = answer.partition(':')
+		if code == '0':
+			self._confirm(uid=uid, addr=addr, delivery=WakewordDelivery.SUCCESS)
+		elif code == '-1':
+			self._logger.logError(f'**{addr[0]}** failed downloading wakeword **{self.wakewordName}**')
+			self._confirm(uid=uid, addr=addr, delivery=WakewordDelivery.FAILED)
+		elif code == '-2':
+			self._logger.logError(f'**{addr[0]}** failed installing wakeword **{self.wakewordName}**')
+			self._confirm(uid=uid, addr=addr, delivery=WakewordDelivery.FAILED)
+		else:
+			self._logger.logWarning(f'**{addr[0]}** closed the connection before confirming wakeword **{self.wakewordName}**')
+
+
+	def _confirm(self, uid: str, addr: tuple, delivery: WakewordDelivery):
+		with self._lock:
+			if not uid:
+				pending = [device for device, state in self._deliveries.items() if state == WakewordDelivery.PENDING]
+				if len(pending) != 1:
+					self._logger.logInfo(f'Wakeword **{self.wakewordName}** confirmation from **{addr[0]}** cannot be attributed to a device')
+					return
+				uid = pending[0]
+
+			if uid not in self._deliveries:
+				return
+
+			self._deliveries[uid] = delivery
+
+		if delivery == WakewordDelivery.SUCCESS:
+			self._logger.logInfo(f'Wakeword **{self.wakewordName}** upload to **{uid}** success')
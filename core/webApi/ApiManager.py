@@ -38,6 +38,7 @@ from core.webApi.model.WidgetsApi import WidgetsApi
 
 
 class ApiManager(Manager):
+	DEPENDENCIES = ('MqttManager',)
 	app = Flask(__name__)
 	app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
 	CORS(app, resources={r'/api/*': {'origins': '*'}}, expose_headers='*', allow_headers='*')
@@ -58,6 +59,9 @@ class ApiManager(Manager):
 		self.app.secret_key = key.encode()
 		self.app.cors_headers = 'Content-Type'
 
+		if self.webInterfaceRequest not in self.app.before_request_funcs.get(None, list()):
+			self.app.before_request(self.webInterfaceRequest)
+
 		for api in self._APIS:
 			try:
 				api.register(self.app)
@@ -68,6 +72,11 @@ class ApiManager(Manager):
 		self.startThread()
 
 
+	def webInterfaceRequest(self):
+		# The web interface is in use, keep mirroring the logs to it
+		self.MqttManager.syslogListen()
+
+
 	def restart(self):
 		self.ThreadManager.terminateThread('API')
 		self.startThread()
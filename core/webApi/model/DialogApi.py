@@ -18,12 +18,15 @@
 #  Last modified: 2021.04.13 at 12:56:49 CEST
 
 import json
+import queue
+import time
+from typing import Generator
 
 from flask import Response, jsonify, request
 from flask_classful import route
-from paho.mqtt.client import MQTTMessage
 
 from core.commons import constants
+from core.commons.model.ParsedMessage import ParsedMessage
 from core.device.model.DeviceAbility import DeviceAbility
 from core.dialog.model.DialogSession import DialogSession
 from core.util.Decorators import ApiAuthenticated
@@ -33,6 +36,9 @@ from core.webApi.model.Api import Api
 class DialogApi(Api):
 	route_base = f'/api/{Api.version()}/dialog/'
 
+	CONVERSE_TIMEOUT = 10
+	CONVERSE_MAX_TIMEOUT = 30
+
 
 	def __init__(self):
 		super().__init__()
@@ -74,27 +80,9 @@ class DialogApi(Api):
 		try:
 			deviceUid = request.form.get('deviceUid') if request.form.get('deviceUid', None) is not None else self.DeviceManager.getMainDevice().uid
 
-			user = self.UserManager.getUserByAPIToken(request.headers.get('auth', ''))
-			session = self.DialogManager.newSession(deviceUid=deviceUid, user=user.name)
-			session.deviceUid = deviceUid
+			session = self.openSession(deviceUid=deviceUid)
 			session.input = request.form.get('query')
 
-			device = self.DeviceManager.getDevice(uid=deviceUid)
-			if not device.hasAbilities([DeviceAbility.PLAY_SOUND]):
-				session.textOnly = True
-
-			if not device.hasAbilities([DeviceAbility.CAPTURE_SOUND]):
-				session.textInput = True
-
-			# Turn off the wakeword component
-			self.MqttManager.publish(
-				topic=constants.TOPIC_HOTWORD_TOGGLE_OFF,
-				payload={
-					'siteId'   : deviceUid,
-					'sessionId': session.sessionId
-				}
-			)
-
 			return self.publishText(session=session)
 		except Exception as e:
 			self.logError(f'Failed processing: {e}')
@@ -109,12 +97,13 @@ class DialogApi(Api):
 
 			sessionId = request.form.get('sessionId')
 			session = self.DialogManager.getSession(sessionId=sessionId)
-			session.deviceUid = deviceUid
-			session.input = request.form.get('query')
 
 			if not session or session.hasEnded:
 				return self.process()
 
+			session.deviceUid = deviceUid
+			session.input = request.form.get('query')
+
 			self.DialogManager.startSessionTimeout(sessionId=session.sessionId)
 			return self.publishText(session=session)
 		except Exception as e:
@@ -122,8 +111,109 @@ class DialogApi(Api):
 			return jsonify(success=False)
 
 
+	@route('/converse/', methods=['POST'])
+	@ApiAuthenticated
+	def converse(self) -> Response:
+		"""
+		Same as process and continue, but the request is held open until Alice answers, asks something back or ends
+		the session. Clients accepting text/event-stream get each event as soon as it happens
+		:return:
+		"""
+		try:
+			deviceUid = request.form.get('deviceUid') if request.form.get('deviceUid', None) is not None else self.DeviceManager.getMainDevice().uid
+
+			session = self.DialogManager.getSession(sessionId=request.form.get('sessionId', ''))
+			if not session or session.hasEnded:
+				session = self.openSession(deviceUid=deviceUid)
+			else:
+				session.deviceUid = deviceUid
+				self.DialogManager.startSessionTimeout(sessionId=session.sessionId)
+
+			session.input = request.form.get('query')
+
+			try:
+				timeout = max(min(float(request.form.get('timeout', self.CONVERSE_TIMEOUT)), self.CONVERSE_MAX_TIMEOUT), 0)
+			except ValueError:
+				timeout = self.CONVERSE_TIMEOUT
+
+			# Listen before publishing, Alice might answer before we are done here
+			listener = self.DialogManager.listenSession(sessionId=session.sessionId)
+			try:
+				self.captureText(session=session)
+			except:
+				self.DialogManager.stopListeningSession(sessionId=session.sessionId, listener=listener)
+				raise
+
+			events = self.sessionEvents(sessionId=session.sessionId, listener=listener, timeout=timeout)
+
+			if request.accept_mimetypes.best == 'text/event-stream':
+				return Response((f'data: {json.dumps(event)}\n\n' for event in events), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+			return jsonify(success=True, sessionId=session.sessionId, events=list(events))
+		except Exception as e:
+			self.logError(f'Failed processing: {e}')
+			return jsonify(success=False)
+
+
+	def openSession(self, deviceUid: str) -> DialogSession:
+		user = self.UserManager.getUserByAPIToken(request.headers.get('auth', ''))
+		session = self.DialogManager.newSession(deviceUid=deviceUid, user=user.name)
+		session.deviceUid = deviceUid
+
+		device = self.DeviceManager.getDevice(uid=deviceUid)
+		if not device.hasAbilities([DeviceAbility.PLAY_SOUND]):
+			session.textOnly = True
+
+		if not device.hasAbilities([DeviceAbility.CAPTURE_SOUND]):
+			session.textInput = True
+
+		# Turn off the wakeword component
+		self.MqttManager.publish(
+			topic=constants.TOPIC_HOTWORD_TOGGLE_OFF,
+			payload={
+				'siteId'   : deviceUid,
+				'sessionId': session.sessionId
+			}
+		)
+
+		return session
+
+
+	def sessionEvents(self, sessionId: str, listener: queue.Queue, timeout: float) -> Generator[dict, None, None]:
+		"""
+		Yields the session events until Alice waits for the user, the session ends or we timeout
+		:param sessionId:
+		:param listener:
+		:param timeout:
+		:return:
+		"""
+		deadline = time.monotonic() + timeout
+		try:
+			while True:
+				remaining = deadline - time.monotonic()
+				if remaining <= 0:
+					yield {'event': 'timeout', 'sessionId': sessionId}
+					return
+
+				try:
+					event = listener.get(timeout=remaining)
+				except queue.Empty:
+					continue
+
+				yield event
+				if event['event'] in {'continue', 'ended'}:
+					return
+		finally:
+			self.DialogManager.stopListeningSession(sessionId=sessionId, listener=listener)
+
+
 	def publishText(self, session: DialogSession) -> Response:
-		message = MQTTMessage()
+		self.captureText(session=session)
+		return jsonify(success=True, sessionId=session.sessionId)
+
+
+	def captureText(self, session: DialogSession):
+		message = ParsedMessage()
 		message.payload = json.dumps({'sessionId': session.sessionId, 'siteId': session.deviceUid, 'text': session.input})
 		session.extend(message=message)
 
@@ -136,4 +226,3 @@ class DialogApi(Api):
 				'likelihood': 1,
 				'seconds'   : 1
 			})
-		return jsonify(success=True, sessionId=session.sessionId)
@@ -127,12 +127,24 @@ class UtilsApi(Api):
 
 	@route('/i18n/', methods=['GET'])
 	def i18n(self) -> Response:
-		return jsonify(success=True, data=self.LanguageManager.loadWebUIStrings())
+		return self.i18nResponse()
 
 
 	@route('/i18n/<lang>/', methods=['GET'])
 	def i18nLang(self, lang: str):
-		return jsonify(success=True, data=self.LanguageManager.loadWebUIStrings().get(lang, dict()))
+		return self.i18nResponse(lang=lang)
+
+
+	def i18nResponse(self, lang: str = '') -> Response:
+		data, etag = self.LanguageManager.getSerializedWebUIStrings(lang=lang)
+
+		if etag in request.if_none_match:
+			response = Response(status=304)
+		else:
+			response = Response(f'{{"success": true, "data": {data}}}', mimetype='application/json')
+
+		response.set_etag(etag)
+		return response
 
 
 	@route('/sysCmd/', methods=['POST'])
@@ -29,6 +29,7 @@ from core.webui.model.UINotificationType import UINotificationType
 
 
 class NodeRedManager(Manager):
+	DEPENDENCIES = ('SkillManager',)
 	PACKAGE_PATH = Path('../.node-red/package.json')
 	DEFAULT_NODES_ACTIVE = {
 		'node-red': [
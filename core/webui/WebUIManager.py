@@ -27,6 +27,7 @@ from core.commons import constants
 
 
 class WebUIManager(Manager):
+	DEPENDENCIES = ('MqttManager',)
 
 
 	def __init__(self):
@@ -28,6 +28,7 @@ from core.webui.model.WidgetPage import WidgetPage
 
 
 class WidgetManager(Manager):
+	DEPENDENCIES = ('SkillManager', 'DeviceManager')
 	DEFAULT_ICON = 'fas fa-biohazard'
 
 	WIDGETS_TABLE = 'activeWidgets'
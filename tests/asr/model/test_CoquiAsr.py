@@ -0,0 +1,142 @@
+#  Copyright (c) 2021
+#
+#  This file, test_CoquiAsr.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.04.13 at 12:56:50 CEST
+
+import unittest
+import wave
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from core.asr.model.CoquiAsr import CoquiAsr
+
+
+class FakeClock(object):
+	"""
+	Virtual time, sleeping only moves it forward
+	"""
+
+	def __init__(self):
+		self.now = 0.0
+
+
+	def monotonic(self) -> float:
+		return self.now
+
+
+	def sleep(self, seconds: float):
+		self.now += seconds
+
+
+class FakeRecorder(object):
+	"""
+	Replays a wav file, chunk by chunk, at the pace a device streams it
+	"""
+
+	def __init__(self, wavFile: Path, clock: FakeClock):
+		self._clock = clock
+		with wave.open(str(wavFile), 'rb') as wav:
+			self._frameDuration = 512 / wav.getframerate()
+			self._chunks = list()
+			chunk = wav.readframes(512)
+			while chunk:
+				self._chunks.append(chunk)
+				chunk = wav.readframes(512)
+
+		self.lastChunkAt = 0.0
+
+
+	def __call__(self, *args, **kwargs):
+		return self
+
+
+	def __enter__(self):
+		return self
+
+
+	def __exit__(self, excType, excVal, excTb):
+		pass
+
+
+	def __iter__(self):
+		# Chunks get buffered as they arrive, a slow consumer gets them late
+		start = self._clock.monotonic()
+		for i, chunk in enumerate(self._chunks):
+			self.lastChunkAt = start + (i + 1) * self._frameDuration
+			self._clock.sleep(max(0.0, self.lastChunkAt - self._clock.monotonic()))
+			yield chunk
+
+
+	def stopRecording(self):
+		pass
+
+
+class FakeStream(object):
+	"""
+	Like the real decoder, an intermediate decoding costs more the longer the utterance is
+	"""
+
+	def __init__(self, clock: FakeClock):
+		self._clock = clock
+		self.fed = 0
+		self.intermediateDecodes = 0
+
+
+	def feedAudioContent(self, _audio):
+		self.fed += 1
+
+
+	def intermediateDecode(self) -> str:
+		self.intermediateDecodes += 1
+		self._clock.sleep(0.002 * self.fed)
+		return f'partial {self.fed}'
+
+
+	def finishStream(self) -> str:
+		self._clock.sleep(0.002 * self.fed)
+		return 'end of input'
+
+
+class TestCoquiAsr(unittest.TestCase):
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_decode_stream(self, mock_superManager):
+		superManager = MagicMock()
+		mock_superManager.getInstance.return_value = superManager
+		superManager.commons.rootDir.return_value = '/tmp'
+
+		clock = FakeClock()
+		recorder = FakeRecorder(Path('system/sounds/en/end_of_input.wav'), clock=clock)
+		stream = FakeStream(clock=clock)
+
+		asr = CoquiAsr()
+		asr._model = MagicMock()
+		asr._model.createStream.return_value = stream
+
+		with patch('core.asr.model.CoquiAsr.Recorder', recorder), patch('core.asr.model.Asr.time', clock):
+			result = asr.decodeStream(session=MagicMock(deviceUid='device', sessionId='session', user='user'))
+
+		latency = clock.monotonic() - recorder.lastChunkAt
+
+		self.assertEqual(result.text, 'end of input')
+		self.assertEqual(stream.fed, 33)
+		# About one intermediate result per interval, the last one being at most as old as the interval
+		self.assertLessEqual(stream.intermediateDecodes, 1.05 / asr.PARTIAL_RESULT_INTERVAL + 1)
+		self.assertGreater(stream.intermediateDecodes, 0)
+		self.assertEqual(superManager.mqttManager.publish.call_count, stream.intermediateDecodes)
+		# Final result comes right after the last chunk, not after catching up with per chunk decodings
+		self.assertLess(latency, 0.15)
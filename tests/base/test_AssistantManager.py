@@ -17,7 +17,14 @@
 #
 #  Last modified: 2021.04.13 at 12:56:50 CEST
 
+import json
+import tempfile
+from pathlib import Path
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.base.AssistantManager import AssistantManager
+from core.commons.CommonsManager import CommonsManager
 
 
 class TestAssistantManager(TestCase):
@@ -38,8 +45,43 @@ class TestAssistantManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_train(self):
-		pass  # To be implemented or nothing to test()
+	@patch('core.base.SuperManager.SuperManager')
+	def test_train(self, mock_superManager):
+		tmpDir = tempfile.TemporaryDirectory()
+		self.addCleanup(tmpDir.cleanup)
+
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.rootDir.return_value = tmpDir.name
+		mock_instance.commonsManager.contentId.side_effect = CommonsManager.contentId
+		mock_instance.languageManager.activeLanguage = 'en'
+		mock_instance.stateManager.getState.return_value = None
+
+		template = Path(tmpDir.name, 'en.json')
+		template.write_text(json.dumps({'intents': [
+			{'name': 'TurnOn', 'enabledByDefault': True, 'slots': [
+				{'name': 'Location', 'type': 'AliceLocation', 'missingQuestion': '', 'required': False},
+				{'name': 'Other', 'type': 'AliceLocation', 'missingQuestion': '', 'required': False}
+			]},
+			{'name': 'TurnOff', 'enabledByDefault': True, 'slots': [
+				{'name': 'Location', 'type': 'AliceLocation', 'missingQuestion': '', 'required': False}
+			]}
+		]}))
+
+		assistantManager = AssistantManager()
+		with patch.object(assistantManager, 'skillResource', side_effect=lambda: iter([template])), patch.object(assistantManager, 'linkAssistant'):
+			assistantManager.train()
+			firstRun = assistantManager._assistantPath.read_text()
+			assistantManager.train()
+			self.assertEqual(firstRun, assistantManager._assistantPath.read_text())
+
+		assistant = json.loads(firstRun)
+		self.assertEqual([intent['name'] for intent in assistant['intents']], ['TurnOff', 'TurnOn'])
+
+		turnOff, turnOn = assistant['intents']
+		self.assertEqual(turnOff['slots'][0]['id'], turnOn['slots'][0]['id'])
+		self.assertNotEqual(turnOn['slots'][0]['id'], turnOn['slots'][1]['id'])
+		self.assertEqual(turnOn['slots'][0]['entityId'], turnOn['slots'][1]['entityId'])
 
 
 	def test_link_assistant(self):
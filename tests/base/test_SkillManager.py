@@ -17,7 +17,18 @@
 #
 #  Last modified: 2021.04.13 at 12:56:50 CEST
 
+import json
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from AliceGit.Exceptions import PathNotFoundException
+from core.base.SkillManager import SkillManager
+from core.base.model.Version import Version
 
 
 class TestSkillManager(TestCase):
@@ -118,8 +129,59 @@ class TestSkillManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_is_skill_active(self):
-		pass  # To be implemented or nothing to test()
+	@patch('core.base.SuperManager.SuperManager')
+	def test_is_skill_active(self, mock_superManager):
+		superManager = MagicMock()
+		mock_superManager.getInstance.return_value = superManager
+		superManager.databaseManager.fetch.return_value = [{'skillName': 'Skill0', 'active': 1}, {'skillName': 'Skill1', 'active': 0}]
+
+		skillManager = SkillManager()
+		skillManager._skillList = ['Skill0', 'Skill1', 'Skill2']
+		skillManager.loadSkillsFromDB()
+		superManager.databaseManager.fetch.reset_mock()
+
+		# Answered from memory
+		self.assertTrue(skillManager.isSkillActive(skillName='Skill0'))
+		self.assertFalse(skillManager.isSkillActive(skillName='Skill1'))
+		superManager.databaseManager.fetch.assert_not_called()
+
+		skillManager.changeSkillStateInDB(skillName='Skill0', newState=False)
+		self.assertFalse(skillManager.isSkillActive(skillName='Skill0'))
+
+		# Unknown to the registry, asked to the database once
+		superManager.databaseManager.fetch.return_value = [{'active': 1}]
+		self.assertTrue(skillManager.isSkillActive(skillName='Skill2'))
+		self.assertTrue(skillManager.isSkillActive(skillName='Skill2'))
+		superManager.databaseManager.fetch.assert_called_once()
+
+		skillManager.removeSkillFromDB(skillName='Skill2')
+		self.assertIsNone(skillManager._registry.get(skillName='Skill2'))
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_get_skill_installer(self, mock_superManager):
+		mock_superManager.getInstance.return_value = MagicMock()
+
+		tmpDir = tempfile.TemporaryDirectory()
+		self.addCleanup(tmpDir.cleanup)
+		installFile = Path(tmpDir.name, 'skill.install')
+		installFile.write_text(json.dumps({'version': '1.0.0'}))
+
+		skillManager = SkillManager()
+		with patch.object(skillManager, 'getSkillInstallFilePath', return_value=installFile), patch('core.base.model.SkillRegistry.json.loads', wraps=json.loads) as mock_loads:
+			self.assertEqual(skillManager.getSkillInstaller(skillName='Skill'), {'version': '1.0.0'})
+			self.assertEqual(skillManager.getSkillInstaller(skillName='Skill'), {'version': '1.0.0'})
+			mock_loads.assert_called_once()
+
+			# Modified on disk
+			installFile.write_text(json.dumps({'version': '1.1.0'}))
+			os.utime(installFile, ns=(time.time_ns(), time.time_ns() + 1_000_000_000))
+			self.assertEqual(skillManager.getSkillInstaller(skillName='Skill'), {'version': '1.1.0'})
+
+			# Invalidated on update
+			skillManager._registry.invalidate(skillName='Skill')
+			skillManager.getSkillInstaller(skillName='Skill')
+			self.assertEqual(mock_loads.call_count, 3)
 
 
 	def test_get_skill_instance(self):
@@ -142,8 +204,131 @@ class TestSkillManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_check_for_skill_updates(self):
-		pass  # To be implemented or nothing to test()
+	@patch('core.util.Decorators.SuperManager')
+	@patch('core.base.SuperManager.SuperManager')
+	def test_check_for_skill_updates(self, mock_superManager, mock_decoratorsSuperManager):
+		superManager = MagicMock()
+		mock_superManager.getInstance.return_value = superManager
+		mock_decoratorsSuperManager.getInstance.return_value = superManager
+		superManager.configManager.getAliceConfigByName.side_effect = lambda name: name == 'skillAutoUpdate'
+
+		def remoteVersion(skillName: str):
+			time.sleep(0.05)
+			return Version.fromString('1.1.0' if skillName.endswith('0') else '1.0.0')
+
+		superManager.skillStoreManager.getSkillUpdateVersion.side_effect = remoteVersion
+
+		tmpDir = tempfile.TemporaryDirectory()
+		self.addCleanup(tmpDir.cleanup)
+		installFile = Path(tmpDir.name, 'skill.install')
+		installFile.write_text(json.dumps({'version': '1.0.0'}))
+
+		skillManager = SkillManager()
+		skillManager._skillList = [f'Skill{i}' for i in range(16)]
+
+		start = time.monotonic()
+		with patch.object(skillManager, 'getSkillInstallFilePath', return_value=installFile), patch.object(skillManager, 'isSkillUserModified', return_value=False):
+			updates = skillManager.checkForSkillUpdates()
+
+		# Checked concurrently, result kept in skill order
+		self.assertLess(time.monotonic() - start, 16 * 0.05 / 2)
+		self.assertEqual(updates, ['Skill0', 'Skill10'])
+
+
+	@patch('core.base.SkillManager.Repository')
+	@patch('core.base.SkillManager.requests')
+	@patch('core.base.SuperManager.SuperManager')
+	def test_download_skills(self, mock_superManager, mock_requests, mock_repository):
+		superManager = MagicMock()
+		mock_superManager.getInstance.return_value = superManager
+		superManager.configManager.getAliceConfigByName.return_value = False
+		superManager.skillStoreManager.getSkillUpdateTag.return_value = '1.0.0'
+
+		def get(url: str):
+			skillName = url.rsplit('/', 1)[-1].split('.')[0]
+			conditions = {'skill': ['Common']} if skillName != 'Common' else dict()
+			return MagicMock(status_code=200, json=MagicMock(return_value={'name': skillName, 'aliceMinVersion': '0.0.1', 'conditions': conditions}))
+
+		mock_requests.get.side_effect = get
+
+		cloned = list()
+		def clone(url: str, directory: Path, makeDir: bool):
+			time.sleep(0.05)
+			cloned.append(directory.name)
+			return MagicMock()
+
+		mock_repository.clone.side_effect = clone
+
+		def getSkillRepository(skillName: str):
+			if skillName not in cloned:
+				raise PathNotFoundException(skillName)
+			return MagicMock()
+
+		skillManager = SkillManager()
+		skillManager._skillList = list()
+		with patch.object(skillManager, 'getSkillRepository', side_effect=getSkillRepository), patch.object(skillManager, 'getSkillDirectory', side_effect=lambda skillName: Path(skillName)):
+			repositories = skillManager.downloadSkills(skills=['First', 'Second', 'First'])
+
+		# The shared dependency is cloned once, whichever skill asked first
+		self.assertEqual(list(repositories), ['First', 'Second'])
+		self.assertEqual(sorted(cloned), ['Common', 'First', 'Second'])
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_is_skill_user_modified(self, mock_superManager):
+		mock_superManager.getInstance.return_value = MagicMock()
+
+		tmpDir = tempfile.TemporaryDirectory()
+		self.addCleanup(tmpDir.cleanup)
+		directory = Path(tmpDir.name)
+		Path(directory, 'skill.py').write_text('pass')
+		for command in (['init', '-q'], ['add', '.'], ['-c', 'user.name=test', '-c', 'user.email=test@test', 'commit', '-q', '-m', 'init']):
+			subprocess.run(['git', '-C', str(directory), *command], check=True)
+
+		repository = MagicMock(path=directory)
+		repository.isDirty.return_value = False
+
+		skillManager = SkillManager()
+		with patch.object(skillManager, 'getSkillRepository', return_value=repository):
+			self.assertFalse(skillManager.isSkillUserModified(skillName='Skill'))
+			self.assertFalse(skillManager.isSkillUserModified(skillName='Skill'))
+			repository.isDirty.assert_called_once()
+
+			# Editing a tracked file asks git again
+			repository.isDirty.return_value = True
+			skillFile = Path(directory, 'skill.py')
+			skillFile.write_text('pass\n')
+			os.utime(skillFile, ns=(time.time_ns() + 10 ** 9, time.time_ns() + 10 ** 9))
+			self.assertTrue(skillManager.isSkillUserModified(skillName='Skill'))
+			self.assertEqual(repository.isDirty.call_count, 2)
+
+			# So does deleting one
+			repository.isDirty.return_value = False
+			self.assertTrue(skillManager.isSkillUserModified(skillName='Skill'))
+			skillFile.unlink()
+			repository.isDirty.return_value = True
+			self.assertTrue(skillManager.isSkillUserModified(skillName='Skill'))
+			self.assertEqual(repository.isDirty.call_count, 3)
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_update_skill_repository(self, mock_superManager):
+		superManager = MagicMock()
+		mock_superManager.getInstance.return_value = superManager
+		superManager.configManager.getAliceConfigByName.side_effect = lambda name: name == 'devMode'
+
+		repository = MagicMock()
+		repository.isDirty.return_value = True
+
+		skillManager = SkillManager()
+		with patch.object(skillManager, 'getSkillRepository', return_value=repository):
+			# Local changes are never overwritten in dev mode
+			self.assertFalse(skillManager.updateSkillRepository(skillName='Skill'))
+			repository.checkout.assert_not_called()
+
+			repository.isDirty.return_value = False
+			self.assertTrue(skillManager.updateSkillRepository(skillName='Skill'))
+			repository.checkout.assert_called_once()
 
 
 	def test__check_for_skill_install(self):
@@ -154,8 +339,74 @@ class TestSkillManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
-	def test__install_skills(self):
-		pass  # To be implemented or nothing to test()
+	@patch('core.base.SuperManager.SuperManager')
+	def test__install_skills(self, mock_superManager):
+		superManager = MagicMock()
+		mock_superManager.getInstance.return_value = superManager
+		commands = list()
+		superManager.commonsManager.runSystemCommand.side_effect = lambda command: commands.append(command) or MagicMock(returncode=0)
+		superManager.commonsManager.runRootSystemCommand.side_effect = lambda command: commands.append(command) or MagicMock(returncode=0)
+		superManager.configManager.getAliceConfigByName.return_value = ''
+
+		skillManager = SkillManager()
+		skillManager._busyInstalling = MagicMock()
+
+		tmpDir = tempfile.TemporaryDirectory()
+		self.addCleanup(tmpDir.cleanup)
+
+		def repository(skillName: str):
+			installFile = Path(tmpDir.name, f'{skillName}.install')
+			installFile.write_text(json.dumps({
+				'pipRequirements'   : [f'{skillName.lower()}-lib', 'requests'],
+				'systemRequirements': [f'{skillName.lower()}-tools']
+			}))
+			return MagicMock(file=lambda name: installFile)
+
+		with patch.object(skillManager, 'getSkillRepository', side_effect=lambda skillName: repository(skillName)), \
+				patch.object(skillManager, 'checkSkillConditions'), \
+				patch.object(skillManager, 'addSkillToDB'), \
+				patch.object(skillManager, 'broadcast'):
+			skillManager.installSkills(skills=['Weather', 'Calculator', 'Telemetry'])
+
+		# One apt and one pip run for the whole batch
+		self.assertEqual(commands, [
+			['apt-get', 'install', '-y', 'weather-tools', 'calculator-tools', 'telemetry-tools'],
+			['./venv/bin/pip3', 'install', 'weather-lib', 'requests', 'calculator-lib', 'telemetry-lib']
+		])
+		self.assertEqual(skillManager._skillList, ['Weather', 'Calculator', 'Telemetry'])
+
+		# A failing batch is retried requirement by requirement
+		commands.clear()
+		superManager.commonsManager.runSystemCommand.side_effect = lambda command: commands.append(command) or MagicMock(returncode=int(len(command) > 3))
+		skillManager.installRequirements(pipRequirements=['a', 'b'], systemRequirements=list())
+		self.assertEqual(commands, [['./venv/bin/pip3', 'install', 'a', 'b'], ['./venv/bin/pip3', 'install', 'a'], ['./venv/bin/pip3', 'install', 'b']])
+
+		# With a wheel cache, requirements are installed from it only
+		commands.clear()
+		superManager.commonsManager.runSystemCommand.side_effect = lambda command: commands.append(command) or MagicMock(returncode=0)
+		wheelCache = str(Path(tmpDir.name, 'wheels'))
+		superManager.configManager.getAliceConfigByName.return_value = wheelCache
+		superManager.internetManager.online = False
+		skillManager.installRequirements(pipRequirements=['a', 'b'], systemRequirements=list())
+		self.assertEqual(commands, [['./venv/bin/pip3', 'install', '--no-index', '--find-links', wheelCache, 'a', 'b']])
+
+		# Online, the wheels are built once for the batch, not again when installing one by one
+		commands.clear()
+		superManager.internetManager.online = True
+		superManager.commonsManager.runSystemCommand.side_effect = lambda command: commands.append(command) or MagicMock(returncode=int(command[1] == 'install' and len(command) > 6))
+		skillManager.installRequirements(pipRequirements=['a', 'b'], systemRequirements=list())
+		self.assertEqual(commands, [
+			['./venv/bin/pip3', 'wheel', '--wheel-dir', wheelCache, '--find-links', wheelCache, 'a', 'b'],
+			['./venv/bin/pip3', 'install', '--no-index', '--find-links', wheelCache, 'a', 'b'],
+			['./venv/bin/pip3', 'install', '--no-index', '--find-links', wheelCache, 'a'],
+			['./venv/bin/pip3', 'install', '--no-index', '--find-links', wheelCache, 'b']
+		])
+
+		# Wheels that failed building are installed from the package index
+		commands.clear()
+		superManager.commonsManager.runSystemCommand.side_effect = lambda command: commands.append(command) or MagicMock(returncode=int(command[1] == 'wheel'))
+		skillManager.installRequirements(pipRequirements=['a'], systemRequirements=list())
+		self.assertEqual(commands[1], ['./venv/bin/pip3', 'install', 'a'])
 
 
 	def test__install_skill(self):
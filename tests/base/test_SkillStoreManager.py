@@ -17,7 +17,40 @@
 #
 #  Last modified: 2021.04.13 at 12:56:50 CEST
 
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.base.SkillStoreManager import SkillStoreManager
+
+
+class StoreHandler(BaseHTTPRequestHandler):
+	store = dict()
+	etag = '"1"'
+	requests = list()
+
+
+	def do_GET(self):  # NOSONAR
+		StoreHandler.requests.append(self.headers.get('If-None-Match'))
+		if self.headers.get('If-None-Match') == StoreHandler.etag:
+			self.send_response(304)
+			self.end_headers()
+			return
+
+		body = json.dumps(StoreHandler.store).encode()
+		self.send_response(200)
+		self.send_header('ETag', StoreHandler.etag)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+
+	def log_message(self, *args):
+		pass
 
 
 class TestSkillStoreManager(TestCase):
@@ -34,8 +67,134 @@ class TestSkillStoreManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_refresh_store_data(self):
-		pass  # To be implemented or nothing to test()
+	@patch('core.base.SkillStoreManager.SuperManager')
+	@patch('core.base.SuperManager.SuperManager')
+	def test_refresh_store_data(self, mock_superManager, mock_storeSuperManager):
+		tmpDir = tempfile.TemporaryDirectory()
+		self.addCleanup(tmpDir.cleanup)
+
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_storeSuperManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'SkillStoreManager'
+		mock_instance.commonsManager.rootDir.return_value = tmpDir.name
+		mock_instance.configManager.getAliceConfigByName.return_value = False
+		mock_instance.internetManager.online = True
+		mock_instance.languageManager.activeLanguage = 'en'
+		mock_instance.skillManager.allSkills = dict()
+		mock_instance.skillManager.activeSkills = dict()
+		mock_instance.asrManager.asr = None
+		mock_instance.managers = {'SkillManager': MagicMock(isActive=True), 'ASRManager': MagicMock(isActive=True)}
+		mock_instance.skillManager.checkSkillConditions.side_effect = lambda installer, checkOnly: list()
+
+		server = ThreadingHTTPServer(('127.0.0.1', 0), StoreHandler)
+		threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True).start()
+		self.addCleanup(server.server_close)
+
+		StoreHandler.store = {'SkillA': {'name': 'SkillA', 'version': '1.0.0'}, 'SkillB': {'name': 'SkillB', 'version': '1.0.0'}}
+		StoreHandler.etag = '"1"'
+		StoreHandler.requests = list()
+
+		skillStoreManager = SkillStoreManager()
+		skillStoreManager._storeUrl = f'http://127.0.0.1:{server.server_port}/skills.json'
+
+		# First refresh downloads and checks everything
+		skillStoreManager.refreshStoreData()
+		self.assertEqual(StoreHandler.requests, [None])
+		self.assertEqual(mock_instance.skillManager.checkSkillConditions.call_count, 2)
+		self.assertTrue(skillStoreManager.getSkillData('SkillA')['compatible'])
+
+		# Second refresh is conditional and the store did not change, nothing is rechecked
+		mock_instance.skillManager.checkSkillConditions.reset_mock()
+		skillStoreManager.refreshStoreData()
+		self.assertEqual(StoreHandler.requests, [None, '"1"'])
+		mock_instance.skillManager.checkSkillConditions.assert_not_called()
+
+		# Only the changed entry is rechecked
+		StoreHandler.store['SkillB']['version'] = '1.0.1'
+		StoreHandler.etag = '"2"'
+		skillStoreManager.refreshStoreData()
+		mock_instance.skillManager.checkSkillConditions.assert_called_once()
+		self.assertEqual(mock_instance.skillManager.checkSkillConditions.call_args.kwargs['installer']['name'], 'SkillB')
+		self.assertTrue(skillStoreManager.getSkillData('SkillA')['compatible'])
+
+		# A change in installed skills rechecks everything
+		mock_instance.skillManager.checkSkillConditions.reset_mock()
+		mock_instance.skillManager.allSkills = {'SkillA': MagicMock()}
+		skillStoreManager.refreshStoreData()
+		self.assertEqual(mock_instance.skillManager.checkSkillConditions.call_count, 2)
+		self.assertTrue(skillStoreManager.getSkillData('SkillA')['installed'])
+
+		# So does the ASR settling once booted, even though the store did not change
+		mock_instance.skillManager.checkSkillConditions.reset_mock()
+		mock_instance.asrManager.asr = MagicMock(capableOfArbitraryCapture=False)
+		skillStoreManager.onBooted()
+		self.assertEqual(mock_instance.skillManager.checkSkillConditions.call_count, 2)
+
+		# And a manager going inactive
+		mock_instance.skillManager.checkSkillConditions.reset_mock()
+		mock_instance.managers['ASRManager'].isActive = False
+		skillStoreManager.refreshStoreData()
+		self.assertEqual(mock_instance.skillManager.checkSkillConditions.call_count, 2)
+
+		mock_instance.skillManager.checkSkillConditions.reset_mock()
+		skillStoreManager.refreshStoreData()
+		mock_instance.skillManager.checkSkillConditions.assert_not_called()
+
+		# Offline, a fresh start is served from the local mirror
+		server.shutdown()
+		server.server_close()
+		mock_instance.internetManager.online = False
+		skillStoreManager = SkillStoreManager()
+		skillStoreManager.refreshStoreData()
+		self.assertEqual(skillStoreManager.getSkillData('SkillB')['version'], '1.0.1')
+
+		# Unreachable store is served from the local mirror as well
+		mock_instance.internetManager.online = True
+		skillStoreManager = SkillStoreManager()
+		skillStoreManager._storeUrl = f'http://127.0.0.1:{server.server_port}/skills.json'
+		skillStoreManager.STORE_REQUEST_TIMEOUT = 1
+		skillStoreManager.refreshStoreData()
+		self.assertTrue(skillStoreManager.skillExists('SkillA'))
+
+
+	@patch('core.base.SkillStoreManager.SuperManager')
+	@patch('core.base.SuperManager.SuperManager')
+	def test_refresh_samples_data(self, mock_superManager, mock_storeSuperManager):
+		tmpDir = tempfile.TemporaryDirectory()
+		self.addCleanup(tmpDir.cleanup)
+
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_storeSuperManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'SkillStoreManager'
+		mock_instance.commonsManager.rootDir.return_value = tmpDir.name
+		mock_instance.configManager.getAliceConfigByName.side_effect = lambda name: name == 'suggestSkillsToInstall'
+		mock_instance.internetManager.online = True
+		mock_instance.languageManager.activeLanguage = 'en'
+		mock_instance.skillManager.checkSkillConditions.side_effect = lambda installer, checkOnly: list()
+
+		server = ThreadingHTTPServer(('127.0.0.1', 0), StoreHandler)
+		threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True).start()
+		self.addCleanup(server.server_close)
+		self.addCleanup(server.shutdown)
+
+		StoreHandler.store = {'SkillA': {'en': ['turn on the light'], 'de': ['schalte das licht ein']}}
+		StoreHandler.etag = '"1"'
+		StoreHandler.requests = list()
+
+		skillStoreManager = SkillStoreManager()
+		skillStoreManager._storeUrl = f'http://127.0.0.1:{server.server_port}/skills.json'
+		skillStoreManager._samplesUrl = f'http://127.0.0.1:{server.server_port}/samples.json'
+
+		skillStoreManager.refreshStoreData()
+		self.assertEqual(skillStoreManager._skillSamplesData, {'SkillA': ['turn on the light']})
+
+		# The store did not change, but the samples are picked again in the new language
+		mock_instance.languageManager.activeLanguage = 'de'
+		skillStoreManager.refreshStoreData()
+		self.assertEqual(StoreHandler.requests[-1], '"1"')
+		self.assertEqual(skillStoreManager._skillSamplesData, {'SkillA': ['schalte das licht ein']})
 
 
 	def test__get_skill_update_version(self):
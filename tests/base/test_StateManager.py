@@ -118,6 +118,37 @@ class test_StateManager(unittest.TestCase):
 		dummy.get.assert_called_once_with(StateType.WAITING, StateType.STOPPED)
 
 
+	@patch('core.base.SuperManager.SuperManager')
+	def test_subscribe(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'unittest'
+		stateManager = StateManager()
+
+		early = MagicMock()
+		late = MagicMock()
+
+		# Subscribing before the state exists
+		stateManager.subscribe('unit.test', early)
+		stateManager.register('unit.test')
+		stateManager.subscribe('unit.test', late)
+
+		stateManager.setState('unit.test', StateType.RUNNING)
+		early.assert_called_once_with(StateType.BORN, StateType.RUNNING)
+		late.assert_called_once_with(StateType.BORN, StateType.RUNNING)
+
+		stateManager.unsubscribe('unit.test', early)
+		stateManager.setState('unit.test', StateType.STOPPED)
+		early.assert_called_once()
+		self.assertEqual(late.call_count, 2)
+
+		stateManager.subscribe('unit.other', early)
+		stateManager.unsubscribe('unit.other', early)
+		stateManager.register('unit.other')
+		stateManager.setState('unit.other', StateType.RUNNING)
+		early.assert_called_once()
+
+
 	@patch('core.base.SuperManager.SuperManager')
 	def test_all_states(self, mock_superManager):
 		mock_instance = MagicMock()
@@ -134,6 +165,8 @@ class test_StateManager(unittest.TestCase):
 		]
 
 		self.assertListEqual(stateManager.allStates(), states)
+		self.assertIs(stateManager.allStates(), stateManager.allStates())
+		self.assertListEqual(stateManager.allStates(stateManager.states), states)
 
 
 	@patch('core.base.SuperManager.SuperManager')
@@ -17,17 +17,169 @@
 #
 #  Last modified: 2021.04.13 at 12:56:50 CEST
 
+import importlib
+import threading
+import time
 from unittest import TestCase
+from unittest.mock import MagicMock
+
+from core.base.SuperManager import SuperManager
+
+
+class FakeManager(object):
+
+	def __init__(self, name: str, dependencies: tuple = tuple(), bootTime: float = 0, journal: list = None):
+		self.name = name
+		self.DEPENDENCIES = dependencies
+		self._bootTime = bootTime
+		self._journal = journal if journal is not None else list()
+
+
+	def onStart(self):
+		self._journal.append(f'start {self.name}')
+		time.sleep(self._bootTime)
+		self._journal.append(f'started {self.name}')
+
+
+	def onBooted(self):
+		self._journal.append(f'booted {self.name}')
+
+
+class FakeThreadManager(FakeManager):
+
+	def newThread(self, name: str, target, args: list = None):
+		thread = threading.Thread(name=name, target=target, args=args or list(), daemon=True)
+		thread.start()
+		return thread
+
+
+# Manager key: module, as in SuperManager.initManagers. Managers are named after their module
+REAL_MANAGERS = {
+	'SkillManager'            : 'core.base.SkillManager',
+	'WidgetManager'           : 'core.webui.WidgetManager',
+	'DeviceManager'           : 'core.device.DeviceManager',
+	'AudioManager'            : 'core.server.AudioServer',
+	'ASRManager'              : 'core.asr.ASRManager',
+	'TTSManager'              : 'core.voice.TTSManager',
+	'MqttManager'             : 'core.server.MqttManager',
+	'TimeManager'             : 'core.util.TimeManager',
+	'UserManager'             : 'core.user.UserManager',
+	'MultiIntentManager'      : 'core.dialog.MultiIntentManager',
+	'TelemetryManager'        : 'core.util.TelemetryManager',
+	'LocationManager'         : 'core.myHome.LocationManager',
+	'InternetManager'         : 'core.util.InternetManager',
+	'WakewordRecorder'        : 'core.voice.WakewordRecorder',
+	'TalkManager'             : 'core.voice.TalkManager',
+	'WebUIManager'            : 'core.webui.WebUIManager',
+	'ApiManager'              : 'core.webApi.ApiManager',
+	'NodeRedManager'          : 'core.webui.NodeRedManager',
+	'SkillStoreManager'       : 'core.base.SkillStoreManager',
+	'DialogTemplateManager'   : 'core.dialog.DialogTemplateManager',
+	'AssistantManager'        : 'core.base.AssistantManager',
+	'NluManager'              : 'core.nlu.NluManager',
+	'AliceWatchManager'       : 'core.util.AliceWatchManager',
+	'DialogManager'           : 'core.dialog.DialogManager',
+	'WakewordManager'         : 'core.voice.WakewordManager',
+	'WebUINotificationManager': 'core.webui.WebUINotificationManager'
+}
+
+
+def managerDependencies(key: str, module: str) -> tuple:
+	try:
+		return getattr(importlib.import_module(module), key).DEPENDENCIES
+	except ImportError:
+		# AudioServer needs the sound libraries, it doesn't declare dependencies
+		return tuple()
 
 
 class TestSuperManager(TestCase):
 
+	def setUp(self):
+		self.addCleanup(setattr, SuperManager, '_INSTANCE', None)
+		self._superManager = SuperManager(MagicMock())
+		self._journal = list()
+
+		for name in SuperManager.FOUNDATION:
+			self._superManager._managers[name] = FakeManager(name=name, journal=self._journal)
+
+		self._superManager.threadManager = FakeThreadManager(name='ThreadManager', journal=self._journal)
+		self._superManager._managers['ThreadManager'] = self._superManager.threadManager
+		self._superManager.configManager = MagicMock()
+		self._superManager.deviceManager = MagicMock()
+		self._superManager.mqttManager = MagicMock()
+
+
+	def addManager(self, name: str, dependencies: tuple = tuple(), bootTime: float = 0, key: str = None):
+		self._superManager._managers[key or name] = FakeManager(name=name, dependencies=dependencies, bootTime=bootTime, journal=self._journal)
+
+
 	def test_on_start(self):
-		pass  # To be implemented or nothing to test()
+		self.addManager('SkillManager', dependencies=('MqttManager', 'ConfigManager'), bootTime=0.1)
+		self.addManager('ASRManager', bootTime=0.3)
+		self.addManager('TTSManager', bootTime=0.3)
+		self.addManager('MqttManager', bootTime=0.1)
+		self.addManager('DeviceManager', dependencies=('SkillManager',))
+
+		startedAt = time.monotonic()
+		self._superManager.onStart()
+		self._superManager.joinBoot()
+		elapsed = time.monotonic() - startedAt
+
+		# Foundation first, in order
+		self.assertEqual(self._journal[:2 * len(SuperManager.FOUNDATION)], [f'{step} {name}' for name in SuperManager.FOUNDATION for step in ('start', 'started')])
+
+		# Dependencies are started first
+		self.assertLess(self._journal.index('started MqttManager'), self._journal.index('start SkillManager'))
+		self.assertLess(self._journal.index('started SkillManager'), self._journal.index('start DeviceManager'))
+
+		# Independent managers booted concurrently
+		self.assertLess(elapsed, 0.6)
+		self.assertEqual(set(self._superManager._bootTimeline), set(self._superManager.managers))
+		self.assertEqual(list(self._superManager.managers)[-1], 'DeviceManager')
 
 
 	def test_on_booted(self):
-		pass  # To be implemented or nothing to test()
+		self.addManager('MqttManager', bootTime=0.2)
+		self.addManager('SkillManager', dependencies=('MqttManager',))
+
+		self._superManager.onStart()
+		self._superManager.onBooted()
+
+		# onBooted waits for every manager to be started
+		self.assertLess(self._journal.index('started SkillManager'), self._journal.index('booted CommonsManager'))
+		self._superManager.mqttManager.playSound.assert_called_once()
+
+
+	def test_real_managers(self):
+		for key, module in REAL_MANAGERS.items():
+			self.addManager(name=module.rsplit('.', 1)[-1], key=key, dependencies=managerDependencies(key, module), bootTime=0.01)
+
+		self._superManager.onStart()
+		self._superManager.joinBoot()
+
+		for manager, dependencies in {
+			'MqttManager'          : ('UserManager', 'AudioServer', 'WebUINotificationManager', 'LocationManager', 'InternetManager'),
+			'SkillManager'         : ('MqttManager', 'ASRManager', 'TTSManager', 'AudioServer', 'DialogManager'),
+			'DeviceManager'        : ('SkillManager',),
+			'SkillStoreManager'    : ('SkillManager', 'ASRManager', 'InternetManager'),
+			'WidgetManager'        : ('DeviceManager',),
+			'DialogTemplateManager': ('DeviceManager',),
+			'AssistantManager'     : ('DialogTemplateManager', 'NluManager')
+		}.items():
+			for dependency in dependencies:
+				self.assertLess(self._journal.index(f'started {dependency}'), self._journal.index(f'start {manager}'), f'{dependency} must be started before {manager}')
+
+
+	def test_boot_order(self):
+		self.addManager('SkillManager', dependencies=('MqttManager',))
+		self.addManager('MqttManager', dependencies=('UnknownManager',))
+		order = self._superManager.bootOrder()
+		self.assertEqual(order[:len(SuperManager.FOUNDATION)], list(SuperManager.FOUNDATION))
+		self.assertLess(order.index('MqttManager'), order.index('SkillManager'))
+
+		self.addManager('MqttManager', dependencies=('SkillManager',))
+		with self.assertRaises(Exception):
+			self._superManager.bootOrder()
 
 
 	def test_get_instance(self):
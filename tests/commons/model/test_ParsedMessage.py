@@ -0,0 +1,103 @@
+#  Copyright (c) 2021
+#
+#  This file, test_ParsedMessage.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.04.13 at 12:56:50 CEST
+
+import json
+import timeit
+import unittest
+from unittest.mock import patch
+
+from paho.mqtt.client import MQTTMessage
+
+from core.commons.CommonsManager import CommonsManager
+from core.commons.model.ParsedMessage import ParsedMessage
+from core.commons.model.Slot import Slot
+
+
+def intentMessage() -> MQTTMessage:
+	message = MQTTMessage(topic=b'hermes/intent/Greet')
+	message.payload = json.dumps({
+		'sessionId' : 'session',
+		'siteId'    : 'device',
+		'input'     : 'turn on the light in the kitchen',
+		'customData': json.dumps({'origin': 'test'}),
+		'intent'    : {'intentName': 'Greet', 'confidenceScore': 0.9},
+		'slots'     : [{
+			'slotName'       : 'Location',
+			'entity'         : 'Location',
+			'rawValue'       : 'kitchen',
+			'value'          : {'kind': 'Custom', 'value': 'kitchen'},
+			'range'          : {'start': 25, 'end': 32},
+			'confidenceScore': 1.0
+		}]
+	}).encode()
+	return message
+
+
+def intentPath(message: MQTTMessage):
+	# What the intent path asks to the message on its way to the skills
+	CommonsManager.payload(message)
+	CommonsManager.parseSessionId(message)
+	CommonsManager.payload(message)
+	CommonsManager.parseSlots(message)
+	CommonsManager.parseSlotsToObjects(message)
+	CommonsManager.parseCustomData(message)
+
+
+class TestParsedMessage(unittest.TestCase):
+
+	def test_from_message(self):
+		message = ParsedMessage.fromMessage(intentMessage())
+		self.assertEqual(message.topic, 'hermes/intent/Greet')
+		self.assertIs(ParsedMessage.fromMessage(message), message)
+
+		self.assertEqual(message.sessionId, 'session')
+		self.assertEqual(message.slots, {'Location': 'kitchen'})
+		self.assertIsInstance(message.slotsAsObjects['Location'][0], Slot)
+		self.assertEqual(message.customData, {'origin': 'test'})
+
+
+	def test_payload_is_decoded_once(self):
+		message = ParsedMessage.fromMessage(intentMessage())
+
+		with patch('core.commons.model.ParsedMessage.json.loads', wraps=json.loads) as mock_loads:
+			intentPath(message)
+			intentPath(message)
+			# The payload and the custom data
+			self.assertEqual(mock_loads.call_count, 2)
+
+			# Replacing the payload invalidates the cache
+			mock_loads.reset_mock()
+			message.payload = json.dumps({'sessionId': 'other'})
+			self.assertEqual(CommonsManager.parseSessionId(message), 'other')
+			self.assertEqual(message.slots, dict())
+			mock_loads.assert_called_once()
+
+
+	def test_not_json(self):
+		message = ParsedMessage(topic=b'hermes/audioServer/device/playBytes/id')
+		message.payload = b'\x00\x01'
+		self.assertEqual(message.data, {'id': b'\x00\x01'})
+		self.assertFalse(message.sessionId)
+
+
+	def test_intent_path_benchmark(self):
+		rawMessage = intentMessage()
+		raw = min(timeit.repeat(lambda: intentPath(rawMessage), number=500, repeat=3))
+		parsed = min(timeit.repeat(lambda: intentPath(ParsedMessage.fromMessage(rawMessage)), number=500, repeat=3))
+		self.assertLess(parsed, raw)
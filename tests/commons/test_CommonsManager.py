@@ -17,7 +17,13 @@
 #
 #  Last modified: 2021.04.13 at 12:56:50 CEST
 
+import hashlib
+import json
+import tempfile
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
 from unittest import mock
 from unittest.mock import MagicMock
 from uuid import UUID
@@ -25,8 +31,143 @@ from uuid import UUID
 from core.commons.CommonsManager import CommonsManager
 
 
+class FlakyServer(ThreadingHTTPServer):
+	"""
+	Serves a file over http, supporting range requests and dropping the connection midway through the first responses
+	"""
+
+	def __init__(self, content: bytes, drops: int = 1, ranges: bool = True):
+		self.content = content
+		self.drops = drops
+		self.ranges = ranges
+		self.requestedRanges = list()
+		super().__init__(('127.0.0.1', 0), FlakyHandler)
+
+
+	@property
+	def etag(self) -> str:
+		return f'"{hashlib.sha256(self.content).hexdigest()[:16]}"'
+
+
+	@property
+	def url(self) -> str:
+		return f'http://127.0.0.1:{self.server_address[1]}/model.tflite'
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+
+	def do_GET(self):  # NOSONAR
+		server: FlakyServer = self.server
+		requested = self.headers.get('Range', None)
+		server.requestedRanges.append(requested)
+
+		start = int(requested[6:-1]) if requested and server.ranges and self.headers.get('If-Range', None) == server.etag else 0
+		if start >= len(server.content):
+			self.send_response(416)
+			self.send_header('Content-Range', f'bytes */{len(server.content)}')
+			self.end_headers()
+			return
+
+		body = server.content[start:]
+		self.send_response(206 if start else 200)
+		self.send_header('ETag', server.etag)
+		self.send_header('Content-Length', str(len(body)))
+		if start:
+			self.send_header('Content-Range', f'bytes {start}-{len(server.content) - 1}/{len(server.content)}')
+		self.end_headers()
+
+		if server.drops:
+			server.drops -= 1
+			body = body[:len(body) // 2]
+
+		self.wfile.write(body)
+
+
+	def log_message(self, *args):
+		pass
+
+
 class TestCommonsManager(unittest.TestCase):
 
+	def startServer(self, **kwargs) -> FlakyServer:
+		server = FlakyServer(**kwargs)
+		threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True).start()
+		self.addCleanup(server.server_close)
+		self.addCleanup(server.shutdown)
+		return server
+
+
+	@mock.patch.object(CommonsManager, 'DOWNLOAD_RETRY_DELAY', 0)
+	@mock.patch('core.base.SuperManager.SuperManager')
+	def test_downloadFile(self, mock_superManager):
+		tmpDir = tempfile.TemporaryDirectory()
+		self.addCleanup(tmpDir.cleanup)
+
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.rootDir.return_value = tmpDir.name
+
+		content = bytes(range(256)) * 4096
+		checksum = hashlib.sha256(content).hexdigest()
+		commonsManager = CommonsManager()
+		dest = Path(tmpDir.name, 'model.tflite')
+
+		# Dropped twice, resumed from where it stopped
+		server = self.startServer(content=content, drops=2)
+		self.assertTrue(commonsManager.downloadFile(url=server.url, dest=str(dest), checksum=checksum))
+		self.assertEqual(dest.read_bytes(), content)
+		self.assertFalse(Path(tmpDir.name, 'model.tflite.part').exists())
+		self.assertEqual(server.requestedRanges, [None, f'bytes={len(content) // 2}-', f'bytes={len(content) - len(content) // 4}-'])
+
+		# Server ignoring ranges, started over
+		dest.unlink()
+		server = self.startServer(content=content, ranges=False)
+		self.assertTrue(commonsManager.downloadFile(url=server.url, dest=str(dest), checksum=checksum))
+		self.assertEqual(dest.read_bytes(), content)
+
+		# Corrupted, never renamed
+		dest.unlink()
+		server = self.startServer(content=content, drops=0)
+		self.assertFalse(commonsManager.downloadFile(url=server.url, dest=str(dest), checksum=hashlib.sha256(b'other').hexdigest()))
+		self.assertFalse(dest.exists())
+		self.assertEqual(len(server.requestedRanges), CommonsManager.DOWNLOAD_ATTEMPTS)
+
+		partFile = Path(tmpDir.name, 'model.tflite.part')
+		validatorFile = Path(tmpDir.name, 'model.tflite.part.json')
+
+		# A part of a file that changed since is never resumed
+		server = self.startServer(content=content, drops=0)
+		partFile.write_bytes(b'stale' * 1000)
+		validatorFile.write_text(json.dumps({'url': server.url, 'etag': '"old"'}))
+		self.assertTrue(commonsManager.downloadFile(url=server.url, dest=str(dest), checksum=checksum))
+		self.assertEqual(dest.read_bytes(), content)
+		self.assertFalse(validatorFile.exists())
+
+		# Neither is a part without validators
+		dest.unlink()
+		server = self.startServer(content=content, drops=0)
+		partFile.write_bytes(content[:1000])
+		self.assertTrue(commonsManager.downloadFile(url=server.url, dest=str(dest), checksum=checksum))
+		self.assertEqual(server.requestedRanges, [None])
+
+		# A part bigger than the file is deleted, not renamed into place
+		dest.unlink()
+		server = self.startServer(content=content, drops=0)
+		partFile.write_bytes(content + b'garbage')
+		validatorFile.write_text(json.dumps({'url': server.url, 'etag': server.etag}))
+		self.assertTrue(commonsManager.downloadFile(url=server.url, dest=str(dest)))
+		self.assertEqual(dest.read_bytes(), content)
+		self.assertEqual(server.requestedRanges, [f'bytes={len(content) + 7}-', None])
+
+		# A complete part is just renamed
+		dest.unlink()
+		server = self.startServer(content=content, drops=0)
+		partFile.write_bytes(content)
+		validatorFile.write_text(json.dumps({'url': server.url, 'etag': server.etag}))
+		self.assertTrue(commonsManager.downloadFile(url=server.url, dest=str(dest), checksum=checksum))
+		self.assertEqual(server.requestedRanges, [f'bytes={len(content)}-'])
+
+
 	def test_getFunctionCaller(self):
 		self.assertEqual(CommonsManager.getFunctionCaller(1), 'test_CommonsManager')
 
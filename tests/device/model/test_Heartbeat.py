@@ -17,22 +17,65 @@
 #
 #  Last modified: 2021.04.13 at 12:56:51 CEST
 
+import json
+import threading
+import time
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.commons import constants
+from core.device.model.Heartbeat import Heartbeat
 
 
 class TestHeartbeat(TestCase):
 
+	def setUp(self):
+		patcher = patch('core.base.SuperManager.SuperManager')
+		mock_superManager = patcher.start()
+		self.addCleanup(patcher.stop)
+
+		self._superManager = MagicMock()
+		mock_superManager.getInstance.return_value = self._superManager
+		self._superManager.projectAlice.shuttingDown = False
+		self._publish = self._superManager.mqttManager.mqttClient.publish
+
+
 	def test_start_heartbeat(self):
-		pass  # To be implemented or nothing to test()
+		Heartbeat(device=MagicMock(uid='core'), tempo=5)
+		self._superManager.threadManager.newThread.assert_called_once()
 
 
 	def test_stop_heart_beat(self):
-		pass  # To be implemented or nothing to test()
+		self._superManager.threadManager.newThread.side_effect = lambda name, target: threading.Thread(name=name, target=target, daemon=True).start()
+		heartbeat = Heartbeat(device=MagicMock(uid='core'), tempo=60)
+		heartbeat.stopHeartBeat()
+		time.sleep(0.1)
+		self.assertEqual(self._publish.call_count, 1)
 
 
 	def test_thread(self):
-		pass  # To be implemented or nothing to test()
+		heartbeat = Heartbeat(device=MagicMock(uid='core'), tempo=0.01)
+		threading.Timer(0.2, heartbeat.stopHeartBeat).start()
+		heartbeat.thread()
+
+		# One long lived loop, beating on the shared client
+		self.assertGreater(self._publish.call_count, 5)
+		self._superManager.threadManager.newTimer.assert_not_called()
 
 
 	def test_beat(self):
-		pass  # To be implemented or nothing to test()
+		device = MagicMock(uid='core')
+		heartbeat = Heartbeat(device=device, tempo=5)
+
+		heartbeat.beat()
+		heartbeat.beat()
+		self._publish.assert_called_with(constants.TOPIC_CORE_HEARTBEAT, b'{"uid": "core"}', 0, False)
+		self.assertIs(self._publish.call_args_list[0].args[1], self._publish.call_args_list[1].args[1])
+
+		device.uid = 'newCore'
+		heartbeat.beat()
+		self.assertEqual(json.loads(self._publish.call_args.args[1]), {'uid': 'newCore'})
+
+		self._superManager.projectAlice.shuttingDown = True
+		heartbeat.beat()
+		self.assertEqual(self._publish.call_count, 3)
@@ -17,11 +17,39 @@
 #
 #  Last modified: 2021.04.13 at 12:56:51 CEST
 
+import heapq
+import threading
+import time
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.commons import constants
+from core.device.DeviceManager import DeviceManager
 
 
 class TestDeviceManager(TestCase):
 
+	def setUp(self):
+		patcher = patch('core.base.SuperManager.SuperManager')
+		mock_superManager = patcher.start()
+		self.addCleanup(patcher.stop)
+
+		self._superManager = MagicMock()
+		mock_superManager.getInstance.return_value = self._superManager
+		# Listen on any free port
+		self._superManager.configManager.getAliceConfigByName.side_effect = lambda name: -1 if name == 'newDeviceBroadcastPort' else MagicMock()
+
+
+	def deviceManager(self, deviceCount: int = 0) -> DeviceManager:
+		deviceManager = DeviceManager()
+		self.addCleanup(deviceManager._listenSocket.close)
+		self.addCleanup(deviceManager._broadcastSocket.close)
+
+		for i in range(1, deviceCount + 1):
+			deviceManager._devices[i] = MagicMock(id=i, uid=f'uid{i}', connected=True, heartbeatRate=5)
+
+		return deviceManager
+
 	def test_on_start(self):
 		pass  # To be implemented or nothing to test()
 
@@ -38,6 +66,54 @@ class TestDeviceManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
+	@patch.object(DeviceManager, 'FLUSH_DELAY', 0.05)
+	def test_mark_dirty(self):
+		deviceManager = self.deviceManager(deviceCount=3)
+		self._superManager.threadManager.newTimer.side_effect = lambda interval, func: self.startTimer(interval, func)
+
+		# A drag in the UI, many changes in a row
+		for _ in range(20):
+			deviceManager.markDirty(deviceManager._devices[1])
+			deviceManager.markDirty(deviceManager._devices[2])
+
+		self._superManager.databaseManager.replaceMany.assert_not_called()
+		self._superManager.threadManager.newTimer.assert_called_once()
+
+		time.sleep(deviceManager.FLUSH_DELAY * 2)
+		self._superManager.databaseManager.replaceMany.assert_called_once()
+		self.assertEqual(len(self._superManager.databaseManager.replaceMany.call_args.kwargs['values']), 2)
+		deviceManager._devices[1].publishDevice.assert_called_once()
+		deviceManager._devices[2].publishDevice.assert_called_once()
+		deviceManager._devices[3].publishDevice.assert_not_called()
+
+
+	def test_flush(self):
+		deviceManager = self.deviceManager(deviceCount=3)
+		deleted = deviceManager._devices.pop(3)
+
+		deviceManager.markDirty(deviceManager._devices[1])
+		deviceManager.markDirty(deleted)
+		deviceManager.flush()
+
+		# Synchronous, and deleted devices are not written back
+		self._superManager.threadManager.newTimer.return_value.cancel.assert_called_once()
+		self.assertEqual(self._superManager.databaseManager.replaceMany.call_args.kwargs['values'], [deviceManager._devices[1].dbValues()])
+		deleted.publishDevice.assert_not_called()
+
+		# Nothing left to do
+		self._superManager.databaseManager.replaceMany.reset_mock()
+		deviceManager.flush()
+		self._superManager.databaseManager.replaceMany.assert_not_called()
+
+
+	def startTimer(self, interval: float, func) -> threading.Timer:
+		timer = threading.Timer(interval=interval, function=func)
+		timer.daemon = True
+		timer.start()
+		self.addCleanup(timer.cancel)
+		return timer
+
+
 	def test_on_device_status(self):
 		pass  # To be implemented or nothing to test()
 
@@ -138,12 +214,120 @@ class TestDeviceManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_on_device_heartbeat(self):
-		pass  # To be implemented or nothing to test()
+	def test_device_heartbeat(self):
+		deviceManager = self.deviceManager(deviceCount=3)
+		device = deviceManager.getDevice(uid='uid2')
+		device.connected = False
+		deviceManager._heartbeatsCheckTimer = MagicMock()
+
+		subscriber = MagicMock()
+		deviceManager.subscribeHeartbeats(subscriber)
+
+		with patch.object(deviceManager, 'broadcast') as mock_broadcast:
+			# A disconnected device coming back is broadcasted once
+			deviceManager.deviceHeartbeat(uid='uid2', deviceUid='kitchen')
+			self.assertTrue(device.connected)
+			mock_broadcast.assert_called_once()
+			self.assertIn('uid2', deviceManager._heartbeats)
+
+			# Following beats only refresh the heartbeat
+			for _ in range(10):
+				deviceManager.deviceHeartbeat(uid='uid2', deviceUid='kitchen')
+			mock_broadcast.assert_called_once()
+			self._superManager.mqttManager.publish.assert_called_once()
+
+			deviceManager.deviceHeartbeat(uid='unknown')
+			self.assertNotIn('unknown', deviceManager._heartbeats)
+
+		# Subscribers get every beat
+		self.assertEqual(subscriber.call_count, 11)
+		subscriber.assert_called_with(uid='uid2', deviceUid='kitchen')
+
+		deviceManager.unsubscribeHeartbeats(subscriber)
+		deviceManager.deviceHeartbeat(uid='uid2', deviceUid='kitchen')
+		self.assertEqual(subscriber.call_count, 11)
+
+
+	def test_heartbeat_subscription_dropped_with_skill(self):
+		class Skill(object):
+			name = 'Tasmota'
+			beats = 0
+
+			def onDeviceHeartbeat(self, uid: str, deviceUid: str = None):
+				self.beats += 1
+
+		deviceManager = self.deviceManager(deviceCount=1)
+		skill = Skill()
+		deviceManager.subscribeHeartbeats(skill.onDeviceHeartbeat)
+		deviceManager.deviceHeartbeat(uid='uid1')
+
+		with patch.object(deviceManager, 'removeDeviceTypesForSkill'):
+			deviceManager.onSkillDeactivated(skill='Tasmota')
+
+		deviceManager.deviceHeartbeat(uid='uid1')
+		self.assertEqual(skill.beats, 1)
 
 
 	def test_check_heartbeats(self):
-		pass  # To be implemented or nothing to test()
+		deviceManager = self.deviceManager(deviceCount=3)
+		for uid in ('uid1', 'uid2', 'uid3'):
+			deviceManager.deviceHeartbeat(uid=uid)
+
+		with patch('core.device.DeviceManager.time') as mock_time:
+			now = time.time()
+
+			# Nothing expired, no device touched
+			mock_time.time.return_value = now + 5
+			with patch.object(deviceManager, 'getDevice', wraps=deviceManager.getDevice) as mock_getDevice:
+				deviceManager.checkHeartbeats()
+				mock_getDevice.assert_not_called()
+
+			# uid2 kept beating, the others expire
+			mock_time.time.return_value = now + 8
+			deviceManager.deviceHeartbeat(uid='uid2')
+			mock_time.time.return_value = now + 11
+			with patch.object(deviceManager, 'broadcast') as mock_broadcast:
+				deviceManager.checkHeartbeats()
+
+		# Who listens to disconnections hears about the silent ones
+		self.assertEqual(
+			[call.kwargs['uid'] for call in mock_broadcast.call_args_list if call.kwargs['method'] == constants.EVENT_DEVICE_DISCONNECTED],
+			['uid1', 'uid3']
+		)
+		self.assertFalse(deviceManager.getDevice(uid='uid1').connected)
+		self.assertTrue(deviceManager.getDevice(uid='uid2').connected)
+		self.assertFalse(deviceManager.getDevice(uid='uid3').connected)
+		self.assertEqual(set(deviceManager._heartbeats), {'uid2'})
+		self.assertEqual([uid for _, uid in deviceManager._heartbeatExpiries], ['uid2'])
+
+
+	def test_check_heartbeats_scales_with_due_devices(self):
+		work = list()
+		for deviceCount in (10, 100):
+			deviceManager = self.deviceManager(deviceCount=deviceCount)
+
+			with patch('core.device.DeviceManager.time') as mock_time, \
+					patch('core.device.DeviceManager.heapq.heappop', wraps=heapq.heappop) as mock_heappop, \
+					patch.object(deviceManager, 'getDevice', wraps=deviceManager.getDevice) as mock_getDevice:
+				now = time.time()
+
+				# Three devices went silent, all the others keep beating
+				mock_time.time.return_value = now - 100
+				for i in range(1, 4):
+					deviceManager.deviceHeartbeat(uid=f'uid{i}')
+
+				mock_time.time.return_value = now
+				for i in range(4, deviceCount + 1):
+					deviceManager.deviceHeartbeat(uid=f'uid{i}')
+
+				mock_getDevice.reset_mock()
+				deviceManager.checkHeartbeats()
+				work.append((mock_heappop.call_count, mock_getDevice.call_count))
+
+			self.assertEqual(len(deviceManager._heartbeats), deviceCount - 3)
+
+		# Only the due devices are looked at, however many there are
+		self.assertEqual(work, [(3, 3), (3, 3)])
 
 
 	def test_get_device_type_by_skill_raw(self):
@@ -199,7 +383,17 @@ class TestDeviceManager(TestCase):
 
 
 	def test_get_device_by_uid(self):
-		pass  # To be implemented or nothing to test()
+		deviceManager = self.deviceManager(deviceCount=3)
+		device = deviceManager.getDevice(uid='uid3')
+		self.assertEqual(device.id, 3)
+
+		# Remembered devices are still checked
+		device.uid = 'paired'
+		self.assertIsNone(deviceManager.getDevice(uid='uid3'))
+		self.assertIs(deviceManager.getDevice(uid='paired'), device)
+
+		deviceManager._devices.pop(3)
+		self.assertIsNone(deviceManager.getDevice(uid='paired'))
 
 
 	def test_get_device_by_id(self):
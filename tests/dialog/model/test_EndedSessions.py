@@ -0,0 +1,100 @@
+#  Copyright (c) 2021
+#
+#  This file, test_EndedSessions.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.04.13 at 12:56:51 CEST
+
+import gc
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import patch
+
+from core.dialog.model.DialogSession import DialogSession
+from core.dialog.model.EndedSessions import EndedSessions
+
+
+class TestEndedSessions(TestCase):
+
+	def setUp(self):
+		# Not a mock, mocks remember their calls, which would show in the memory measurements
+		configManager = SimpleNamespace(getAliceConfigByName=lambda name: 0.5)
+		superManager = SimpleNamespace(getInstance=lambda: SimpleNamespace(configManager=configManager))
+		patcher = patch('core.dialog.model.DialogSession.SuperManager', superManager)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+
+	@staticmethod
+	def session(i: int, deviceUid: str = 'device') -> DialogSession:
+		session = DialogSession(deviceUid=deviceUid, sessionId=f'session-{i}')
+		session.intentHistory = ['hermes/intent/first', 'hermes/intent/second', 'hermes/intent/third']
+		session.payload = {'input': 'x' * 200, 'slots': [{'value': i}]}
+		session.customData = {'i': i}
+		return session
+
+
+	def test_add(self):
+		store = EndedSessions()
+		store.add(self.session(1, deviceUid='kitchen'))
+		store.add(self.session(2, deviceUid='kitchen'))
+
+		ended = store.get('session-1')
+		self.assertEqual(ended.deviceUid, 'kitchen')
+		self.assertEqual(ended.customData, {'i': 1})
+		self.assertEqual(ended.previousIntent, 'hermes/intent/third')
+		self.assertEqual(ended.secondLastIntent, 'hermes/intent/second')
+		self.assertFalse(hasattr(ended, 'payload'))
+
+		self.assertEqual(store.getByDeviceUid('kitchen').sessionId, 'session-2')
+		self.assertIsNone(store.getByDeviceUid('bedroom'))
+
+
+	def test_evict(self):
+		store = EndedSessions(maxSize=2)
+		for i in range(3):
+			store.add(self.session(i, deviceUid=f'device-{i}'))
+
+		self.assertEqual(len(store), 2)
+		self.assertIsNone(store.get('session-0'))
+		self.assertIsNone(store.getByDeviceUid('device-0'))
+
+		with patch('core.dialog.model.EndedSessions.time.monotonic', return_value=10 ** 9):
+			self.assertIsNone(store.get('session-2'))
+			self.assertEqual(len(store), 0)
+
+
+	def test_memory_is_bounded(self):
+		store = EndedSessions()
+		# One session reused for all of them, the store copies what it keeps
+		session = self.session(0)
+
+		def simulate(start: int, count: int):
+			for i in range(start, start + count):
+				session.sessionId = f'session-{i}'
+				session.deviceUid = f'device-{i % 10}'
+				session.customData = {'i': i}
+				store.add(session)
+
+		simulate(0, 1000)
+		gc.collect()
+		baseline = len(gc.get_objects())
+
+		# Tracing allocations over that many sessions takes seconds, what stays alive tells the same
+		simulate(1000, 100000)
+		gc.collect()
+
+		self.assertEqual(len(store), 100)
+		self.assertLess(len(gc.get_objects()) - baseline, 1000)
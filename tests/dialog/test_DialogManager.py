@@ -18,6 +18,11 @@
 #  Last modified: 2021.04.13 at 12:56:51 CEST
 
 from unittest import TestCase
+from unittest.mock import MagicMock, call, patch
+
+from core.commons import constants
+from core.dialog.DialogManager import DialogManager
+from core.dialog.model.DialogSession import DialogSession
 
 
 class TestDialogManager(TestCase):
@@ -90,24 +95,83 @@ class TestDialogManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_on_session_ended(self):
-		pass  # To be implemented or nothing to test()
+	@patch('core.base.SuperManager.SuperManager')
+	def test_on_session_ended(self, mock_superManager):
+		mock_superManager.getInstance.return_value = MagicMock()
+		dialogManager = DialogManager()
+
+		session = DialogSession(deviceUid='kitchen', sessionId='session1')
+		session.payload = {'sessionId': 'session1', 'termination': {'reason': 'nominal'}}
+		otherSession = DialogSession(deviceUid='office', sessionId='session2')
+		otherSession.payload = {'sessionId': 'session2', 'text': 'hi'}
+
+		listener = dialogManager.listenSession(sessionId='session1')
+
+		dialogManager.onSay(otherSession)
+		self.assertTrue(listener.empty())
+
+		session.payload['text'] = 'Hello'
+		dialogManager.onSay(session)
+		dialogManager.onSessionEnded(session)
+
+		self.assertEqual(listener.get_nowait(), {'event': 'say', 'sessionId': 'session1', 'text': 'Hello'})
+		self.assertEqual(listener.get_nowait(), {'event': 'ended', 'sessionId': 'session1', 'reason': 'nominal'})
+		self.assertTrue(session.hasEnded)
+
+		dialogManager.stopListeningSession(sessionId='session1', listener=listener)
+		dialogManager.onSay(session)
+		self.assertTrue(listener.empty())
+		self.assertNotIn('session1', dialogManager._sessionListeners)
 
 
 	def test_on_session_error(self):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_toggle_feedback_sound(self):
-		pass  # To be implemented or nothing to test()
+	@patch('core.base.SuperManager.SuperManager')
+	def test_toggle_feedback_sound(self, mock_superManager):
+		superManager = MagicMock()
+		mock_superManager.getInstance.return_value = superManager
+		dialogManager = DialogManager()
 
+		superManager.deviceManager.getDevicesWithAbilities.return_value = [MagicMock(uid='kitchen'), MagicMock(uid='office')]
 
-	def test_on_toggle_feedback_on(self):
-		pass  # To be implemented or nothing to test()
+		# One message per device, they match their own site id
+		dialogManager.toggleFeedbackSound(state='off')
+		self.assertEqual(superManager.mqttManager.publish.call_args_list, [
+			call(topic=constants.TOPIC_TOGGLE_FEEDBACK_OFF, payload={'siteId': 'kitchen'}),
+			call(topic=constants.TOPIC_TOGGLE_FEEDBACK_OFF, payload={'siteId': 'office'})
+		])
+		self.assertFalse(dialogManager.feedbackSoundEnabled(deviceUid='kitchen'))
 
+		dialogManager.toggleFeedbackSound(state='On', deviceUid='kitchen')
+		self.assertTrue(dialogManager.feedbackSoundEnabled(deviceUid='kitchen'))
+		self.assertFalse(dialogManager.feedbackSoundEnabled(deviceUid='office'))
 
-	def test_on_toggle_feedback_off(self):
-		pass  # To be implemented or nothing to test()
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_on_toggle_feedback_on(self, mock_superManager):
+		mock_superManager.getInstance.return_value = MagicMock()
+		dialogManager = DialogManager()
+
+		dialogManager.onToggleFeedbackOff(deviceUid=constants.ALL)
+		dialogManager.onToggleFeedbackOn(deviceUid='kitchen')
+		self.assertTrue(dialogManager.feedbackSoundEnabled(deviceUid='kitchen'))
+		self.assertFalse(dialogManager.feedbackSoundEnabled(deviceUid='office'))
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_on_toggle_feedback_off(self, mock_superManager):
+		mock_superManager.getInstance.return_value = MagicMock()
+		dialogManager = DialogManager()
+
+		dialogManager.onToggleFeedbackOff(deviceUid='kitchen')
+		self.assertFalse(dialogManager.feedbackSoundEnabled(deviceUid='kitchen'))
+		self.assertTrue(dialogManager.feedbackSoundEnabled(deviceUid='office'))
+
+		# Toggling all devices overrides the per device states
+		dialogManager.onToggleFeedbackOn(deviceUid=constants.ALL)
+		self.assertTrue(dialogManager.feedbackSoundEnabled(deviceUid='kitchen'))
 
 
 	def test_on_intent_not_recognized(self):
@@ -17,7 +17,75 @@
 #
 #  Last modified: 2021.04.13 at 12:56:51 CEST
 
+import json
+import time
+from contextlib import nullcontext
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.commons import constants
+from core.dialog.MultiIntentManager import MultiIntentManager
+from core.dialog.model.DialogSession import DialogSession
+
+
+class ReplayBroker(object):
+	"""
+	Replays the dialog flow of a multi intent utterance, every message going through the broker costs some latency
+	"""
+	LATENCY = 0.005
+
+
+	def __init__(self, multiIntentManager: MultiIntentManager, session: DialogSession, mock_instance: MagicMock):
+		self.multiIntentManager = multiIntentManager
+		self.session = session
+		self.published = list()
+		self.dispatched = list()
+		self.nluCalls = 0
+
+		mock_instance.mqttManager.publish.side_effect = self.publish
+		mock_instance.mqttManager.captured.side_effect = lambda _client, _data, message: self.captured(json.loads(message.payload)['text'])
+		mock_instance.nluManager.query.side_effect = lambda session, text, intentFilter: self.parsed(text)
+		mock_instance.nluManager.parseBatch.side_effect = lambda texts, intentFilter: self.parse(texts)
+
+
+	def publish(self, topic: str, payload: dict):
+		time.sleep(self.LATENCY)
+		self.published.append(topic)
+
+		if topic == constants.TOPIC_TEXT_CAPTURED:
+			self.captured(payload['text'])
+		elif topic == constants.TOPIC_NLU_QUERY:
+			self.parse([payload['input']])
+			self.publish(constants.TOPIC_INTENT_PARSED, {'input': payload['input']})
+		elif topic == constants.TOPIC_INTENT_PARSED:
+			self.parsed(payload['input'])
+		elif topic.startswith('hermes/intent/'):
+			self.dispatched.append(payload['input'])
+			self.multiIntentManager.processNextIntent(self.session)
+
+
+	def captured(self, text: str):
+		self.publish(constants.TOPIC_NLU_QUERY, {'input': text})
+
+
+	def parse(self, texts: list):
+		# An engine call costs the same, whatever the number of utterances
+		time.sleep(self.LATENCY)
+		self.nluCalls += 1
+
+
+	def parsed(self, text: str):
+		self.publish(f'hermes/intent/{text.strip()}', {'input': text})
+
+
+def legacyProcessNextIntent(self, session: DialogSession) -> bool:
+	# What the manager used to do, a broker round trip per part
+	intent = self._multiIntents[session.sessionId].getNextIntent()
+	if not intent:
+		return False
+
+	self.MqttManager.publish(topic=constants.TOPIC_TEXT_CAPTURED, payload={'sessionId': session.sessionId, 'text': intent})
+	return True
 
 
 class TestMultiIntentManager(TestCase):
@@ -30,8 +98,45 @@ class TestMultiIntentManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_process_next_intent(self):
-		pass  # To be implemented or nothing to test()
+	@patch('core.dialog.model.DialogSession.SuperManager')
+	@patch('core.base.SuperManager.SuperManager')
+	def test_process_next_intent(self, mock_superManager, _mock_sessionSuperManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.languageManager.getStrings.return_value = [' and ']
+		mock_instance.dialogManager.getEnabledByDefaultIntents.return_value = {'Intent'}
+
+		def replay(canParse: bool, legacy: bool = False) -> tuple:
+			mock_instance.nluManager.canParse = canParse
+			mock_instance.nluManager.queriedDirectly = canParse
+			multiIntentManager = MultiIntentManager()
+			session = DialogSession(deviceUid='device', sessionId='session')
+			session.payload = {'input': 'lights on and play music and set a timer'}
+			mock_instance.dialogManager.getSession.return_value = session
+			broker = ReplayBroker(multiIntentManager, session, mock_instance)
+
+			start = time.monotonic()
+			with patch.object(MultiIntentManager, 'processNextIntent', legacyProcessNextIntent) if legacy else nullcontext():
+				self.assertTrue(multiIntentManager.processMessage(MagicMock()))
+
+			self.assertEqual([text.strip() for text in broker.dispatched], ['lights on', 'play music', 'set a timer'])
+			return time.monotonic() - start, len(broker.published), broker.nluCalls
+
+		legacyLatency, legacyMessages, legacyNluCalls = replay(canParse=False, legacy=True)
+		queuedLatency, queuedMessages, queuedNluCalls = replay(canParse=False)
+		batchLatency, batchMessages, batchNluCalls = replay(canParse=True)
+
+		# The parts don't go through the broker as captured text anymore
+		self.assertEqual(legacyMessages, 12)
+		self.assertEqual(queuedMessages, 9)
+		self.assertEqual(batchMessages, 3)
+
+		# The in process NLU parses all parts at once
+		self.assertEqual(legacyNluCalls, 3)
+		self.assertEqual(batchNluCalls, 1)
+
+		self.assertLess(queuedLatency, legacyLatency)
+		self.assertLess(batchLatency, queuedLatency)
 
 
 	def test_query_nlu(self):
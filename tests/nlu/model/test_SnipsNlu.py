@@ -17,11 +17,53 @@
 #
 #  Last modified: 2021.04.13 at 12:56:51 CEST
 
+import json
+import tempfile
+from pathlib import Path
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.nlu.model.SnipsNlu import SnipsNlu
+
+
+def dialogTemplate(skill: str, utterances: list) -> dict:
+	return {
+		'skill'    : skill,
+		'slotTypes': [{
+			'name'                   : f'{skill}Type',
+			'automaticallyExtensible': False,
+			'matchingStrictness'     : None,
+			'useSynonyms'            : True,
+			'values'                 : [{'value': 'kitchen', 'synonyms': ['cooking room']}]
+		}],
+		'intents'  : [{
+			'name'      : f'{skill}Intent',
+			'utterances': utterances,
+			'slots'     : [{'name': 'Location', 'type': f'{skill}Type'}]
+		}]
+	}
 
 
 class TestSnipsNlu(TestCase):
 
+	def setUp(self):
+		self._tmpDir = tempfile.TemporaryDirectory()
+		self.addCleanup(self._tmpDir.cleanup)
+		self._rootDir = Path(self._tmpDir.name)
+		Path(self._rootDir, 'var/cache/nlu/trainingData').mkdir(parents=True)
+
+		patcher = patch('core.base.SuperManager.SuperManager')
+		mock_superManager = patcher.start()
+		self.addCleanup(patcher.stop)
+
+		self._superManager = MagicMock()
+		mock_superManager.getInstance.return_value = self._superManager
+		self._superManager.commonsManager.rootDir.return_value = str(self._rootDir)
+		self._superManager.languageManager.activeLanguage = 'en'
+		self._superManager.nluManager.training = False
+		self._superManager.projectAlice.isBooted = False
+
+
 	def test_start(self):
 		pass  # To be implemented or nothing to test()
 
@@ -31,15 +73,109 @@ class TestSnipsNlu(TestCase):
 
 
 	def test_convert_dialog_template(self):
-		pass  # To be implemented or nothing to test()
+		snipsNlu = SnipsNlu()
+		dataFile = self._rootDir / 'data.json'
+		dataFile.write_text(json.dumps([
+			dialogTemplate('SkillB', ['turn on the {kitchen:=>Location}']),
+			dialogTemplate('SkillA', ['hello'])
+		]))
+
+		with patch.object(SnipsNlu, 'convertSkillTemplate', wraps=snipsNlu.convertSkillTemplate) as mock_convert:
+			snipsNlu.convertDialogTemplate(dataFile)
+			self.assertEqual(mock_convert.call_count, 2)
+
+			merged = json.loads(Path(snipsNlu._cachePath, 'en.json').read_text())
+			self.assertEqual(set(merged['intents']), {'SkillAIntent', 'SkillBIntent'})
+			self.assertEqual(merged['intents']['SkillBIntent']['utterances'][0]['data'][1], {'entity': 'SkillBType', 'slot_name': 'Location', 'text': 'kitchen'})
+			self.assertEqual(merged['entities']['SkillAType']['matching_strictness'], 1.0)
+
+			# Only the changed skill is converted again, removed skills are dropped
+			mock_convert.reset_mock()
+			dataFile.write_text(json.dumps([
+				dialogTemplate('SkillB', ['turn off the {kitchen:=>Location}'])
+			]))
+			snipsNlu.convertDialogTemplate(dataFile)
+			mock_convert.assert_called_once()
+			self.assertFalse(Path(snipsNlu._cachePath, 'SkillA_en.json').exists())
+
+			mock_convert.reset_mock()
+			snipsNlu.convertDialogTemplate(dataFile)
+			mock_convert.assert_not_called()
+
+			merged = json.loads(Path(snipsNlu._cachePath, 'en.json').read_text())
+			self.assertEqual(set(merged['intents']), {'SkillBIntent'})
 
 
 	def test_train(self):
-		pass  # To be implemented or nothing to test()
+		snipsNlu = SnipsNlu()
+		dataFile = self._rootDir / 'data.json'
+		dataFile.write_text(json.dumps([dialogTemplate('SkillA', ['hello'])]))
+		snipsNlu.convertDialogTemplate(dataFile)
+		self._superManager.threadManager.newThread.side_effect = lambda name, target, args: target(*args)
+
+		def fakeTraining(datasetFile: Path, checksum: str):
+			snipsNlu.enginePath().mkdir(parents=True, exist_ok=True)
+			Path(snipsNlu._cachePath, 'en.checksum').write_text(checksum)
+			self._superManager.nluManager.training = False
+
+		with patch.object(snipsNlu, 'nluTrainingThread', side_effect=fakeTraining) as mock_training:
+			snipsNlu.train()
+			mock_training.assert_called_once()
+
+			# Same dataset, the trained engine is kept
+			mock_training.reset_mock()
+			snipsNlu.train()
+			mock_training.assert_not_called()
+
+			# Changed dataset is trained, in the background as we have an engine to boot with
+			dataFile.write_text(json.dumps([dialogTemplate('SkillA', ['hello there'])]))
+			snipsNlu.convertDialogTemplate(dataFile)
+			snipsNlu.train()
+			mock_training.assert_called_once()
+			self._superManager.threadManager.newThread.assert_called_once()
 
 
 	def test_nlu_training_thread(self):
-		pass  # To be implemented or nothing to test()
+		snipsNlu = SnipsNlu()
+		enginePath = snipsNlu.enginePath()
+
+		# An engine trained before versioning is a plain directory
+		enginePath.mkdir(parents=True)
+		Path(enginePath, 'nlu_engine.json').write_text('{"unit_name": "nlu_engine"}')
+
+		def fakeTraining(commands: list, valid: bool = True):
+			output = Path(commands[-1])
+			output.mkdir()
+			if valid:
+				Path(output, 'nlu_engine.json').write_text('{"unit_name": "nlu_engine"}')
+			return MagicMock(returncode=0)
+
+		self._superManager.commonsManager.runSystemCommand.side_effect = fakeTraining
+		snipsNlu.nluTrainingThread(Path('dataset.json'), 'checksum')
+
+		self.assertTrue(enginePath.is_symlink())
+		firstEngine = enginePath.resolve()
+		self.assertTrue(Path(enginePath.parent, 'nlu_engine_legacy', 'nlu_engine.json').exists())
+		self.assertEqual(Path(snipsNlu._cachePath, 'en.checksum').read_text(), 'checksum')
+
+		# Training runs with lowered priority and a memory cap
+		command = self._superManager.commonsManager.runSystemCommand.call_args.args[0]
+		self.assertEqual(command[:3], ['nice', '-n', '19'])
+		self.assertIn('prlimit', command)
+
+		# The previous engine is kept as fallback, older ones are removed
+		snipsNlu.nluTrainingThread(Path('dataset.json'), 'checksum2')
+		self.assertNotEqual(enginePath.resolve(), firstEngine)
+		self.assertTrue(firstEngine.exists())
+		self.assertFalse(Path(enginePath.parent, 'nlu_engine_legacy').exists())
+
+		# A failed training leaves the live engine untouched
+		liveEngine = enginePath.resolve()
+		self._superManager.commonsManager.runSystemCommand.side_effect = lambda commands: fakeTraining(commands, valid=False)
+		snipsNlu.nluTrainingThread(Path('dataset.json'), 'checksum3')
+		self.assertEqual(enginePath.resolve(), liveEngine)
+		self.assertFalse(Path(enginePath.parent, 'nlu_engine.training').exists())
+		self.assertEqual(Path(snipsNlu._cachePath, 'en.checksum').read_text(), 'checksum2')
 
 
 	def test_training_status(self):
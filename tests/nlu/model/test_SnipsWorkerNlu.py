@@ -0,0 +1,139 @@
+#  Copyright (c) 2021
+#
+#  This file, test_SnipsWorkerNlu.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.04.13 at 12:56:51 CEST
+
+import os
+import stat
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from multiprocessing.connection import Listener
+
+from core.nlu.model.SnipsNluWorker import SnipsNluWorker
+from core.nlu.model.SnipsWorkerNlu import SnipsWorkerNlu
+
+
+class EchoWorker(SnipsNluWorker):
+
+	def __init__(self):  # NOSONAR
+		pass  # No engine to load
+
+
+	def parseBatch(self, texts: List[str], intentFilter: List[str] = None) -> list:
+		return [{'input': text} for text in texts]
+
+
+class SlowWorker(EchoWorker):
+
+	def parseBatch(self, texts: List[str], intentFilter: List[str] = None) -> list:
+		time.sleep(0.5)
+		return super().parseBatch(texts=texts, intentFilter=intentFilter)
+
+
+class TestSnipsWorkerNlu(TestCase):
+
+	def setUp(self):
+		self._tmpDir = tempfile.TemporaryDirectory()
+		self.addCleanup(self._tmpDir.cleanup)
+
+		patcher = patch('core.base.SuperManager.SuperManager')
+		mock_superManager = patcher.start()
+		self.addCleanup(patcher.stop)
+
+		self._superManager = MagicMock()
+		mock_superManager.getInstance.return_value = self._superManager
+		self._superManager.commonsManager.rootDir.return_value = self._tmpDir.name
+		self._superManager.threadManager.newThread.side_effect = lambda name, target: threading.Thread(name=name, target=target, daemon=True).start()
+
+		self._nlu = SnipsWorkerNlu()
+		self._nlu._socketPath.parent.mkdir(parents=True)
+
+
+	def startWorker(self, authkey: bytes, worker: SnipsNluWorker = None):
+		listeners = list()
+
+		class ClosableListener(Listener):
+
+			def __init__(self, *args, **kwargs):
+				super().__init__(*args, **kwargs)
+				listeners.append(self)
+
+		# Closed before the temporary directory goes
+		self.addCleanup(lambda: [listener.close() for listener in listeners])
+
+		with patch('os.umask'), patch('core.nlu.model.SnipsNluWorker.Listener', ClosableListener):
+			threading.Thread(target=(worker or EchoWorker()).serve, args=[str(self._nlu._socketPath), authkey], daemon=True).start()
+			deadline = time.monotonic() + 2
+			while not self._nlu._socketPath.exists() and time.monotonic() < deadline:
+				time.sleep(0.01)
+
+
+	def test_parse_batch(self):
+		self._nlu._authkey = self._nlu.writeAuthkey()
+		self.assertEqual(stat.S_IMODE(os.stat(self._nlu._keyPath).st_mode), 0o600)
+
+		# No worker, no waiting
+		startedAt = time.monotonic()
+		self.assertEqual(self._nlu.parseBatch(['hello']), [None])
+		self.assertLess(time.monotonic() - startedAt, 0.5)
+
+		# Reconnected in the background once the worker is up
+		self.startWorker(authkey=self._nlu._authkey)
+		self.assertEqual(stat.S_IMODE(os.stat(self._nlu._socketPath).st_mode), 0o600)
+		deadline = time.monotonic() + 2
+		while not self._nlu._connection and time.monotonic() < deadline:
+			time.sleep(0.01)
+
+		self.assertEqual(self._nlu.parseBatch(['hello', 'bye']), [{'input': 'hello'}, {'input': 'bye'}])
+
+
+	def test_authentication(self):
+		self._nlu._authkey = b'wrong key'
+		self.startWorker(authkey=os.urandom(32))
+
+		self.assertEqual(self._nlu.parseBatch(['hello']), [None])
+		self.assertIsNone(self._nlu._connection)
+
+
+	def test_parse_timeout(self):
+		self._nlu._authkey = self._nlu.writeAuthkey()
+		worker = SlowWorker()
+		worker.parseBatch = MagicMock(side_effect=worker.parseBatch)
+		self.startWorker(authkey=self._nlu._authkey, worker=worker)
+
+		# A worker that doesn't answer in time isn't asked again, we reconnect in the background
+		with patch.object(SnipsWorkerNlu, 'PARSE_TIMEOUT', 0.1), patch.object(self._nlu, 'reconnect') as mock_reconnect:
+			startedAt = time.monotonic()
+			self.assertEqual(self._nlu.parseBatch(['hello']), [None])
+			self.assertLess(time.monotonic() - startedAt, 0.4)
+			mock_reconnect.assert_called_once()
+			self.assertIsNone(self._nlu._connection)
+
+		time.sleep(0.5)
+		worker.parseBatch.assert_called_once()
+
+		# Reconnecting, the engine can't parse and the nlu manager answers without it
+		self._nlu._reconnecting.set()
+		self.assertFalse(self._nlu.canParse)
+		self._nlu._reconnecting.clear()
+		self.assertTrue(self._nlu.canParse)
@@ -17,7 +17,11 @@
 #
 #  Last modified: 2021.04.13 at 12:56:51 CEST
 
+import tempfile
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.nlu.NluManager import NluManager
 
 
 class TestNluManager(TestCase):
@@ -56,3 +60,132 @@ class TestNluManager(TestCase):
 
 	def test_clear_cache(self):
 		pass  # To be implemented or nothing to test()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_parse_batch(self, mock_superManager):
+		tmpDir = tempfile.TemporaryDirectory()
+		self.addCleanup(tmpDir.cleanup)
+		mock_instance = MagicMock()
+		mock_instance.commonsManager.rootDir.return_value = tmpDir.name
+		mock_superManager.getInstance.return_value = mock_instance
+
+		nluManager = NluManager()
+
+		engine = MagicMock()
+		engine.parseBatch.side_effect = lambda texts, intentFilter: [{'input': text, 'intent': {'intentName': 'Greet'}} if text != 'unknown' else None for text in texts]
+		nluManager._nluEngine = engine
+
+		result = nluManager.parseBatch(['Hello', 'unknown', ' hello  '], intentFilter=['Greet'])
+		# The engine parses what was said, the input is always the caller's text
+		engine.parseBatch.assert_called_once_with(texts=['Hello', 'unknown'], intentFilter=['Greet'])
+		self.assertEqual(result[0]['intent']['intentName'], 'Greet')
+		self.assertEqual(result[0]['input'], 'Hello')
+		self.assertIsNone(result[1])
+		self.assertEqual(result[2]['intent'], result[0]['intent'])
+		self.assertEqual(result[2]['input'], ' hello  ')
+
+		# Cached, including unrecognized utterances, results are copies
+		engine.parseBatch.reset_mock()
+		result[0]['intent']['intentName'] = 'Modified'
+		self.assertEqual(nluManager.parse('HELLO', intentFilter=['Greet'])['intent']['intentName'], 'Greet')
+		self.assertIsNone(nluManager.parse('unknown', intentFilter=['Greet']))
+		engine.parseBatch.assert_not_called()
+
+		# Only misses are sent to the engine, another intent filter is another entry
+		nluManager.parseBatch(['hello', 'good morning'], intentFilter=['Greet'])
+		engine.parseBatch.assert_called_once_with(texts=['good morning'], intentFilter=['Greet'])
+		engine.parseBatch.reset_mock()
+		nluManager.parse('hello')
+		engine.parseBatch.assert_called_once()
+
+		# A new model invalidates the cache
+		engine.parseBatch.reset_mock()
+		nluManager.onNluTrained()
+		nluManager.parse('hello', intentFilter=['Greet'])
+		engine.parseBatch.assert_called_once()
+
+		# The cache is bounded
+		with patch.object(NluManager, 'PARSE_CACHE_SIZE', 2):
+			nluManager.parseBatch(['one', 'two', 'three'])
+			self.assertEqual(len(nluManager._parseCache), 2)
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_query(self, mock_superManager):
+		tmpDir = tempfile.TemporaryDirectory()
+		self.addCleanup(tmpDir.cleanup)
+		mock_instance = MagicMock()
+		mock_instance.commonsManager.rootDir.return_value = tmpDir.name
+		mock_superManager.getInstance.return_value = mock_instance
+
+		nluManager = NluManager()
+
+		engine = MagicMock()
+		engine.canParse = False
+		engine.queriedDirectly = True
+		engine.parseBatch.side_effect = lambda texts, intentFilter: [None for _ in texts]
+		nluManager._nluEngine = engine
+		session = MagicMock(sessionId='session')
+
+		# A reloading engine answers right away, nothing would answer through the broker
+		nluManager.query(session=session, text='hello', intentFilter=['Greet'])
+		engine.parseBatch.assert_not_called()
+		mock_instance.mqttManager.intentParsed.assert_not_called()
+		mock_instance.mqttManager.nluIntentNotRecognized.assert_called_once()
+
+		# Nothing parsed while it can't parse is remembered
+		nluManager.parse('hello', intentFilter=['Greet'])
+		self.assertEqual(len(nluManager._parseCache), 0)
+
+		engine.canParse = True
+		engine.parseBatch.side_effect = lambda texts, intentFilter: [{'input': text, 'intent': {'intentName': 'Greet'}} for text in texts]
+		nluManager.query(session=session, text='hello', intentFilter=['Greet'])
+		mock_instance.mqttManager.intentParsed.assert_called_once()
+		mock_instance.mqttManager.nluIntentNotRecognized.assert_called_once()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_restart_engine(self, mock_superManager):
+		tmpDir = tempfile.TemporaryDirectory()
+		self.addCleanup(tmpDir.cleanup)
+		mock_instance = MagicMock()
+		mock_instance.commonsManager.rootDir.return_value = tmpDir.name
+		mock_superManager.getInstance.return_value = mock_instance
+
+		nluManager = NluManager()
+		calls = list()
+
+		def newEngine(name: str, direct: bool = True, ready: bool = True) -> MagicMock:
+			engine = MagicMock(NAME=name, queriedDirectly=direct)
+			engine.start.side_effect = lambda: calls.append(f'{name} start')
+			engine.stop.side_effect = lambda: calls.append(f'{name} stop')
+			engine.waitUntilReady.side_effect = lambda: ready
+			return engine
+
+		old = newEngine('old')
+		nluManager._nluEngine = old
+		nluManager._parseCache['key'] = None
+
+		# The running engine serves until the new one answers
+		new = newEngine('new')
+		with patch.object(nluManager, 'selectNluEngine', return_value=new):
+			nluManager.restartEngine()
+		self.assertEqual(calls, ['new start', 'old stop'])
+		self.assertIs(nluManager._nluEngine, new)
+		self.assertEqual(len(nluManager._parseCache), 0)
+
+		# A new engine that doesn't come up is dropped, the running one stays
+		calls.clear()
+		broken = newEngine('broken', ready=False)
+		with patch.object(nluManager, 'selectNluEngine', return_value=broken):
+			nluManager.restartEngine()
+		self.assertEqual(calls, ['broken start', 'broken stop'])
+		self.assertIs(nluManager._nluEngine, new)
+
+		# Engines behind the broker share the service, they can't run side by side
+		calls.clear()
+		nluManager._nluEngine = newEngine('service', direct=False)
+		with patch.object(nluManager, 'selectNluEngine', return_value=newEngine('restarted', direct=False)):
+			nluManager.restartEngine()
+		self.assertEqual(calls, ['service stop', 'restarted start'])
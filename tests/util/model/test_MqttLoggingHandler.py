@@ -17,13 +17,136 @@
 #
 #  Last modified: 2021.04.13 at 12:56:52 CEST
 
+import logging
+import threading
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.commons import constants
+from core.util.model.MqttLoggingHandler import MqttLoggingHandler
 
 
 class TestMqttLoggingHandler(TestCase):
 
+	def setUp(self):
+		patcher = patch('core.util.model.MqttLoggingHandler.SuperManager')
+		mock_superManager = patcher.start()
+		self.addCleanup(patcher.stop)
+
+		self._superManager = MagicMock()
+		mock_superManager.getInstance.return_value = self._superManager
+		self._superManager.configManager.getAliceConfigByName.side_effect = lambda name: {'syslogMirrorInterval': 60000}.get(name, '')
+		self._superManager.mqttManager.hasSyslogListener = True
+		self._superManager.mqttManager.hasSyslogBatchListener = False
+
+		self._handler = MqttLoggingHandler()
+		self.addCleanup(self._handler.close)
+
+
+	@staticmethod
+	def record(msg: str, level: int = logging.INFO) -> logging.LogRecord:
+		return logging.LogRecord(name='ProjectAlice', level=level, pathname=__file__, lineno=0, msg=msg, args=None, exc_info=None)
+
+
 	def test_emit(self):
-		pass  # To be implemented or nothing to test()
+		self._handler.emit(self.record('[Component]    hello'))
+		self._superManager.mqttManager.publish.assert_not_called()
+
+		self._handler.flush()
+		payload = self._superManager.mqttManager.publish.call_args.kwargs['payload']
+		self.assertEqual(payload['component'], 'Component')
+		self.assertEqual(payload['msg'], 'hello')
+
+
+	def test_flush(self):
+		for i in range(10):
+			self._handler.emit(self.record(f'[Component] line {i}'))
+		self._handler.emit(self.record('[Other] line'))
+
+		# One message per pending record, in order
+		self._handler.flush()
+		payloads = [call.kwargs['payload'] for call in self._superManager.mqttManager.publish.call_args_list]
+		self.assertEqual([payload['msg'] for payload in payloads], [f'line {i}' for i in range(10)] + ['line'])
+
+		# Nothing pending, nothing published
+		self._superManager.mqttManager.publish.reset_mock()
+		self._handler.flush()
+		self._superManager.mqttManager.publish.assert_not_called()
+
+
+	def test_listeners(self):
+		mqttManager = self._superManager.mqttManager
+
+		# Nobody listens, nothing is published but the history is kept
+		mqttManager.hasSyslogListener = False
+		self._handler.emit(self.record('[Component] unheard'))
+		self._handler.flush()
+		mqttManager.publish.assert_not_called()
+		self.assertEqual(self._handler.history[-1]['msg'], 'unheard')
+
+		# Batch listeners get one message per flush
+		mqttManager.hasSyslogBatchListener = True
+		for i in range(10):
+			self._handler.emit(self.record(f'[Component] line {i}'))
+		self._handler.flush()
+		mqttManager.publish.assert_called_once()
+		self.assertEqual(mqttManager.publish.call_args.kwargs['topic'], constants.TOPIC_SYSLOG_BATCH)
+		payload = mqttManager.publish.call_args.kwargs['payload']
+		self.assertEqual(payload['version'], MqttLoggingHandler.BATCH_VERSION)
+		self.assertEqual([record['msg'] for record in payload['records']], [f'line {i}' for i in range(10)])
+		self.assertEqual(payload['dropped'], 0)
+
+
+	def test_dropped(self):
+		self._superManager.mqttManager.hasSyslogListener = False
+		self._superManager.mqttManager.hasSyslogBatchListener = True
+
+		for i in range(MqttLoggingHandler.HISTORY_SIZE + 10):
+			self._handler.emit(self.record(f'[Component] line {i}'))
+
+		with patch.object(self._handler._logger, 'doLog') as mock_doLog:
+			self._handler.flush()
+
+		payload = self._superManager.mqttManager.publish.call_args.kwargs['payload']
+		self.assertEqual(payload['dropped'], 10)
+		self.assertEqual(len(payload['records']), MqttLoggingHandler.HISTORY_SIZE)
+		self.assertIn('10 log records were dropped', mock_doLog.call_args.kwargs['msg'])
+
+
+	def test_single_flusher(self):
+		barrier = threading.Barrier(8)
+
+		def emit():
+			barrier.wait()
+			self._handler.emit(self.record('[Component] line'))
+
+		threads = [threading.Thread(target=emit) for _ in range(8)]
+		with patch('core.util.model.MqttLoggingHandler.threading.Thread', wraps=threading.Thread) as mock_thread:
+			for thread in threads:
+				thread.start()
+			for thread in threads:
+				thread.join()
+
+		self.assertEqual(mock_thread.call_count, 1)
+
+
+	def test_filters(self):
+		self._superManager.configManager.getAliceConfigByName.side_effect = lambda name: {'syslogMirrorComponents': 'Component', 'syslogMirrorLevel': 'INFO'}.get(name, '')
+		self._handler.loadSettings()
+
+		logger = logging.getLogger('MqttLoggingHandlerTest')
+		logger.propagate = False
+		logger.setLevel(logging.DEBUG)
+		logger.addHandler(self._handler)
+		self.addCleanup(logger.removeHandler, self._handler)
+
+		logger.debug('[Component] debug line')
+		logger.info('[Component] info line')
+		logger.info('[Other] info line')
+		self._handler.flush()
+
+		payloads = [call.kwargs['payload'] for call in self._superManager.mqttManager.publish.call_args_list]
+		self.assertEqual([payload['msg'] for payload in payloads], ['info line'])
 
 
 	def test_save_to_history(self):
@@ -31,4 +154,9 @@ class TestMqttLoggingHandler(TestCase):
 
 
 	def test_history(self):
-		pass  # To be implemented or nothing to test()
+		for i in range(MqttLoggingHandler.HISTORY_SIZE + 10):
+			self._handler.emit(self.record(f'[Component] line {i}'))
+
+		history = self._handler.history
+		self.assertEqual(len(history), MqttLoggingHandler.HISTORY_SIZE)
+		self.assertEqual(history[-1]['msg'], f'line {MqttLoggingHandler.HISTORY_SIZE + 9}')
@@ -17,7 +17,13 @@
 #
 #  Last modified: 2021.04.13 at 12:56:52 CEST
 
+import sqlite3
+import tempfile
+from pathlib import Path
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.util.DatabaseManager import DatabaseManager
 
 
 class TestDatabaseManager(TestCase):
@@ -46,6 +52,31 @@ class TestDatabaseManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
+	@patch('core.base.SuperManager.SuperManager')
+	def test_replace_many(self, mock_superManager):
+		mock_superManager.getInstance.return_value = MagicMock()
+
+		tmpDir = tempfile.TemporaryDirectory()
+		self.addCleanup(tmpDir.cleanup)
+		database = Path(tmpDir.name, 'data.db')
+		with sqlite3.connect(database) as con:
+			con.execute('CREATE TABLE Test_rows (id INTEGER PRIMARY KEY, value TEXT)')
+			con.execute("INSERT INTO Test_rows (id, value) VALUES (1, 'old')")
+		con.close()
+
+		query = 'REPLACE INTO :__table__ (id, value) VALUES (:id, :value)'
+		with patch('core.util.DatabaseManager.constants.DATABASE_FILE', str(database)):
+			databaseManager = DatabaseManager()
+			self.assertTrue(databaseManager.replaceMany(tableName='rows', query=query, callerName='Test', values=[{'id': 1, 'value': 'new'}, {'id': 2, 'value': 'added'}]))
+
+			# All or nothing
+			self.assertFalse(databaseManager.replaceMany(tableName='rows', query=query, callerName='Test', values=[{'id': 3, 'value': 'lost'}, {'id': 'nope'}]))
+
+		with sqlite3.connect(database) as con:
+			self.assertEqual(con.execute('SELECT id, value FROM Test_rows ORDER BY id').fetchall(), [(1, 'new'), (2, 'added')])
+		con.close()
+
+
 	def test_insert(self):
 		pass  # To be implemented or nothing to test()
 
@@ -73,6 +73,9 @@ class TestDecorators(unittest.TestCase):
 					self.online = False
 				return self.online
 
+			def probeNow(self):
+				pass
+
 
 		exampleObject = AliceSkill()
 
@@ -17,6 +17,9 @@
 #
 #  Last modified: 2021.04.13 at 12:56:52 CEST
 
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest import mock
 
 import unittest
@@ -26,6 +29,25 @@ from unittest.mock import MagicMock, PropertyMock
 from core.util.InternetManager import InternetManager
 
 
+class ProbeHandler(BaseHTTPRequestHandler):
+	stall = threading.Event()
+	released = threading.Event()
+
+
+	def do_GET(self):  # NOSONAR
+		if ProbeHandler.stall.is_set():
+			# Black hole, until the test is over
+			ProbeHandler.released.wait(timeout=30)
+			return
+
+		self.send_response(204)
+		self.end_headers()
+
+
+	def log_message(self, *args):
+		pass
+
+
 class TestInternetManager(unittest.TestCase):
 
 	@mock.patch('core.util.InternetManager.Manager.broadcast')
@@ -60,7 +82,7 @@ class TestInternetManager(unittest.TestCase):
 		mock_instance.configManager.getAliceConfigByName.return_value = False
 		internetManager.checkOnlineState()
 
-		mock_requests.get.assert_called_once_with(address)
+		mock_requests.get.assert_called_once_with(address, timeout=InternetManager.PROBE_TIMEOUT)
 		mock_broadcast.assert_called_once_with(method='internetConnected', exceptions=['InternetManager'], propagateToSkills=True)
 		self.assertEqual(internetManager.online, True)
 		mock_broadcast.reset_mock()
@@ -68,7 +90,7 @@ class TestInternetManager(unittest.TestCase):
 
 		# when calling check online state a second time it does not broadcast again
 		internetManager.checkOnlineState()
-		mock_requests.get.assert_called_once_with(address)
+		mock_requests.get.assert_called_once_with(address, timeout=InternetManager.PROBE_TIMEOUT)
 		mock_broadcast.assert_not_called()
 		self.assertEqual(internetManager.online, True)
 		mock_broadcast.reset_mock()
@@ -82,7 +104,7 @@ class TestInternetManager(unittest.TestCase):
 
 		# when wrong status code is returned (and currently online)
 		internetManager.checkOnlineState()
-		mock_requests.get.assert_called_once_with(address)
+		mock_requests.get.assert_called_once_with(address, timeout=InternetManager.PROBE_TIMEOUT)
 		mock_broadcast.assert_called_once_with(method='internetLost', exceptions=['InternetManager'], propagateToSkills=True)
 		self.assertEqual(internetManager.online, False)
 		mock_broadcast.reset_mock()
@@ -90,7 +112,7 @@ class TestInternetManager(unittest.TestCase):
 
 		# when calling check online state a second time it does not broadcast again
 		internetManager.checkOnlineState()
-		mock_requests.get.assert_called_once_with(address)
+		mock_requests.get.assert_called_once_with(address, timeout=InternetManager.PROBE_TIMEOUT)
 		mock_broadcast.assert_not_called()
 		self.assertEqual(internetManager.online, False)
 		mock_broadcast.reset_mock()
@@ -108,10 +130,65 @@ class TestInternetManager(unittest.TestCase):
 		# request raises exception is the same as non 204 status code
 		mock_requests.get.side_effect = RequestException
 		internetManager.checkOnlineState()
-		mock_requests.get.assert_called_once_with(address)
+		mock_requests.get.assert_called_once_with(address, timeout=InternetManager.PROBE_TIMEOUT)
 		mock_broadcast.assert_called_once_with(method='internetLost', exceptions=['InternetManager'], propagateToSkills=True)
 		self.assertEqual(internetManager.online, False)
 
 
+	@mock.patch('core.util.InternetManager.Manager.broadcast')
+	@mock.patch('core.util.InternetManager.InternetManager.Commons', new_callable=PropertyMock)
+	@mock.patch('core.base.SuperManager.SuperManager')
+	def test_stalling_probe(self, mock_superManager, mock_commons, mock_broadcast):
+		common_mock = MagicMock()
+		common_mock.getFunctionCaller.return_value = 'InternetManager'
+		mock_commons.return_value = common_mock
+
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.configManager.getAliceConfigByName.return_value = False
+
+		ProbeHandler.stall.clear()
+		ProbeHandler.released.clear()
+		server = ThreadingHTTPServer(('127.0.0.1', 0), ProbeHandler)
+		threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True).start()
+		self.addCleanup(server.server_close)
+		self.addCleanup(server.shutdown)
+		self.addCleanup(ProbeHandler.released.set)
+		address = f'http://127.0.0.1:{server.server_address[1]}/generate_204'
+
+		internetManager = InternetManager()
+		internetManager._checkFrequency = 60
+		internetManager.MIN_PROBE_INTERVAL = 0
+		self.addCleanup(internetManager.onStop)
+
+		with mock.patch.object(InternetManager, 'PROBE_TIMEOUT', (0.2, 0.2)), mock.patch.object(InternetManager, 'PROBE_ADDRESS', address):
+			thread = threading.Thread(target=internetManager.checkInternet, daemon=True)
+			thread.start()
+
+			def waitFor(online: bool, deadline: float) -> float:
+				start = time.monotonic()
+				while internetManager.online != online:
+					self.assertLess(time.monotonic() - start, deadline)
+					time.sleep(0.05)
+				return time.monotonic() - start
+
+			waitFor(online=True, deadline=2)
+
+			# The network black holes, the next probe gives up after the read timeout
+			ProbeHandler.stall.set()
+			internetManager.probeNow()
+			waitFor(online=False, deadline=2)
+			mock_broadcast.assert_called_with(method='internetLost', exceptions=['InternetManager'], propagateToSkills=True)
+
+			# While offline, probes back off
+			self.assertGreater(internetManager._backoff, internetManager._checkFrequency)
+
+			# The network is back, a failure signal re-probes without waiting for the backoff
+			ProbeHandler.stall.clear()
+			internetManager.probeNow()
+			waitFor(online=True, deadline=2)
+			mock_broadcast.assert_called_with(method='internetConnected', exceptions=['InternetManager'], propagateToSkills=True)
+
+
 if __name__ == "__main__":
 	unittest.main()
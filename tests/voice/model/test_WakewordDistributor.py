@@ -0,0 +1,100 @@
+#  Copyright (c) 2021
+#
+#  This file, test_WakewordDistributor.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.04.13 at 12:56:52 CEST
+
+import hashlib
+import socket
+import tempfile
+import threading
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.voice.model.WakewordDistributor import WakewordDelivery, WakewordDistributor
+
+
+def satellite(port: int, answer: str, received: list):
+	with socket.create_connection(('127.0.0.1', port)) as sock:
+		data = b''
+		chunk = sock.recv(65536)
+		while chunk:
+			data += chunk
+			chunk = sock.recv(65536)
+
+		received.append(data)
+		if answer:
+			sock.sendall(answer.encode())
+
+
+class TestWakewordDistributor(TestCase):
+
+	def setUp(self):
+		patcher = patch('core.base.SuperManager.SuperManager')
+		patcher.start().getInstance.return_value = MagicMock()
+		self.addCleanup(patcher.stop)
+
+		patcher = patch.object(WakewordDistributor, 'POLL_INTERVAL', 0.02)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+		tmpDir = tempfile.TemporaryDirectory()
+		self.addCleanup(tmpDir.cleanup)
+		self.zipPath = Path(tmpDir.name, 'alice.zip')
+		self.zipPath.write_bytes(bytes(range(256)) * 2000)
+
+
+	def test_run(self):
+		devices = [f'device{i}' for i in range(10)]
+		callback = MagicMock()
+		distributor = WakewordDistributor(host='127.0.0.1', port=0, zipPath=self.zipPath, checksum='abc', devices=[*devices, 'offline'], timeout=0.3, callback=callback)
+		distributor.start()
+		self.assertTrue(distributor.waitReady(timeout=2))
+
+		# All at once, each device receiving the whole archive
+		received = list()
+		answers = [f'0:{uid}' for uid in devices[:-1]] + [f'-2:{devices[-1]}', '']
+		satellites = [threading.Thread(target=satellite, args=(distributor.port, answer, received)) for answer in answers]
+		for thread in satellites:
+			thread.start()
+		for thread in satellites:
+			thread.join(timeout=5)
+
+		distributor.join(timeout=5)
+		self.assertFalse(distributor.is_alive())
+
+		self.assertEqual(len(received), 11)
+		self.assertTrue(all(hashlib.sha256(data).digest() == hashlib.sha256(self.zipPath.read_bytes()).digest() for data in received))
+
+		deliveries = distributor.deliveries
+		self.assertTrue(all(deliveries[uid] == WakewordDelivery.SUCCESS for uid in devices[:-1]))
+		self.assertEqual(deliveries[devices[-1]], WakewordDelivery.FAILED)
+		self.assertEqual(deliveries['offline'], WakewordDelivery.TIMEOUT)
+		callback.assert_called_once_with(distributor)
+
+
+	def test_unnamed_confirmation(self):
+		distributor = WakewordDistributor(host='127.0.0.1', port=0, zipPath=self.zipPath, checksum='abc', devices=['device'], timeout=5)
+		distributor.start()
+		distributor.waitReady(timeout=2)
+
+		# Former satellites only answer with a code, the only pending device gets it
+		satellite(port=distributor.port, answer='0', received=list())
+		distributor.join(timeout=5)
+
+		self.assertFalse(distributor.is_alive())
+		self.assertEqual(distributor.deliveries, {'device': WakewordDelivery.SUCCESS})
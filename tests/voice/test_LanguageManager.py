@@ -17,7 +17,15 @@
 #
 #  Last modified: 2021.04.13 at 12:56:52 CEST
 
+import json
+import os
+import tempfile
+from pathlib import Path
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.commons.CommonsManager import CommonsManager
+from core.voice.LanguageManager import LanguageManager
 
 
 class TestLanguageManager(TestCase):
@@ -38,6 +46,43 @@ class TestLanguageManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
+	@patch('core.base.SuperManager.SuperManager')
+	def test_load_web_ui_strings(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_instance.commonsManager.contentId.side_effect = CommonsManager.contentId
+		mock_superManager.getInstance.return_value = mock_instance
+
+		tmpDir = tempfile.TemporaryDirectory()
+		self.addCleanup(tmpDir.cleanup)
+		stringsPath = Path(tmpDir.name)
+		Path(stringsPath, 'en.json').write_text(json.dumps({'hello': 'Hello'}))
+		Path(stringsPath, 'fr.json').write_text(json.dumps({'hello': 'Bonjour'}))
+
+		with patch.object(LanguageManager, 'WEBUI_STRINGS_PATH', stringsPath):
+			languageManager = LanguageManager()
+			self.assertEqual(languageManager.loadWebUIStrings(), {'en': {'hello': 'Hello'}, 'fr': {'hello': 'Bonjour'}})
+
+			data, etag = languageManager.getSerializedWebUIStrings(lang='fr')
+			self.assertEqual(json.loads(data), {'hello': 'Bonjour'})
+			self.assertEqual(json.loads(languageManager.getSerializedWebUIStrings()[0])['en'], {'hello': 'Hello'})
+
+			# Unchanged files are not read again
+			with patch.object(Path, 'read_text') as mock_read:
+				languageManager.loadWebUIStrings()
+				mock_read.assert_not_called()
+
+			# Changed files are
+			file = Path(stringsPath, 'fr.json')
+			file.write_text(json.dumps({'hello': 'Salut'}))
+			os.utime(file, ns=(file.stat().st_atime_ns, file.stat().st_mtime_ns + 10 ** 9))
+			languageManager.loadWebUIStrings()
+			data, newEtag = languageManager.getSerializedWebUIStrings(lang='fr')
+			self.assertEqual(json.loads(data), {'hello': 'Salut'})
+			self.assertNotEqual(newEtag, etag)
+			self.assertEqual(languageManager.getSerializedWebUIStrings(lang='en')[0], '{"hello": "Hello"}')
+			self.assertEqual(json.loads(languageManager.getSerializedWebUIStrings(lang='xx')[0]), dict())
+
+
 	def test_load_skill_strings(self):
 		pass  # To be implemented or nothing to test()
 